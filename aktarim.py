@@ -0,0 +1,428 @@
+"""Ilan, CV ve eslesme verilerinin toplu disa / ice aktarimi (NDJSON ya da Parquet).
+
+Kullanim:
+    python aktarim.py disa ilanlar --cikti ilanlar.ndjson
+    python aktarim.py disa eslesmeler --bicim parquet --cikti eslesmeler.parquet --kullanici a@b.com
+    python aktarim.py ice cvler cvler.ndjson
+    python aktarim.py ice ilanlar ilanlar.parquet --bicim parquet --kullanici a@b.com
+
+Kayitlar ortamlar arasi tasinabilir anahtarlarla yazilir: ilan -> kaynak_url, kullanici -> email,
+CV -> (kullanici, orjinal_dosya_adi). Tam bir tasima icin sira: cvler, ilanlar, eslesmeler.
+"""
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from extensions import db
+import benzerlik
+import istatistik
+import models
+
+logger = logging.getLogger(__name__)
+
+# Disa aktarimda sayfa, ice aktarimda transaction basina satir
+PARTI_BOYUTU = 1000
+TURLER = ('ilanlar', 'cvler', 'eslesmeler')
+BICIMLER = {'ndjson': ('application/x-ndjson', 'ndjson'), 'parquet': ('application/vnd.apache.parquet', 'parquet')}
+
+# Parquet'te JSON string olarak saklanan alanlar
+JSON_ALANLARI = {'gereksinimler_json', 'minhash_imzasi', 'cikarilan_veriler', 'analiz'}
+TAMSAYI_ALANLARI = {'skor'}
+ALANLAR = {
+    'ilanlar': ('kaynak_url', 'baslik', 'sirket_adi', 'kaynak_site', 'aciklama_ozeti', 'bulunma_tarihi',
+                'gereksinimler_json', 'minhash_imzasi', 'kanonik_url', 'kullanici'),
+    'cvler': ('kullanici', 'orjinal_dosya_adi', 'cikarilan_veriler'),
+    'eslesmeler': ('kullanici', 'cv', 'kaynak_url', 'skor', 'analiz_seviyesi', 'analiz'),
+}
+# Hata ozetinde tutulan en fazla mesaj
+HATA_SINIRI = 20
+
+
+# ========== Disa aktarim ==========
+
+def _sorgu(tur, kullanici_id):
+    """(sorgu, sayfalama kolonu). Sayfalama kolonu ile keyset sayfalama yapilir."""
+    if tur == 'ilanlar':
+        kanonik = aliased(models.IsIlani)
+        i = models.IsIlani
+        sorgu = (select(i.id, i.kaynak_url, i.baslik, i.sirket_adi, i.kaynak_site, i.aciklama_ozeti,
+                        i.bulunma_tarihi, i.gereksinimler_json, i.minhash_imzasi,
+                        kanonik.kaynak_url.label('kanonik_url'), models.Kullanici.email.label('kullanici'))
+                 .outerjoin(kanonik, kanonik.id == i.kanonik_ilan_id)
+                 .outerjoin(models.Kullanici, models.Kullanici.id == i.bulan_kullanici_id))
+        if kullanici_id is not None:
+            sorgu = sorgu.where(i.bulan_kullanici_id == kullanici_id)
+        return sorgu, i.id
+    if tur == 'cvler':
+        sorgu = (select(models.CV.id, models.Kullanici.email.label('kullanici'), models.CV.orjinal_dosya_adi,
+                        models.CV.cikarilan_veriler)
+                 .join(models.Kullanici, models.Kullanici.id == models.CV.aday_id))
+    else:
+        e = models.Eslesme
+        sorgu = (select(e.id, models.Kullanici.email.label('kullanici'), models.CV.orjinal_dosya_adi.label('cv'),
+                        models.IsIlani.kaynak_url, e.skor, e.analiz_seviyesi, e.analiz_detay, e.eski_analiz_sonucu,
+                        *[getattr(e, f'{ad}_puan') for ad in models.ALT_PUANLAR])
+                 .join(models.CV, models.CV.id == e.cv_id)
+                 .join(models.Kullanici, models.Kullanici.id == models.CV.aday_id)
+                 .join(models.IsIlani, models.IsIlani.id == e.is_ilani_id))
+        if kullanici_id is not None:
+            sorgu = sorgu.where(models.CV.aday_id == kullanici_id)
+        return sorgu, e.id
+    if kullanici_id is not None:
+        sorgu = sorgu.where(models.CV.aday_id == kullanici_id)
+    return sorgu, models.CV.id
+
+
+def _kayit(tur, satir):
+    kayit = dict(satir._mapping)
+    del kayit['id']
+    if tur == 'ilanlar' and kayit['bulunma_tarihi'] is not None:
+        kayit['bulunma_tarihi'] = kayit['bulunma_tarihi'].isoformat()
+    if tur == 'eslesmeler':
+        alt = {ad: kayit.pop(f'{ad}_puan') for ad in models.ALT_PUANLAR}
+        kayit['analiz'] = models.analiz_sozlugu(kayit['skor'], alt, kayit.pop('analiz_detay'),
+                                                kayit.pop('eski_analiz_sonucu'))
+    return kayit
+
+
+def satir_partileri(tur, kullanici_id=None, parti_boyutu=PARTI_BOYUTU):
+    """
+    Kayitlari parti parti (dict listesi) uretir. Her parti ayri kisa bir okuma ile alinir (id > son_id,
+    keyset sayfalama): bellek kullanimi parti boyutuyla sinirlidir ve SQLite'ta uzun suren bir okuma
+    kilidi yazan istekleri bekletmez.
+    """
+    sorgu, kolon = _sorgu(tur, kullanici_id)
+    son_id = 0
+    while True:
+        satirlar = db.session.execute(sorgu.where(kolon > son_id).order_by(kolon).limit(parti_boyutu)).all()
+        db.session.commit()  # okuma transaction'ini kapat
+        if not satirlar:
+            return
+        son_id = satirlar[-1].id
+        yield [_kayit(tur, satir) for satir in satirlar]
+
+
+def _ndjson_parcalari(partiler):
+    for parti in partiler:
+        yield ''.join(json.dumps(kayit, ensure_ascii=False) + '\n' for kayit in parti).encode('utf-8')
+
+
+class _Tampon:
+    """Parquet yazicisinin yazdigi baytlari toplayan, parca parca bosaltilan hedef"""
+
+    def __init__(self):
+        self.parcalar = []
+        self.closed = False
+
+    def write(self, veri):
+        self.parcalar.append(bytes(veri))
+        return len(veri)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def bosalt(self):
+        veri, self.parcalar = b''.join(self.parcalar), []
+        return veri
+
+
+def _parquet_semasi(pa, tur):
+    return pa.schema([(alan, pa.int64() if alan in TAMSAYI_ALANLARI else pa.string()) for alan in ALANLAR[tur]])
+
+
+def _parquet_parcalari(pa, pq, tur, partiler):
+    """Her parti bir row group olarak yazilir ve hemen gonderilir; dosya sonu (footer) en son gelir"""
+    sema = _parquet_semasi(pa, tur)
+    tampon = _Tampon()
+    with pq.ParquetWriter(tampon, sema) as yazici:
+        for parti in partiler:
+            sutunlar = {alan: [json.dumps(k[alan], ensure_ascii=False) if alan in JSON_ALANLARI and k[alan] is not None
+                               else k[alan] for k in parti] for alan in ALANLAR[tur]}
+            yazici.write_table(pa.table(sutunlar, schema=sema))
+            yield tampon.bosalt()
+    yield tampon.bosalt()
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        return (pa, pq), None
+    except ImportError:
+        return None, "Parquet için pyarrow kurulu olmalı (pip install pyarrow)."
+
+
+def disa_aktar(tur, bicim='ndjson', kullanici_id=None):
+    """(bayt parcalari ureteci, hata). kullanici_id verilirse sadece o kullanicinin kayitlari."""
+    if tur not in TURLER:
+        return None, f"Bilinmeyen tur: {tur}"
+    if bicim not in BICIMLER:
+        return None, f"Bilinmeyen bicim: {bicim}"
+    partiler = satir_partileri(tur, kullanici_id)
+    if bicim == 'ndjson':
+        return _ndjson_parcalari(partiler), None
+    moduller, hata = _pyarrow()
+    if hata:
+        return None, hata
+    return _parquet_parcalari(*moduller, tur, partiler), None
+
+
+# ========== Ice aktarim ==========
+
+def _ndjson_kayitlari(dosya):
+    for no, satir in enumerate(dosya, start=1):
+        satir = satir.strip()
+        if not satir:
+            continue
+        try:
+            yield json.loads(satir)
+        except ValueError as e:
+            yield {'_hata': f"{no}. satır okunamadı: {e}"}
+
+
+def _parquet_kayitlari(pq, dosya):
+    for parti in pq.ParquetFile(dosya).iter_batches(batch_size=PARTI_BOYUTU):
+        for kayit in parti.to_pylist():
+            for alan in JSON_ALANLARI & kayit.keys():
+                if isinstance(kayit[alan], str):
+                    kayit[alan] = json.loads(kayit[alan])
+            yield kayit
+
+
+def _partilere_bol(kayitlar, parti_boyutu):
+    parti = []
+    for kayit in kayitlar:
+        parti.append(kayit)
+        if len(parti) >= parti_boyutu:
+            yield parti
+            parti = []
+    if parti:
+        yield parti
+
+
+class _IceAktarici:
+    """Bir ice aktarim calismasinin durumu: kullanici eslemesi, sayaclar ve hata ozeti"""
+
+    def __init__(self, tur, kullanici_id):
+        self.tur = tur
+        self.kullanici_id = kullanici_id
+        self.ozet = {'eklenen': 0, 'guncellenen': 0, 'atlanan': 0, 'hatalar': []}
+        self._kullanicilar = {}
+
+    def atla(self, mesaj):
+        self.ozet['atlanan'] += 1
+        if len(self.ozet['hatalar']) < HATA_SINIRI:
+            self.ozet['hatalar'].append(mesaj)
+
+    def _sahipler(self, parti):
+        """Kayitlarin sahibi: sabit kullanici_id ya da kayittaki email'in bu ortamdaki karsiligi"""
+        if self.kullanici_id is not None:
+            return [self.kullanici_id] * len(parti)
+        eksik = {k.get('kullanici') for k in parti} - set(self._kullanicilar) - {None}
+        if eksik:
+            self._kullanicilar.update(db.session.query(models.Kullanici.email, models.Kullanici.id)
+                                      .filter(models.Kullanici.email.in_(eksik)))
+            self._kullanicilar.update({email: None for email in eksik - set(self._kullanicilar)})
+        return [self._kullanicilar.get(k.get('kullanici')) for k in parti]
+
+    def parti_yaz(self, parti):
+        """Partiyi tek transaction'da upsert eder; istatistik farklari ayni commit'le yazilir"""
+        farklar = istatistik.Farklar()
+        gecerli = []
+        for kayit, sahip in zip(parti, self._sahipler(parti)):
+            if '_hata' in kayit:
+                self.atla(kayit['_hata'])
+            elif sahip is None:
+                self.atla(f"Kullanıcı bulunamadı: {kayit.get('kullanici')}")
+            else:
+                gecerli.append((kayit, sahip))
+        try:
+            getattr(self, f'_{self.tur}')(gecerli, farklar)
+            farklar.uygula(db.session)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Ice aktarim partisi yazilamadi ({self.tur}, {len(parti)} kayit): {e}")
+            for _ in gecerli:
+                self.atla(f"Parti yazılamadı: {e}")
+
+    def _ilanlar(self, kayitlar, farklar):
+        kayitlar = [(k, s) for k, s in kayitlar if k.get('kaynak_url') or self.atla("kaynak_url eksik")]
+        mevcut = {i.kaynak_url: i for i in models.IsIlani.query.filter(
+            models.IsIlani.kaynak_url.in_([k['kaynak_url'] for k, _ in kayitlar]))}
+        yeniler = []
+        for kayit, sahip in kayitlar:
+            ilan = mevcut.get(kayit['kaynak_url'])
+            if ilan is not None:
+                # Baska kullanicinin ilani degistirilmez; sahiplik ve kaynak (istatistikler) korunur
+                if ilan.bulan_kullanici_id != sahip:
+                    self.atla(f"İlan başka bir kullanıcıya ait: {kayit['kaynak_url']}")
+                    continue
+                for alan in ('baslik', 'sirket_adi', 'aciklama_ozeti', 'gereksinimler_json'):
+                    if kayit.get(alan) is not None:
+                        setattr(ilan, alan, kayit[alan])
+                self.ozet['guncellenen'] += 1
+                continue
+            ilan = mevcut[kayit['kaynak_url']] = models.IsIlani(
+                kaynak_url=kayit['kaynak_url'], baslik=kayit.get('baslik'), sirket_adi=kayit.get('sirket_adi'),
+                kaynak_site=kayit.get('kaynak_site'), aciklama_ozeti=kayit.get('aciklama_ozeti'),
+                gereksinimler_json=kayit.get('gereksinimler_json'), minhash_imzasi=kayit.get('minhash_imzasi'),
+                bulan_kullanici_id=sahip)
+            if kayit.get('bulunma_tarihi'):
+                ilan.bulunma_tarihi = datetime.fromisoformat(kayit['bulunma_tarihi'])
+            db.session.add(ilan)
+            yeniler.append((ilan, kayit.get('kanonik_url')))
+        db.session.flush()
+
+        # Kanonik ilanlar url ile baglanir (disa aktarim id sirasinda: kanonik ilan kopyasindan once gelir)
+        kanonik_urller = {url for _, url in yeniler if url} - set(mevcut)
+        if kanonik_urller:
+            mevcut.update({i.kaynak_url: i for i in models.IsIlani.query.filter(
+                models.IsIlani.kaynak_url.in_(kanonik_urller))})
+        for ilan, kanonik_url in yeniler:
+            kanonik = mevcut.get(kanonik_url) if kanonik_url else None
+            if kanonik is not None and kanonik.bulan_kullanici_id == ilan.bulan_kullanici_id:
+                ilan.kanonik_ilan_id = kanonik.kanonik_ilan_id or kanonik.id
+            if ilan.minhash_imzasi:
+                db.session.add_all(models.IlanLshBandi(is_ilani_id=ilan.id, bant_no=no, bant_ozeti=ozet)
+                                   for no, ozet in benzerlik.lsh_bantlari(ilan.minhash_imzasi))
+            farklar.ilan(ilan.bulan_kullanici_id, ilan.kaynak_site, kopya=bool(ilan.kanonik_ilan_id))
+        self.ozet['eklenen'] += len(yeniler)
+
+    def _cvler(self, kayitlar, farklar):
+        kayitlar = [(k, s) for k, s in kayitlar if k.get('orjinal_dosya_adi') or self.atla("orjinal_dosya_adi eksik")]
+        sahipler = {s for _, s in kayitlar}
+        mevcut = {(cv.aday_id, cv.orjinal_dosya_adi): cv for cv in models.CV.query.filter(
+            models.CV.aday_id.in_(sahipler), models.CV.orjinal_dosya_adi.in_([k['orjinal_dosya_adi'] for k, _ in kayitlar]))}
+        for kayit, sahip in kayitlar:
+            cv = mevcut.get((sahip, kayit['orjinal_dosya_adi']))
+            if cv is not None:
+                cv.cikarilan_veriler = kayit.get('cikarilan_veriler')
+                self.ozet['guncellenen'] += 1
+                continue
+            mevcut[(sahip, kayit['orjinal_dosya_adi'])] = cv = models.CV(
+                orjinal_dosya_adi=kayit['orjinal_dosya_adi'], aday_id=sahip,
+                cikarilan_veriler=kayit.get('cikarilan_veriler'))
+            db.session.add(cv)
+            farklar.cv(sahip)
+            self.ozet['eklenen'] += 1
+
+    def _eslesmeler(self, kayitlar, farklar):
+        kayitlar = [(k, s) for k, s in kayitlar
+                    if (k.get('kaynak_url') and k.get('cv') and isinstance(k.get('skor'), int))
+                    or self.atla("kaynak_url, cv ya da skor eksik")]
+        sahipler = {s for _, s in kayitlar}
+        cvler = {(cv.aday_id, cv.orjinal_dosya_adi): cv for cv in models.CV.query.filter(
+            models.CV.aday_id.in_(sahipler), models.CV.orjinal_dosya_adi.in_({k['cv'] for k, _ in kayitlar}))}
+        ilanlar = {i.kaynak_url: i for i in models.IsIlani.query.filter(
+            models.IsIlani.kaynak_url.in_({k['kaynak_url'] for k, _ in kayitlar}))}
+        mevcut = {(e.cv_id, e.is_ilani_id): e for e in models.Eslesme.query.filter(
+            models.Eslesme.cv_id.in_([cv.id for cv in cvler.values()]),
+            models.Eslesme.is_ilani_id.in_([i.id for i in ilanlar.values()]))}
+        for kayit, sahip in kayitlar:
+            cv, ilan = cvler.get((sahip, kayit['cv'])), ilanlar.get(kayit['kaynak_url'])
+            if cv is None or ilan is None:
+                self.atla(f"CV ya da ilan bulunamadı: {kayit['cv']} / {kayit['kaynak_url']}")
+                continue
+            if ilan.bulan_kullanici_id != sahip:
+                self.atla(f"İlan başka bir kullanıcıya ait: {kayit['kaynak_url']}")
+                continue
+            eslesme = mevcut.get((cv.id, ilan.id))
+            eski_skor = eslesme.skor if eslesme else None
+            if eslesme is None:
+                eslesme = mevcut[(cv.id, ilan.id)] = models.Eslesme(cv_id=cv.id, is_ilani_id=ilan.id, skor=0)
+                db.session.add(eslesme)
+                self.ozet['eklenen'] += 1
+            else:
+                self.ozet['guncellenen'] += 1
+            eslesme.skor = kayit['skor']
+            eslesme.analiz_seviyesi = kayit.get('analiz_seviyesi')
+            if kayit.get('analiz'):
+                eslesme.analiz_sonucu = kayit['analiz']
+            farklar.eslesme(sahip, ilan.kaynak_site, eski_skor, eslesme.skor)
+
+
+def ice_aktar(tur, dosya, bicim='ndjson', kullanici_id=None, parti_boyutu=PARTI_BOYUTU):
+    """
+    Ikili dosya nesnesinden (NDJSON ya da Parquet) kayitlari partiler halinde upsert eder.
+    kullanici_id verilirse tum kayitlar o kullaniciya yazilir, yoksa kayittaki email ile eslenir.
+    (ozet, hata) dondurur; ozet: eklenen / guncellenen / atlanan / hatalar.
+    """
+    if tur not in TURLER:
+        return None, f"Bilinmeyen tur: {tur}"
+    if bicim == 'ndjson':
+        kayitlar = _ndjson_kayitlari(dosya)
+    elif bicim == 'parquet':
+        moduller, hata = _pyarrow()
+        if hata:
+            return None, hata
+        kayitlar = _parquet_kayitlari(moduller[1], dosya)
+    else:
+        return None, f"Bilinmeyen bicim: {bicim}"
+
+    aktarici = _IceAktarici(tur, kullanici_id)
+    try:
+        for parti in _partilere_bol(kayitlar, parti_boyutu):
+            aktarici.parti_yaz(parti)
+    except Exception as e:
+        logger.error(f"Ice aktarim hatasi ({tur}): {e}")
+        return aktarici.ozet, str(e)
+    logger.info(f"Ice aktarim tamamlandi ({tur}): {aktarici.ozet['eklenen']} eklendi, "
+                f"{aktarici.ozet['guncellenen']} guncellendi, {aktarici.ozet['atlanan']} atlandi")
+    return aktarici.ozet, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Toplu disa / ice aktarim')
+    parser.add_argument('yon', choices=('disa', 'ice'))
+    parser.add_argument('tur', choices=TURLER)
+    parser.add_argument('dosya', nargs='?', help='ice aktarilacak dosya')
+    parser.add_argument('--bicim', choices=tuple(BICIMLER), default='ndjson')
+    parser.add_argument('--cikti', help='disa aktarim dosyasi (varsayilan: stdout)')
+    parser.add_argument('--kullanici', help='sadece bu email (disa) / tum kayitlari bu email\'e yaz (ice)')
+    args = parser.parse_args(argv)
+
+    from app import app, semayi_hazirla
+    semayi_hazirla()
+    with app.app_context():
+        kullanici_id = None
+        if args.kullanici:
+            kullanici = models.Kullanici.query.filter_by(email=args.kullanici).first()
+            if kullanici is None:
+                print(f"Kullanıcı bulunamadı: {args.kullanici}", file=sys.stderr)
+                return 1
+            kullanici_id = kullanici.id
+
+        if args.yon == 'disa':
+            parcalar, hata = disa_aktar(args.tur, args.bicim, kullanici_id)
+            if hata:
+                print(hata, file=sys.stderr)
+                return 1
+            hedef = open(args.cikti, 'wb') if args.cikti else sys.stdout.buffer
+            try:
+                for parca in parcalar:
+                    hedef.write(parca)
+            finally:
+                if args.cikti:
+                    hedef.close()
+            return 0
+
+        if not args.dosya:
+            parser.error('ice aktarim icin dosya gerekli')
+        with open(args.dosya, 'rb') as dosya:
+            ozet, hata = ice_aktar(args.tur, dosya, args.bicim, kullanici_id)
+        print(json.dumps(ozet, ensure_ascii=False, indent=2))
+        if hata:
+            print(hata, file=sys.stderr)
+            return 1
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,394 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from extensions import db
+import functions
+import istatistik
+import metrikler
+import models
+import tek_ucus
+import yogunlastirma
+
+logger = logging.getLogger(__name__)
+
+# Varsayilan eszamanlilik sinirlari (app.config ile degistirilebilir)
+CEKME_LIMITI = 50
+LLM_LIMITI = 20
+
+# Gemini yanitlari uzun surebilir; ilan sayfalari icin sync yoldaki 10 sn korunur
+GEMINI_ZAMAN_ASIMI = 60
+CEKME_ZAMAN_ASIMI = 10
+
+# Yazici bu kadar kaydi ya da YAZMA_ARALIGI saniye boyunca gelenleri tek commit ile yazar
+YAZMA_PARTI_BOYUTU = 50
+YAZMA_ARALIGI = 0.5
+
+# Olay dongusune ORM nesnesi tasinmaz; ilanin gereken alanlari once bu kayda kopyalanir
+IlanIsi = namedtuple('IlanIsi', 'ilan_id baslik sirket_adi aciklama_ozeti kaynak_url metin')
+
+
+class VeritabaniYazici:
+    """
+    Analiz sonuclarini tek bir is parcaciginda, partiler halinde veritabanina yazar.
+    Asenkron gorevler sadece kuyruga ekler; olay dongusu DB I/O'su ile bloklanmaz ve
+    yuzlerce gorev ayni anda calissa da tek oturum / tek SQLite yazicisi kullanilir.
+    """
+
+    def __init__(self, app, parti_boyutu=YAZMA_PARTI_BOYUTU, aralik=YAZMA_ARALIGI):
+        self._app = app
+        self._parti_boyutu = parti_boyutu
+        self._aralik = aralik
+        self._kuyruk = queue.Queue()
+        self._is_parcacigi = threading.Thread(target=self._calis, daemon=True)
+        # ilan_id -> yazma hatasi (commit basarisiz olan eslesmeler)
+        self.hatalar = {}
+
+    def baslat(self):
+        self._is_parcacigi.start()
+        return self
+
+    def metin_kaydet(self, ilan_id, kayit, tamamlandi=None):
+        """kayit: yogunlastirma.ilan_metni_kaydi ciktisi. tamamlandi(hata): commit (ya da basarisiz
+        commit) sonrasinda yazici is parcaciginda cagrilir"""
+        self._kuyruk.put(('metin', ilan_id, kayit, tamamlandi))
+
+    def eslesme_kaydet(self, cv_id, ilan_id, sonuc, tamamlandi=None, seviye='tam'):
+        self._kuyruk.put(('eslesme', ilan_id, (cv_id, sonuc, seviye), tamamlandi))
+
+    def bosalt(self, zaman_asimi=None):
+        """Su ana kadar kuyruga eklenen her seyin commit edilmesini ve tamamlandi geri
+        cagirimlarinin calismasini bekler (yazici is parcacigini durdurmaz)"""
+        bitti = threading.Event()
+        self._kuyruk.put(('bariyer', None, None, lambda hata: bitti.set()))
+        return bitti.wait(zaman_asimi)
+
+    def kapat(self):
+        """Kuyruktaki her seyi yazip is parcacigini bitirir"""
+        self._kuyruk.put(None)
+        self._is_parcacigi.join()
+
+    def _calis(self):
+        with self._app.app_context():
+            bitti = False
+            while not bitti:
+                parti = [self._kuyruk.get()]
+                son = time.monotonic() + self._aralik
+                while parti[-1] is not None and len(parti) < self._parti_boyutu:
+                    kalan = son - time.monotonic()
+                    if kalan <= 0:
+                        break
+                    try:
+                        parti.append(self._kuyruk.get(timeout=kalan))
+                    except queue.Empty:
+                        break
+                if parti[-1] is None:
+                    bitti = True
+                    parti.pop()
+                if parti:
+                    self._yaz(parti)
+            db.session.remove()
+
+    def _yaz(self, parti):
+        metinler = {ilan_id: veri for tur, ilan_id, veri, _ in parti if tur == 'metin'}
+        eslesmeler = [(ilan_id, *veri) for tur, ilan_id, veri, _ in parti if tur == 'eslesme']
+        hata = None
+        try:
+            if metinler:
+                for ilan in models.IsIlani.query.filter(models.IsIlani.id.in_(metinler)):
+                    ilan.gereksinimler_json = metinler[ilan.id]
+            if eslesmeler:
+                cv_idler = {cv_id for _, cv_id, _, _ in eslesmeler}
+                ilan_idler = {ilan_id for ilan_id, _, _, _ in eslesmeler}
+                mevcut = {(e.cv_id, e.is_ilani_id): e for e in models.Eslesme.query.filter(
+                    models.Eslesme.cv_id.in_(cv_idler), models.Eslesme.is_ilani_id.in_(ilan_idler))}
+                # Istatistik farklari icin: CV sahibi ve ilan kaynagi
+                sahipler = dict(db.session.query(models.CV.id, models.CV.aday_id).filter(models.CV.id.in_(cv_idler)))
+                kaynaklar = dict(db.session.query(models.IsIlani.id, models.IsIlani.kaynak_site)
+                                 .filter(models.IsIlani.id.in_(ilan_idler)))
+                farklar = istatistik.Farklar()
+                for ilan_id, cv_id, sonuc, seviye in eslesmeler:
+                    eslesme = mevcut.get((cv_id, ilan_id))
+                    eski_skor = eslesme.skor if eslesme else None
+                    if not eslesme:
+                        eslesme = mevcut[(cv_id, ilan_id)] = models.Eslesme(cv_id=cv_id, is_ilani_id=ilan_id, skor=0)
+                        db.session.add(eslesme)
+                    eslesme.skor = sonuc.get('uygunluk_skoru', 0)
+                    eslesme.analiz_sonucu = sonuc
+                    eslesme.analiz_seviyesi = seviye
+                    if cv_id in sahipler:
+                        farklar.eslesme(sahipler[cv_id], kaynaklar.get(ilan_id), eski_skor, eslesme.skor)
+                farklar.uygula(db.session)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            hata = str(e)
+            logger.error(f"Analiz sonuclari yazilamadi ({len(parti)} kayit): {e}")
+            for ilan_id, _, _, _ in eslesmeler:
+                self.hatalar[ilan_id] = hata
+        for _, _, _, tamamlandi in parti:
+            if tamamlandi is not None:
+                tamamlandi(hata)
+
+
+class KademeRaporu:
+    """Kademe (tarama / tam) basina istek sayisi, token, tahmini maliyet ve sure toplamlari"""
+
+    def __init__(self):
+        self.kademeler = {}
+
+    def _kademe(self, kademe):
+        return self.kademeler.setdefault(kademe, {'istek': 0, 'basarisiz': 0, 'girdi_token': 0, 'cikti_token': 0,
+                                                  'maliyet_usd': 0.0, 'sure_sn': 0.0})
+
+    def ekle(self, kademe, kullanim, sure):
+        k = self._kademe(kademe)
+        k['istek'] += 1
+        k['girdi_token'] += kullanim['girdi_token']
+        k['cikti_token'] += kullanim['cikti_token']
+        k['maliyet_usd'] += kullanim['maliyet_usd']
+        k['sure_sn'] += sure
+
+    def hata(self, kademe):
+        self._kademe(kademe)['basarisiz'] += 1
+
+    def sozluk(self):
+        return {ad: {**k, 'maliyet_usd': round(k['maliyet_usd'], 6), 'sure_sn': round(k['sure_sn'], 2),
+                     'ortalama_ms': round(k['sure_sn'] / k['istek'] * 1000, 1) if k['istek'] else None}
+                for ad, k in self.kademeler.items()}
+
+
+class AnalizMotoru:
+    """
+    Toplu analizi tek bir olay dongusunde calistirir. Ilan cekme ve Gemini istekleri ayri
+    semaforlarla sinirlanir; yuzlerce ilan ayni anda islemde olabilir. Sonuclar
+    _tek_ilan_analiz_et ile ayni bicimdeki dict'lerdir.
+    """
+
+    def __init__(self, istemci, yazici, cv_id, cv_profili, cekme_limiti, llm_limiti, bekleme_havuzu,
+                 ucuslar=tek_ucus.ucuslar):
+        self._istemci = istemci
+        self._yazici = yazici
+        self._cv_id = cv_id
+        self._cv_profili = cv_profili
+        self._cekme_semaforu = asyncio.Semaphore(cekme_limiti)
+        self._llm_semaforu = asyncio.Semaphore(llm_limiti)
+        # Baska bir liderin isini beklemek is parcacigini bloklar; HTML ayristirmanin kullandigi
+        # varsayilan havuzu tuketmemesi icin ayri bir havuzda beklenir
+        self._bekleme_havuzu = bekleme_havuzu
+        self._ucuslar = ucuslar
+        # Kademeli analizde ikinci asamada ilan sayfasi yeniden cekilmesin
+        self._metinler = {}
+        self.rapor = KademeRaporu()
+
+    async def _ucus_baslat(self, anahtar):
+        return await asyncio.get_running_loop().run_in_executor(self._bekleme_havuzu, self._ucuslar.baslat, anahtar)
+
+    async def _ucus_bekle(self, ucus, db_sonucu):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._bekleme_havuzu, self._ucuslar.bekle, ucus, db_sonucu)
+
+    def _bitirici(self, ucus, sonuc):
+        """Yazici commit ettikten sonra ucusu bitiren geri cagirim (hata varsa bekleyenler hatayi alir)"""
+        if ucus is None:
+            return None
+        def tamamlandi(hata):
+            self._ucuslar.bitir(ucus, {'ilan_id': sonuc['ilan_id'], 'success': False, 'error': hata}
+                                if hata else sonuc)
+        return tamamlandi
+
+    async def _ilan_cek(self, url):
+        baslangic = time.perf_counter()
+        metin, hata = None, None
+        try:
+            if not url.startswith('http'): url = 'https://' + url
+            yanit = await self._istemci.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=CEKME_ZAMAN_ASIMI)
+            if yanit.status_code != 200:
+                hata = "Siteye erişilemedi."
+            else:
+                # HTML ayristirma CPU isi; olay dongusunu bloklamamasi icin is parcacigina verilir
+                metin, hata = await asyncio.to_thread(functions.ilan_metnini_ayikla, yanit.content)
+        except Exception as e:
+            hata = str(e)
+        metrikler.ILAN_CEKME_SURESI.gozlemle(time.perf_counter() - baslangic, durum='basarili' if metin else 'hata')
+        return metin, hata
+
+    async def _gemini_istegi_gonder(self, icerik, talimat, sema, modeller, kademe):
+        """functions._gemini_istegi_gonder'in asenkron karsiligi (ayni model yedekleme sirasi)"""
+        son_hata = ""
+        govde = functions.gemini_govdesi(icerik, talimat, sema, functions.ANALIZ_TEMPERATURE)
+        toplam_baslangic = time.perf_counter()
+
+        for derinlik, model in enumerate(modeller, start=1):
+            baslangic = time.perf_counter()
+            durum = 'hata'
+            try:
+                yanit = await self._istemci.post(functions.gemini_url(model), content=govde,
+                                                 headers={'Content-Type': 'application/json'},
+                                                 timeout=GEMINI_ZAMAN_ASIMI)
+                durum = str(yanit.status_code)
+                if yanit.status_code == 200:
+                    yanit_json = yanit.json()
+                    sonuc = functions.gemini_yanitini_coz(yanit_json)
+                    metrikler.GEMINI_YEDEK_DERINLIGI.gozlemle(derinlik)
+                    kullanim = functions.gemini_kullanimi(model, govde, yanit_json)
+                    sure = time.perf_counter() - toplam_baslangic
+                    functions.kademe_kaydet(kademe, kullanim, sure)
+                    self.rapor.ekle(kademe, kullanim, sure)
+                    return sonuc, None
+                hata_detay = yanit.json().get('error', {}).get('message', yanit.text[:200])
+                son_hata = f"{model} Hatası: {yanit.status_code} - {hata_detay}"
+                logger.warning(son_hata)
+            except Exception as e:
+                son_hata = str(e)
+            finally:
+                metrikler.GEMINI_SURESI.gozlemle(time.perf_counter() - baslangic, model=model, durum=durum)
+                metrikler.GEMINI_ISTEK.artir(model=model, durum=durum)
+
+        self.rapor.hata(kademe)
+        return None, f"Yapay zeka yanıt vermedi. Son Hata: {son_hata}"
+
+    async def _ilan_metni(self, ilan):
+        """Ilan metnini dondurur; ayni URL'yi baska bir istek/surec cekiyorsa onun sonucunu bekler"""
+        if ilan.metin or ilan.ilan_id in self._metinler:
+            return ilan.metin or self._metinler[ilan.ilan_id]
+        ucus, lider = await self._ucus_baslat(tek_ucus.url_anahtari(ilan.kaynak_url))
+        metin = None
+        if not lider:
+            metin = await self._ucus_bekle(ucus, lambda: tek_ucus.kayitli_ilan_metni(ilan.kaynak_url))
+            ucus = None
+        devredildi = False
+        try:
+            # '' : lider cekemedi, sayfa yeniden cekilmez (yedek metin kullanilir); None: sonuc yok
+            if metin is None:
+                async with self._cekme_semaforu:
+                    metin, _ = await self._ilan_cek(ilan.kaynak_url)
+            kayit = await asyncio.to_thread(yogunlastirma.ilan_metni_kaydi,
+                                            metin or f"{ilan.baslik} {ilan.sirket_adi} {ilan.aciklama_ozeti}")
+            # Cekme basarisizsa bekleyenlere bos metin iletilir, kendi yedek metinlerini kullanirlar
+            cekilen = kayit['yogun_metin'] if metin else ''
+            metin = self._metinler[ilan.ilan_id] = kayit['yogun_metin']
+            tamamlandi = (lambda hata: self._ucuslar.bitir(ucus, cekilen)) if ucus is not None else None
+            self._yazici.metin_kaydet(ilan.ilan_id, kayit, tamamlandi)
+            devredildi = True
+            return metin
+        finally:
+            if ucus is not None and not devredildi:
+                self._ucuslar.bitir(ucus, '')
+
+    async def ilani_analiz_et(self, ilan, seviye='tam'):
+        """seviye='tarama': ucuz modelle sadece alt puanlar; 'tam': detayli analiz"""
+        ucus, lider = await self._ucus_baslat(tek_ucus.puan_anahtari(self._cv_id, ilan.ilan_id))
+        if not lider:
+            # Ayni cift baska bir istekte (tekil analiz, ikinci sekme) ya da surecte puanlaniyor
+            sonuc = await self._ucus_bekle(ucus, lambda: tek_ucus.kayitli_puan(self._cv_id, ilan.ilan_id))
+            # Tam analiz isteyen, liderin on tarama sonucunu kabul etmez; analizi kendisi yapar
+            if sonuc is not None and not (seviye == 'tam' and sonuc.get('seviye') == 'tarama'):
+                return {**sonuc, 'baslik': ilan.baslik} if sonuc.get('success') else sonuc
+            ucus = None  # lider sonuc uretemedi; koordinasyonsuz analiz edilir
+
+        sonuc, devredildi = None, False
+        try:
+            metin = await self._ilan_metni(ilan)
+            if seviye == 'tarama':
+                prompt, talimat, sema = functions.tarama_istemi_hazirla(self._cv_profili, metin)
+                modeller = functions.TARAMA_MODELLERI
+            else:
+                prompt, talimat, sema = functions.analiz_istemi_hazirla(None, metin, self._cv_profili)
+                modeller = functions.GEMINI_MODELLERI
+            async with self._llm_semaforu:
+                analiz, err = await self._gemini_istegi_gonder(prompt, talimat, sema, modeller, seviye)
+            if err:
+                sonuc = {'ilan_id': ilan.ilan_id, 'success': False, 'error': err}
+                return sonuc
+
+            functions.analiz_puanini_hesapla(analiz)
+            sonuc = {'ilan_id': ilan.ilan_id, 'success': True, 'skor': analiz.get('uygunluk_skoru', 0),
+                     'baslik': ilan.baslik, 'seviye': seviye}
+            self._yazici.eslesme_kaydet(self._cv_id, ilan.ilan_id, analiz, self._bitirici(ucus, sonuc), seviye)
+            devredildi = True
+            return sonuc
+        except Exception as e:
+            logger.error(f"Asenkron analiz hatası (ilan_id={ilan.ilan_id}): {e}")
+            sonuc = {'ilan_id': ilan.ilan_id, 'success': False, 'error': str(e)}
+            return sonuc
+        finally:
+            # Kayit yaziciya devredildiyse ucusu yazici commit sonrasi bitirir
+            if ucus is not None and not devredildi:
+                self._ucuslar.bitir(ucus, sonuc)
+
+    async def hepsini_analiz_et(self, isler, seviye='tam'):
+        gorevler = [asyncio.ensure_future(self.ilani_analiz_et(ilan, seviye)) for ilan in isler]
+        return [await gorev for gorev in asyncio.as_completed(gorevler)]
+
+    async def kademeli_analiz_et(self, isler, esik, ust_k):
+        """
+        Once tum ilanlar ucuz modelle taranir (sadece alt puanlar). Tarama skoru esigi gecen
+        ya da ilk ust_k icinde olan ilanlar detayli analize yukseltilir. Yukseltme basarisiz
+        olursa ilanin tarama sonucu korunur.
+        """
+        taramalar = await self.hepsini_analiz_et(isler, seviye='tarama')
+        sirali = sorted((s for s in taramalar if s['success']), key=lambda s: s['skor'], reverse=True)
+        yukseltilecek = {s['ilan_id'] for sira, s in enumerate(sirali) if s['skor'] >= esik or sira < ust_k}
+        logger.info(f"Kademeli analiz: {len(sirali)}/{len(isler)} tarandi, {len(yukseltilecek)} ilan yukseltiliyor")
+        # Tarama ucuslari yazici commit edince biter; yazilmadan ikinci asamaya gecilirse tam analiz
+        # istekleri acik tarama ucusuna baglanip tarama sonucunu alir
+        await asyncio.to_thread(self._yazici.bosalt)
+
+        sonuclar = {s['ilan_id']: s for s in taramalar}
+        for sonuc in await self.hepsini_analiz_et([i for i in isler if i.ilan_id in yukseltilecek], seviye='tam'):
+            if sonuc['success']:
+                sonuclar[sonuc['ilan_id']] = sonuc
+            else:
+                sonuclar[sonuc['ilan_id']]['yukseltme_hatasi'] = sonuc['error']
+        return list(sonuclar.values())
+
+
+def _ilan_isi(ilan):
+    return IlanIsi(ilan.id, ilan.baslik, ilan.sirket_adi, ilan.aciklama_ozeti, ilan.kaynak_url,
+                   yogunlastirma.istem_metni(ilan.gereksinimler_json))
+
+
+async def _calistir(isler, yazici, cv_id, cv_profili, cekme_limiti, llm_limiti, kademe, kademe_raporu):
+    import httpx
+    limitler = httpx.Limits(max_connections=cekme_limiti + llm_limiti, max_keepalive_connections=llm_limiti)
+    with ThreadPoolExecutor(max_workers=cekme_limiti, thread_name_prefix='ucus_bekleme') as bekleme_havuzu:
+        async with httpx.AsyncClient(limits=limitler, follow_redirects=True) as istemci:
+            motor = AnalizMotoru(istemci, yazici, cv_id, cv_profili, cekme_limiti, llm_limiti, bekleme_havuzu)
+            try:
+                if kademe:
+                    return await motor.kademeli_analiz_et(isler, kademe['esik'], kademe['ust_k'])
+                return await motor.hepsini_analiz_et(isler)
+            finally:
+                if kademe_raporu is not None:
+                    kademe_raporu.update(motor.rapor.sozluk())
+
+
+def toplu_analiz_et(app, cv_id, cv_profili, ilanlar, cekme_limiti=CEKME_LIMITI, llm_limiti=LLM_LIMITI,
+                    kademe=None, kademe_raporu=None):
+    """
+    Verilen IsIlani listesini asenkron motorla analiz eder ve her ilan icin
+    {'ilan_id', 'success', 'skor', 'baslik', 'seviye'} / {'ilan_id', 'success', 'error'} dict'lerinin
+    listesini (tamamlanma sirasiyla) dondurur. Tum DB yazimlari tek yazici is parcacigindan yapilir.
+
+    kademe={'esik': .., 'ust_k': ..} verilirse kademeli (tarama + secili ilanlara tam analiz) calisir.
+    kademe_raporu dict'i verilirse kademe basina istek / token / maliyet / sure ozetiyle doldurulur.
+    """
+    isler = [_ilan_isi(ilan) for ilan in ilanlar]
+    yazici = VeritabaniYazici(app).baslat()
+    try:
+        sonuclar = asyncio.run(_calistir(isler, yazici, cv_id, cv_profili, cekme_limiti, llm_limiti,
+                                         kademe, kademe_raporu))
+    finally:
+        yazici.kapat()
+
+    for sonuc in sonuclar:
+        hata = yazici.hatalar.get(sonuc['ilan_id'])
+        if hata and sonuc.get('success'):
+            sonuc.pop('skor', None)
+            sonuc.pop('baslik', None)
+            sonuc.update(success=False, error=hata)
+    return sonuclar
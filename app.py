@@ -1,14 +1,32 @@
 import os
 import re
+import json
+import time
+import shutil
+import hmac
+import hashlib
 import logging
-from flask import Flask, render_template, request, redirect, url_for, flash, session, abort, jsonify
+import tempfile
+import threading
+from flask import Flask, render_template, request, redirect, url_for, flash, session, abort, jsonify, g, Response, stream_with_context
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from flask_wtf.csrf import CSRFProtect
-from datetime import timedelta
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+from datetime import timedelta, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session, load_only
 import functions
+import aktarim
+import analiz_motoru
+import benzerlik
+import istatistik
+import metrikler
+import migrasyon
+import profil
+import tek_ucus
+import yogunlastirma
 from extensions import db
 import models
 
@@ -21,17 +39,41 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# httpx her istegi INFO seviyesinde loglar; toplu analizde yuzlerce satir olusur
+logging.getLogger('httpx').setLevel(logging.WARNING)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
 
 # Guvenlik ayarlari - environment variable'lardan al
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'proje.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'proje.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
 app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'uploads')
 
+# Istek bazli profil (varsayilan kapali; kapaliyken hicbir kanca kaydedilmez)
+app.config['PROFIL_AKTIF'] = os.getenv('PROFIL_AKTIF', 'False').lower() == 'true'
+app.config['PROFIL_ORNEKLEME_ORANI'] = float(os.getenv('PROFIL_ORNEKLEME_ORANI', '0'))
+app.config['PROFIL_ESIK_MS'] = int(os.getenv('PROFIL_ESIK_MS', '1000'))
+app.config['PROFIL_ANAHTARI'] = os.getenv('PROFIL_ANAHTARI')
+app.config['PROFIL_DIZINI'] = os.getenv('PROFIL_DIZINI', os.path.join(basedir, 'profiller'))
+
+# /metrics erisimi: METRIK_TOKEN verilirse 'Authorization: Bearer <token>' gerekir, yoksa sadece localhost
+app.config['METRIK_TOKEN'] = os.getenv('METRIK_TOKEN')
+
+# Agir bagimliliklari onceden yukle (fork eden sunucular icin): 'hepsi' ya da 'cikarma,kazima,llm'
+app.config['ON_YUKLE'] = os.getenv('ON_YUKLE', '')
+
+# Toplu analiz motoru: 'async' (tek olay dongusu) ya da 'thread' (5 is parcacigi)
+app.config['ANALIZ_MOTORU'] = os.getenv('ANALIZ_MOTORU', 'async').lower()
+app.config['ANALIZ_CEKME_LIMITI'] = int(os.getenv('ANALIZ_CEKME_LIMITI', str(analiz_motoru.CEKME_LIMITI)))
+app.config['ANALIZ_LLM_LIMITI'] = int(os.getenv('ANALIZ_LLM_LIMITI', str(analiz_motoru.LLM_LIMITI)))
+# Kademeli toplu analiz: once ucuz modelle tarama, esigi gecen / ilk K ilana tam analiz
+app.config['ANALIZ_KADEMELI'] = os.getenv('ANALIZ_KADEMELI', 'False').lower() == 'true'
+app.config['KADEME_ESIK'] = int(os.getenv('KADEME_ESIK', '60'))
+app.config['KADEME_UST_K'] = int(os.getenv('KADEME_UST_K', '10'))
+
 # Dosya yukleme sinirlari
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB maksimum dosya boyutu
 ALLOWED_EXTENSIONS = {'pdf', 'docx'}
@@ -40,6 +82,77 @@ ALLOWED_EXTENSIONS = {'pdf', 'docx'}
 csrf = CSRFProtect(app)
 
 db.init_app(app)
+tek_ucus.ucuslar.init_app(app)
+
+# Eksik tablo/kolonlari ekle (mevcut proje.db dosyalari icin). Import sirasinda degil;
+# ilk istekte ya da CLI komutlarinda bir kez calisir (create_db.py dosyayi silebilsin diye)
+_sema_kilidi = threading.Lock()
+_sema_hazir = False
+
+def semayi_hazirla():
+    global _sema_hazir
+    if _sema_hazir:
+        return
+    with _sema_kilidi:
+        if not _sema_hazir:
+            with app.app_context():
+                migrasyon.semayi_guncelle()
+            _sema_hazir = True
+
+@app.before_request
+def _semayi_kontrol_et():
+    semayi_hazirla()
+
+if app.config['ON_YUKLE']:
+    functions.on_yukle(*[a.strip() for a in app.config['ON_YUKLE'].split(',') if a.strip() not in ('', 'hepsi')])
+
+# ========== Metrikler ==========
+@event.listens_for(Session, 'before_commit')
+def _commit_baslangic(oturum):
+    oturum.info['commit_baslangic'] = time.perf_counter()
+
+@event.listens_for(Session, 'after_commit')
+def _commit_bitis(oturum):
+    baslangic = oturum.info.pop('commit_baslangic', None)
+    if baslangic is not None:
+        metrikler.DB_COMMIT_SURESI.gozlemle(time.perf_counter() - baslangic)
+
+@app.before_request
+def _istek_baslangic():
+    g.istek_baslangic = time.perf_counter()
+
+@app.after_request
+def _istek_bitis(response):
+    baslangic = g.pop('istek_baslangic', None)
+    if baslangic is not None:
+        rota = request.url_rule.rule if request.url_rule else 'bilinmeyen'
+        metot, durum = request.method, response.status_code
+
+        def gozlemle():
+            metrikler.ROTA_SURESI.gozlemle(time.perf_counter() - baslangic, rota=rota, metot=metot, durum=durum)
+        if response.is_streamed:
+            # Akitilan yanitlarda (is_ara_akis, disa_aktar) sure akis bitip yanit kapaninca olculur
+            response.call_on_close(gozlemle)
+        else:
+            gozlemle()
+    return response
+
+if app.config['PROFIL_AKTIF']:
+    profil.profillemeyi_etkinlestir(app)
+
+def _metrik_erisimi_var_mi():
+    token = app.config['METRIK_TOKEN']
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                   f'Bearer {token}'.encode('utf-8'))
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text formatinda metrikler (rota trafigi ve SQL sureleri: herkese acik degil)"""
+    if not _metrik_erisimi_var_mi():
+        return Response('Yetkisiz\n', status=403, mimetype='text/plain')
+    return Response(metrikler.kayit.prometheus_metni(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 def allowed_file(filename):
     """Dosya uzantisini kontrol et"""
@@ -134,10 +247,10 @@ def logout():
 def panel():
     if 'user_id' not in session: return redirect(url_for('login'))
     user_id = session['user_id']
-    cv_sayisi = models.CV.query.filter_by(aday_id=user_id).count()
-    # Sadece kullanicinin buldugu ilanlari say
-    ilan_sayisi = models.IsIlani.query.filter_by(bulan_kullanici_id=user_id).count()
-    return render_template('panel.html', cv_sayisi=cv_sayisi, ilan_sayisi=ilan_sayisi)
+    # Sayaclar kullanici_istatistik tablosundan tek sorguyla okunur (istatistik.py)
+    ozet = istatistik.panel_ozeti(user_id)
+    return render_template('panel.html', cv_sayisi=ozet['toplam']['cv_sayisi'],
+                           ilan_sayisi=ozet['toplam']['ilan_sayisi'], istatistik=ozet)
 
 @app.route('/cv-islemleri', methods=['GET', 'POST'])
 def cv_islemleri():
@@ -171,6 +284,9 @@ def cv_islemleri():
 
                 if not models.CV.query.filter_by(aday_id=user_id, orjinal_dosya_adi=filename).first():
                     db.session.add(models.CV(orjinal_dosya_adi=filename, aday_id=user_id, cikarilan_veriler=analiz))
+                    farklar = istatistik.Farklar()
+                    farklar.cv(user_id)
+                    farklar.uygula(db.session)
                     db.session.commit()
                     logger.info(f"CV yuklendi: {filename} (user_id={user_id})")
                     flash('CV basariyla yuklendi!', 'success')
@@ -190,6 +306,12 @@ def cv_sil(cv_id):
     if cv.aday_id != session['user_id']: abort(403)
 
     try:
+        # Silinecek eslesmeler ve CV istatistiklerden dusulur (ayni transaction)
+        farklar = istatistik.Farklar()
+        farklar.cv_eslesmeleri_silindi(cv)
+        farklar.cv(cv.aday_id, -1)
+        farklar.uygula(db.session)
+
         # Iliskili eslesmeleri sil
         models.Eslesme.query.filter_by(cv_id=cv.id).delete()
 
@@ -209,6 +331,67 @@ def cv_sil(cv_id):
 
     return redirect(url_for('cv_islemleri'))
 
+def _kanonik_ilan_bul(user_id, imza, baslik, sirket):
+    """LSH bant indeksinden aday ilanlari cekip ayni sirketteki, basligi ve imzasi yeterince benzer ilani dondurur"""
+    bantlar = benzerlik.lsh_bantlari(imza)
+    kosullar = [db.and_(models.IlanLshBandi.bant_no == no, models.IlanLshBandi.bant_ozeti == ozet) for no, ozet in bantlar]
+    adaylar = (models.IsIlani.query
+               .join(models.IlanLshBandi, models.IlanLshBandi.is_ilani_id == models.IsIlani.id)
+               .filter(models.IsIlani.bulan_kullanici_id == user_id, db.or_(*kosullar))
+               .distinct().all())
+    en_iyi, en_iyi_skor = None, 0.0
+    for aday in adaylar:
+        skor = benzerlik.kopya_benzerligi(imza, aday.minhash_imzasi, baslik, aday.baslik, sirket, aday.sirket_adi)
+        if skor >= benzerlik.BENZERLIK_ESIGI and skor > en_iyi_skor:
+            en_iyi, en_iyi_skor = aday, skor
+    if en_iyi is not None and en_iyi.kanonik_ilan_id:
+        return en_iyi.kanonik_ilan_id
+    return en_iyi.id if en_iyi is not None else None
+
+def _ilan_kaydet(ilan, user_id):
+    """Arama sonucunu kaydeder. Ayni link varsa None, yakin kopya ise kanonik ilana baglanmis kayit dondurur"""
+    if models.IsIlani.query.filter_by(kaynak_url=ilan['link']).first():
+        return None
+    yeni_ilan = models.IsIlani(
+        baslik=ilan['baslik'],
+        sirket_adi=ilan.get('sirket', 'Belirsiz'),
+        kaynak_url=ilan['link'],
+        kaynak_site=ilan.get('kaynak', 'Web'),
+        aciklama_ozeti=ilan.get('aciklama', ''),
+        bulan_kullanici_id=user_id  # Kullanici iliskisi
+    )
+    imza = benzerlik.minhash_imzasi(ilan['baslik'], ilan.get('sirket', ''), ilan.get('aciklama', ''))
+    if imza:
+        yeni_ilan.minhash_imzasi = imza
+        yeni_ilan.kanonik_ilan_id = _kanonik_ilan_bul(user_id, imza, yeni_ilan.baslik, yeni_ilan.sirket_adi)
+    db.session.add(yeni_ilan)
+    db.session.flush()
+    if imza:
+        db.session.add_all(
+            models.IlanLshBandi(is_ilani_id=yeni_ilan.id, bant_no=no, bant_ozeti=ozet)
+            for no, ozet in benzerlik.lsh_bantlari(imza)
+        )
+    return yeni_ilan
+
+def _ilanlari_kaydet(akis, user_id):
+    """Persist asamasi: ilan_akisi'ndan gelen ilanlari tek tek kaydeder.
+    Yeni kaydedilen IsIlani nesnelerini ve KaynakBitti isaretlerini uretir. Her ilan, uretilmeden once
+    kullanici istatistikleriyle ayni commit'te yazilir: SQLite yazma kilidi diger kaynaklarin ag I/O'su
+    boyunca tutulmaz ve istemciye giden id'ler geri alinamaz."""
+    for olay in akis:
+        if isinstance(olay, functions.KaynakBitti):
+            yield olay
+            continue
+        yeni_ilan = _ilan_kaydet(olay, user_id)
+        if yeni_ilan is None:
+            continue
+        farklar = istatistik.Farklar()
+        farklar.ilan(user_id, yeni_ilan.kaynak_site, kopya=bool(yeni_ilan.kanonik_ilan_id))
+        farklar.uygula(db.session)
+        db.session.commit()
+        yeni_ilan.arama_kaynagi = olay['arama_kaynagi']
+        yield yeni_ilan
+
 @app.route('/is-ara', methods=['GET', 'POST'])
 def is_ara_sayfasi():
     if 'user_id' not in session: return redirect(url_for('login'))
@@ -219,50 +402,308 @@ def is_ara_sayfasi():
         cv = models.CV.query.get(request.form.get('secilen_cv_id'))
         if cv and cv.aday_id == user_id:
             try:
-                sonuclar, err = functions.internette_is_ara(cv.cikarilan_veriler.get('yetenekler', []))
-                if sonuclar:
-                    eklenen = 0
-                    for ilan in sonuclar:
-                        if not models.IsIlani.query.filter_by(kaynak_url=ilan['link']).first():
-                            yeni_ilan = models.IsIlani(
-                                baslik=ilan['baslik'],
-                                sirket_adi=ilan.get('sirket', 'Belirsiz'),
-                                kaynak_url=ilan['link'],
-                                kaynak_site=ilan.get('kaynak', 'Web'),
-                                aciklama_ozeti=ilan.get('aciklama', ''),
-                                bulan_kullanici_id=user_id  # Kullanici iliskisi
-                            )
-                            db.session.add(yeni_ilan)
-                            eklenen += 1
-                    db.session.commit()
-                    logger.info(f"Is arama tamamlandi: {eklenen} yeni ilan (user_id={user_id})")
+                ozet = functions.AramaOzeti()
+                akis = functions.ilan_akisi(cv.cikarilan_veriler.get('yetenekler', []), ozet)
+                eklenen = 0
+                kopya = 0
+                for yeni_ilan in _ilanlari_kaydet(akis, user_id):
+                    if isinstance(yeni_ilan, models.IsIlani):
+                        eklenen += 1
+                        if yeni_ilan.kanonik_ilan_id:
+                            kopya += 1
+                ozet.logla()
+                if ozet.toplam:
+                    logger.info(f"Is arama tamamlandi: {eklenen} yeni ilan, {kopya} yakin kopya (user_id={user_id})")
                     flash(f'{eklenen} yeni is ilani bulundu!', 'success')
                     return redirect(url_for('kaydedilenler'))
                 else:
                     flash('Is ilani bulunamadi.', 'warning')
             except Exception as e:
                 logger.error(f"Is arama hatasi: {e}")
+                db.session.rollback()
                 flash('Arama sirasinda bir hata olustu!', 'danger')
 
     return render_template('is_ara.html', cvler=cvler)
 
+def _ndjson(olay):
+    return json.dumps(olay, ensure_ascii=False) + '\n'
+
+@app.route('/is-ara/akis', methods=['POST'])
+def is_ara_akis():
+    """Arama sonuclarini kaynaklar tamamlandikca NDJSON olarak akitir.
+    Olaylar: 'ilan' (kaydedilen her ilan), 'kaynak' (kaynak tamamlandi), 'ozet' (son olay), 'hata'"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Oturum gerekli'}), 401
+    user_id = session['user_id']
+    cv = models.CV.query.get(request.form.get('secilen_cv_id'))
+    if not cv or cv.aday_id != user_id:
+        return jsonify({'error': 'CV bulunamadı'}), 400
+    yetenekler = (cv.cikarilan_veriler or {}).get('yetenekler', [])
+
+    def olaylar():
+        baslangic = time.perf_counter()
+        ozet = functions.AramaOzeti()
+        kaynaklar = {}
+        eklenen = kopya = 0
+        try:
+            for olay in _ilanlari_kaydet(functions.ilan_akisi(yetenekler, ozet), user_id):
+                if isinstance(olay, functions.KaynakBitti):
+                    yield _ndjson({'tip': 'kaynak', 'kaynak': olay.kaynak, 'bulunan': olay.bulunan,
+                                   'eklenen': kaynaklar.setdefault(olay.kaynak, 0),
+                                   'sure_ms': round(olay.sure * 1000)})
+                    continue
+                eklenen += 1
+                kopya += 1 if olay.kanonik_ilan_id else 0
+                kaynaklar[olay.arama_kaynagi] = kaynaklar.get(olay.arama_kaynagi, 0) + 1
+                yield _ndjson({
+                    'tip': 'ilan', 'id': olay.id, 'baslik': olay.baslik,
+                    'sirket': olay.sirket_adi, 'kaynak': olay.kaynak_site,
+                    'link': olay.kaynak_url, 'kopya': bool(olay.kanonik_ilan_id)
+                })
+        except Exception as e:
+            logger.error(f"Akisli is arama hatasi: {e}")
+            db.session.rollback()
+            yield _ndjson({'tip': 'hata', 'mesaj': 'Arama sirasinda bir hata olustu!'})
+
+        ozet.logla()
+        logger.info(f"Akisli is arama tamamlandi: {eklenen} yeni ilan, {kopya} yakin kopya (user_id={user_id})")
+        yield _ndjson({'tip': 'ozet', 'eklenen': eklenen, 'kopya': kopya, 'kaynaklar': kaynaklar,
+                       'sure_ms': round((time.perf_counter() - baslangic) * 1000)})
+
+    response = Response(stream_with_context(olaylar()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx arabellege almasin
+    return response
+
+# kaydedilenler siralama secenekleri (SQL tarafinda, indeksli kolonlar uzerinden)
+SIRALAMA_KOLONLARI = {
+    'skor': models.Eslesme.skor,
+    'teknik': models.Eslesme.teknik_puan,
+    'deneyim': models.Eslesme.deneyim_puan,
+    'egitim': models.Eslesme.egitim_puan,
+    'dil': models.Eslesme.dil_puan,
+    'sertifika': models.Eslesme.sertifika_puan,
+}
+
+# Sayfaya gomulu CSRF tokeni 1 saat gecerli; onbellekteki sayfa bu sureden once yenilenir
+CSRF_DONEMI_SN = 1800
+
+def _kaydedilenler_surumu(user_id, cvler, sirala):
+    """Ilan havuzu sayfasinin (etag, son_degisiklik) degeri. Kullanicinin ilanlarindan ve ilk CV'nin
+    eslesmelerinden iki toplama sorgusuyla hesaplanir; ilan/eslesme eklenince, silinince ya da
+    guncellenince degisir. Sayfadaki CSRF tokeni oturuma bagli oldugundan oturum anahtari da dahildir
+    (cikis / giris sonrasi eski token'li sayfa 304 ile donmez)."""
+    ilan_sayisi, son_ilan_id, son_ilan = db.session.query(
+        db.func.count(), db.func.max(models.IsIlani.id), db.func.max(models.IsIlani.guncellenme_tarihi)
+    ).filter(models.IsIlani.bulan_kullanici_id == user_id).one()
+    eslesme_sayisi, son_eslesme = 0, None
+    if cvler:
+        eslesme_sayisi, son_eslesme = db.session.query(
+            db.func.count(), db.func.max(models.Eslesme.guncellenme_tarihi)
+        ).filter(models.Eslesme.cv_id == cvler[0].id).one()
+    tarihler = [t for t in (son_ilan, son_eslesme) if t]
+    son_degisiklik = max(tarihler).replace(tzinfo=timezone.utc) if tarihler else None
+    generate_csrf()  # oturumda CSRF anahtari yoksa simdi olusur; sayfa ayni anahtarla cizilir
+    oturum_anahtari = hashlib.sha1(session['csrf_token'].encode('utf-8')).hexdigest()
+    ham = (f"{user_id}|{oturum_anahtari}|{[cv.id for cv in cvler]}|{sirala}|{app.config['ANALIZ_KADEMELI']}|"
+           f"{ilan_sayisi}|{son_ilan_id}|{son_ilan}|{eslesme_sayisi}|{son_eslesme}|{int(time.time() // CSRF_DONEMI_SN)}")
+    return hashlib.sha1(ham.encode('utf-8')).hexdigest(), son_degisiklik
+
+def _degismedi_mi(etag):
+    """Istemcinin onbellekteki kopyasi guncel mi. Sadece If-None-Match bakilir: If-Modified-Since
+    oturum (CSRF) ve siralama farkini goremez, yalniz basina 304 icin yeterli degildir."""
+    return request.if_none_match.contains(etag)
+
+def _onbellek_basliklari(yanit, etag, son_degisiklik):
+    yanit.set_etag(etag)
+    if son_degisiklik:
+        yanit.last_modified = son_degisiklik
+    # Tarayici kopyayi saklar ama her ziyarette sunucuya sorar
+    yanit.headers['Cache-Control'] = 'private, no-cache'
+    return yanit
+
 @app.route('/kaydedilenler')
 def kaydedilenler():
     if 'user_id' not in session: return redirect(url_for('login'))
     user_id = session['user_id']
+    cvler = models.CV.query.filter_by(aday_id=user_id).all()
+    sirala = request.args.get('sirala', 'tarih')
+
+    # Degisiklik yoksa sayfa sorgulari calistirilmaz (bekleyen flash mesaji varsa sayfa yeniden cizilir)
+    etag, son_degisiklik = _kaydedilenler_surumu(user_id, cvler, sirala)
+    if '_flashes' not in session and _degismedi_mi(etag):
+        metrikler.KOSULLU_YANIT.artir(rota='kaydedilenler', sonuc='304')
+        return _onbellek_basliklari(Response(status=304), etag, son_degisiklik)
+    metrikler.KOSULLU_YANIT.artir(rota='kaydedilenler', sonuc='200')
 
     # Sadece kullanicinin buldugu ilanlari goster
-    ilanlar = models.IsIlani.query.filter_by(bulan_kullanici_id=user_id).order_by(models.IsIlani.id.desc()).limit(100).all()
-    cvler = models.CV.query.filter_by(aday_id=user_id).all()
+    sorgu = models.IsIlani.query.filter_by(bulan_kullanici_id=user_id)
+    if cvler and sirala in SIRALAMA_KOLONLARI:
+        sorgu = sorgu.outerjoin(models.Eslesme, db.and_(
+            models.Eslesme.is_ilani_id == models.IsIlani.id, models.Eslesme.cv_id == cvler[0].id
+        )).order_by(SIRALAMA_KOLONLARI[sirala].desc().nullslast(), models.IsIlani.id.desc())
+    else:
+        sorgu = sorgu.order_by(models.IsIlani.id.desc())
+    ilanlar = sorgu.limit(100).all()
 
     puanlar = {}
     analizler = {}
-    if cvler:
-        for e in models.Eslesme.query.filter_by(cv_id=cvler[0].id).all():
+    if cvler and ilanlar:
+        # Sadece sayfadaki ilanlarin (ve kanonik ilanlarinin) puan kolonlari okunur;
+        # analiz detayi satir acildiginda /analiz-detay ile yuklenir
+        ilan_idler = {ilan.id for ilan in ilanlar} | {ilan.kanonik_ilan_id for ilan in ilanlar if ilan.kanonik_ilan_id}
+        sorgu = models.Eslesme.query.options(load_only(
+            models.Eslesme.is_ilani_id, models.Eslesme.skor, models.Eslesme.analiz_seviyesi,
+            *[getattr(models.Eslesme, f'{ad}_puan') for ad in models.ALT_PUANLAR]
+        )).filter(models.Eslesme.cv_id == cvler[0].id, models.Eslesme.is_ilani_id.in_(ilan_idler))
+        eslesmeler = sorgu.all()
+        # Alt puan kolonlari bos (tasinmamis) satirlarin eski JSON'u satir satir degil, tek sorguyla yuklenir
+        eksikler = [e.id for e in eslesmeler if e.teknik_puan is None]
+        if eksikler:
+            models.Eslesme.query.options(load_only(models.Eslesme.eski_analiz_sonucu)).filter(
+                models.Eslesme.id.in_(eksikler)).all()
+        for e in eslesmeler:
             puanlar[e.is_ilani_id] = e.skor
-            analizler[e.is_ilani_id] = e.analiz_sonucu
+            analizler[e.is_ilani_id] = {'alt_puanlar': e.alt_puanlar, 'seviye': e.analiz_seviyesi or 'tam'}
+        # Yakin kopyalar kanonik ilanin analizini gosterir
+        for ilan in ilanlar:
+            if ilan.kanonik_ilan_id in puanlar and ilan.id not in puanlar:
+                puanlar[ilan.id] = puanlar[ilan.kanonik_ilan_id]
+                analizler[ilan.id] = analizler[ilan.kanonik_ilan_id]
+
+    yanit = app.make_response(render_template('kaydedilenler.html', ilanlar=ilanlar, puanlar=puanlar,
+                                              analizler=analizler, cvler=cvler, sirala=sirala,
+                                              kademeli=app.config['ANALIZ_KADEMELI']))
+    return _onbellek_basliklari(yanit, etag, son_degisiklik)
+
+@app.route('/analiz-detay/<int:ilan_id>/<int:cv_id>')
+def analiz_detay(ilan_id, cv_id):
+    """Tek bir eslesmenin tam analizini JSON olarak dondurur (ilan havuzunda satir acilinca yuklenir)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Oturum gerekli'}), 401
+    user_id = session['user_id']
 
-    return render_template('kaydedilenler.html', ilanlar=ilanlar, puanlar=puanlar, analizler=analizler, cvler=cvler)
+    ilan = models.IsIlani.query.get_or_404(ilan_id)
+    cv = models.CV.query.get_or_404(cv_id)
+    if cv.aday_id != user_id or ilan.bulan_kullanici_id != user_id:
+        return jsonify({'error': 'Yetkisiz'}), 403
+
+    # Yakin kopyalar kanonik ilanin analizini gosterir
+    eslesme = models.Eslesme.query.filter_by(cv_id=cv.id, is_ilani_id=ilan.kanonik_ilan_id or ilan.id).first()
+    if eslesme is None:
+        return jsonify({'error': 'Analiz bulunamadı'}), 404
+
+    # Detay kolonu (sikistirilmis JSON) sadece istemcideki kopya eskiyse acilir
+    son_degisiklik = eslesme.guncellenme_tarihi.replace(tzinfo=timezone.utc) if eslesme.guncellenme_tarihi else None
+    etag = hashlib.sha1(f"{eslesme.id}|{eslesme.skor}|{eslesme.guncellenme_tarihi}".encode('utf-8')).hexdigest()
+    if _degismedi_mi(etag):
+        metrikler.KOSULLU_YANIT.artir(rota='analiz_detay', sonuc='304')
+        return _onbellek_basliklari(Response(status=304), etag, son_degisiklik)
+    metrikler.KOSULLU_YANIT.artir(rota='analiz_detay', sonuc='200')
+
+    yanit = jsonify({'ilan_id': ilan.id, 'skor': eslesme.skor, 'seviye': eslesme.analiz_seviyesi or 'tam',
+                     'analiz': eslesme.analiz_sonucu or {}})
+    return _onbellek_basliklari(yanit, etag, son_degisiklik)
+
+@app.route('/disa-aktar/<tur>')
+def disa_aktar(tur):
+    """Kullanicinin ilan / CV / eslesme kayitlarini NDJSON ya da Parquet olarak parca parca akitir"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Oturum gerekli'}), 401
+    bicim = request.args.get('bicim', 'ndjson')
+    parcalar, err = aktarim.disa_aktar(tur, bicim, session['user_id'])
+    if err:
+        return jsonify({'error': err}), 400
+    mimetype, uzanti = aktarim.BICIMLER[bicim]
+    return Response(stream_with_context(parcalar), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={tur}.{uzanti}'})
+
+@app.route('/ice-aktar/<tur>', methods=['POST'])
+def ice_aktar(tur):
+    """Istek govdesindeki NDJSON / Parquet kayitlarini oturumdaki kullaniciya partiler halinde yazar.
+    Buyuk dosyalar icin: python aktarim.py ice ..."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Oturum gerekli'}), 401
+    bicim = request.args.get('bicim', 'ndjson')
+    if bicim == 'parquet':
+        # Parquet dosya sonundaki meta veriyi okur: govde gecici dosyaya yazilir
+        dosya = tempfile.TemporaryFile()
+        shutil.copyfileobj(request.stream, dosya)
+        dosya.seek(0)
+    else:
+        dosya = request.stream
+    try:
+        ozet, err = aktarim.ice_aktar(tur, dosya, bicim, session['user_id'])
+    finally:
+        if bicim == 'parquet':
+            dosya.close()
+    if err:
+        return jsonify({'error': err, 'ozet': ozet}), 400
+    logger.info(f"Ice aktarim ({tur}, user_id={session['user_id']}): {ozet}")
+    return jsonify(ozet)
+
+def _cv_profili(cv):
+    """CV'nin puanlama profilini dondurur; yoksa veya surumu eskiyse uretip kaydeder.
+    CV verisi degisince profil yazma aninda silinir (models._cv_profilini_gecersiz_kil)"""
+    if cv.puanlama_profili is None or cv.puanlama_profili_surumu != functions.PUANLAMA_PROFILI_SURUMU:
+        cv.puanlama_profili, cv.puanlama_profili_token = functions.puanlama_profili_olustur(cv.cikarilan_veriler)
+        cv.puanlama_profili_surumu = functions.PUANLAMA_PROFILI_SURUMU
+        db.session.commit()
+        logger.info(f"Puanlama profili olusturuldu: cv_id={cv.id}, ~{cv.puanlama_profili_token} token")
+    return cv.puanlama_profili
+
+def _ilan_metni_getir(ilan):
+    """Istemde kullanilacak (yogunlastirilmis) ilan metnini dondurur; kayitli degilse sayfayi ceker.
+    Ayni URL'yi ayni anda isteyenler (sekmeler, toplu analiz, diger surecler) tek bir cekmeyi paylasir."""
+    if ilan.gereksinimler_json and ilan.gereksinimler_json.get('full_text'):
+        if not yogunlastirma.guncel_mi(ilan.gereksinimler_json):
+            # Eski kayit: yogunlastirilmis metin bir kez uretilip saklanir
+            ilan.gereksinimler_json = yogunlastirma.ilan_metni_kaydi(ilan.gereksinimler_json['full_text'])
+            db.session.commit()
+        return ilan.gereksinimler_json['yogun_metin']
+
+    def yedek_metin():
+        return f"{ilan.baslik} {ilan.sirket_adi} {ilan.aciklama_ozeti}"
+
+    def cek():
+        # Kaydi yalnizca lider yazar; sayfa alinamazsa baslik/sirket/ozet saklanir
+        metin, _ = functions.url_den_ilan_cek(ilan.kaynak_url)
+        ilan.gereksinimler_json = yogunlastirma.ilan_metni_kaydi(metin or yedek_metin())
+        db.session.commit()
+        return ilan.gereksinimler_json['yogun_metin']
+
+    metin = tek_ucus.ucuslar.yap(tek_ucus.url_anahtari(ilan.kaynak_url), cek,
+                                 db_sonucu=lambda: tek_ucus.kayitli_ilan_metni(ilan.kaynak_url))
+    # Bekleyen taraf paylasilan metni kayda geri yazmaz; eski oturum nesnesi bir sonraki okumada yenilenir
+    db.session.expire(ilan, ['gereksinimler_json'])
+    return metin or yedek_metin()
+
+def _puanla(cv_id, ilan_id, metin, cv_profili):
+    """CV-ilan ciftini puanlayip Eslesme'ye kaydeder. Ayni cift icin es zamanli istekler
+    (cift tiklama, acik toplu analiz) tek LLM cagrisini ve tek kaydi paylasir."""
+    def puanla():
+        sonuc, err = functions.ilani_karsilastir(None, metin, cv_profili)
+        if err:
+            return {'ilan_id': ilan_id, 'success': False, 'error': err}
+        eslesme = models.Eslesme.query.filter_by(cv_id=cv_id, is_ilani_id=ilan_id).first()
+        eski_skor = eslesme.skor if eslesme else None
+        if not eslesme:
+            eslesme = models.Eslesme(cv_id=cv_id, is_ilani_id=ilan_id, skor=0)
+            db.session.add(eslesme)
+        eslesme.skor = sonuc.get('uygunluk_skoru', 0)
+        eslesme.analiz_sonucu = sonuc
+        eslesme.analiz_seviyesi = 'tam'
+        farklar = istatistik.Farklar()
+        farklar.eslesme(models.CV.query.get(cv_id).aday_id, models.IsIlani.query.get(ilan_id).kaynak_site,
+                        eski_skor, eslesme.skor)
+        farklar.uygula(db.session)
+        db.session.commit()
+        return {'ilan_id': ilan_id, 'success': True, 'skor': eslesme.skor, 'seviye': 'tam'}
+
+    # Acik bir kademeli analizin on tarama sonucu tam analiz yerine gecmez
+    return tek_ucus.ucuslar.yap(tek_ucus.puan_anahtari(cv_id, ilan_id), puanla,
+                                db_sonucu=lambda: tek_ucus.kayitli_puan(cv_id, ilan_id),
+                                yeterli=lambda sonuc: sonuc.get('seviye') != 'tarama')
 
 @app.route('/analiz-et/<int:ilan_id>/<int:cv_id>', methods=['POST'])
 def tekil_analiz(ilan_id, cv_id):
@@ -278,34 +719,24 @@ def tekil_analiz(ilan_id, cv_id):
     if ilan.bulan_kullanici_id != user_id:
         abort(403)
 
-    try:
-        metin = ilan.gereksinimler_json.get('full_text') if ilan.gereksinimler_json else None
-        if not metin:
-            metin, _ = functions.url_den_ilan_cek(ilan.kaynak_url)
-            if not metin:
-                metin = f"{ilan.baslik} {ilan.sirket_adi} {ilan.aciklama_ozeti}"
-            ilan.gereksinimler_json = {"full_text": metin}
-            db.session.commit()
+    # Yakin kopya ise kumedeki kanonik ilan analiz edilir
+    if ilan.kanonik_ilan_id:
+        ilan = models.IsIlani.query.get(ilan.kanonik_ilan_id) or ilan
 
-        sonuc, err = functions.ilani_karsilastir(cv.cikarilan_veriler, metin)
-        if not err:
-            eslesme = models.Eslesme.query.filter_by(cv_id=cv.id, is_ilani_id=ilan.id).first()
-            if not eslesme:
-                eslesme = models.Eslesme(cv_id=cv.id, is_ilani_id=ilan.id, skor=0)
-                db.session.add(eslesme)
-            eslesme.skor = sonuc.get('uygunluk_skoru', 0)
-            eslesme.analiz_sonucu = sonuc
-            db.session.commit()
-            logger.info(f"Analiz tamamlandi: ilan_id={ilan_id}, cv_id={cv_id}, skor={eslesme.skor}")
+    try:
+        metin = _ilan_metni_getir(ilan)
+        sonuc = _puanla(cv.id, ilan.id, metin, _cv_profili(cv))
+        if sonuc['success']:
+            logger.info(f"Analiz tamamlandi: ilan_id={ilan_id}, cv_id={cv_id}, skor={sonuc['skor']}")
         else:
-            flash(f'Analiz hatasi: {err}', 'danger')
+            flash(f"Analiz hatasi: {sonuc['error']}", 'danger')
     except Exception as e:
         logger.error(f"Tekil analiz hatasi: {e}")
         flash('Analiz sirasinda bir hata olustu!', 'danger')
 
     return redirect(url_for('kaydedilenler'))
 
-def _tek_ilan_analiz_et(ilan_id, cv_id, cv_verisi, user_id):
+def _tek_ilan_analiz_et(ilan_id, cv_id, cv_profili, user_id):
     """Tek bir ilanı analiz eder (paralel çalışma için)"""
     try:
         with app.app_context():
@@ -313,30 +744,12 @@ def _tek_ilan_analiz_et(ilan_id, cv_id, cv_verisi, user_id):
             if not ilan or ilan.bulan_kullanici_id != user_id:
                 return {'ilan_id': ilan_id, 'success': False, 'error': 'Yetkisiz'}
             
-            # İlan metnini al veya çek
-            metin = ilan.gereksinimler_json.get('full_text') if ilan.gereksinimler_json else None
-            if not metin:
-                metin, _ = functions.url_den_ilan_cek(ilan.kaynak_url)
-                if not metin:
-                    metin = f"{ilan.baslik} {ilan.sirket_adi} {ilan.aciklama_ozeti}"
-                ilan.gereksinimler_json = {"full_text": metin}
-                db.session.commit()
-            
-            # AI analizi yap
-            sonuc, err = functions.ilani_karsilastir(cv_verisi, metin)
-            if err:
-                return {'ilan_id': ilan_id, 'success': False, 'error': err}
-            
-            # Eşleşme kaydet
-            eslesme = models.Eslesme.query.filter_by(cv_id=cv_id, is_ilani_id=ilan.id).first()
-            if not eslesme:
-                eslesme = models.Eslesme(cv_id=cv_id, is_ilani_id=ilan.id, skor=0)
-                db.session.add(eslesme)
-            eslesme.skor = sonuc.get('uygunluk_skoru', 0)
-            eslesme.analiz_sonucu = sonuc
-            db.session.commit()
-            
-            return {'ilan_id': ilan_id, 'success': True, 'skor': eslesme.skor, 'baslik': ilan.baslik}
+            # İlan metnini al veya çek, sonra AI analizi yap
+            metin = _ilan_metni_getir(ilan)
+            sonuc = _puanla(cv_id, ilan.id, metin, cv_profili)
+            if not sonuc['success']:
+                return sonuc
+            return {**sonuc, 'baslik': ilan.baslik}
     except Exception as e:
         logger.error(f"Paralel analiz hatası (ilan_id={ilan_id}): {e}")
         return {'ilan_id': ilan_id, 'success': False, 'error': str(e)}
@@ -353,8 +766,8 @@ def toplu_analiz():
     if not cv:
         return jsonify({'error': 'CV bulunamadı'}), 400
     
-    # Analiz edilmemiş ilanları bul
-    ilanlar = models.IsIlani.query.filter_by(bulan_kullanici_id=user_id).all()
+    # Analiz edilmemiş ilanları bul (yakın kopyalar atlanır, kanonik ilan analiz edilir)
+    ilanlar = models.IsIlani.query.filter_by(bulan_kullanici_id=user_id, kanonik_ilan_id=None).all()
     mevcut_analizler = {e.is_ilani_id for e in models.Eslesme.query.filter_by(cv_id=cv.id).all()}
     
     analiz_edilecek = [ilan for ilan in ilanlar if ilan.id not in mevcut_analizler]
@@ -362,29 +775,42 @@ def toplu_analiz():
     if not analiz_edilecek:
         return jsonify({'message': 'Tüm ilanlar zaten analiz edilmiş', 'toplam': 0, 'basarili': 0})
     
-    sonuclar = []
-    basarili = 0
+    # CV profili bir kez hazirlanir, tum ilan istemlerinde ayni metin kullanilir
+    cv_profili = _cv_profili(cv)
+    
+    # Istek govdesindeki 'kademeli' ayari varsayilani ezer; kademeli analiz her zaman async motorda calisir
+    kademeli = (request.get_json(silent=True) or {}).get('kademeli', app.config['ANALIZ_KADEMELI'])
+    kademe = {'esik': app.config['KADEME_ESIK'], 'ust_k': app.config['KADEME_UST_K']} if kademeli else None
+    kademeler = {}
     
-    # Paralel analiz - max 5 thread ile
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {
-            executor.submit(_tek_ilan_analiz_et, ilan.id, cv.id, cv.cikarilan_veriler, user_id): ilan
-            for ilan in analiz_edilecek
-        }
-        
-        for future in as_completed(futures):
-            sonuc = future.result()
-            sonuclar.append(sonuc)
-            if sonuc.get('success'):
-                basarili += 1
+    if kademe or app.config['ANALIZ_MOTORU'] == 'async':
+        # Tek olay dongusu: cekme ve Gemini istekleri ayri semaforlarla, yazimlar tek yazicidan
+        sonuclar = analiz_motoru.toplu_analiz_et(app, cv.id, cv_profili, analiz_edilecek,
+                                                 cekme_limiti=app.config['ANALIZ_CEKME_LIMITI'],
+                                                 llm_limiti=app.config['ANALIZ_LLM_LIMITI'],
+                                                 kademe=kademe, kademe_raporu=kademeler)
+    else:
+        # Paralel analiz - max 5 thread ile
+        sonuclar = []
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = {
+                executor.submit(_tek_ilan_analiz_et, ilan.id, cv.id, cv_profili, user_id): ilan
+                for ilan in analiz_edilecek
+            }
+            for future in as_completed(futures):
+                sonuclar.append(future.result())
+    basarili = sum(1 for sonuc in sonuclar if sonuc.get('success'))
     
     logger.info(f"Toplu analiz tamamlandi: {basarili}/{len(analiz_edilecek)} basarili (user_id={user_id})")
+    if kademeler:
+        logger.info(f"Toplu analiz kademeleri: {kademeler}")
     
     return jsonify({
         'message': f'{basarili} ilan başarıyla analiz edildi',
         'toplam': len(analiz_edilecek),
         'basarili': basarili,
-        'sonuclar': sonuclar
+        'sonuclar': sonuclar,
+        'kademeler': kademeler
     })
 
 # Hata sayfalari
@@ -0,0 +1,91 @@
+"""Baslangic (import) suresi butce kontrolu.
+
+Kullanim:
+    python -m benchmark.baslangic                  # varsayilan butceler
+    python -m benchmark.baslangic --butce-ms 500 --tekrar 7
+
+'python -X importtime -c "import app"' komutunu ayri sureclerde calistirir, modul basina
+birikimli import suresinin medyanini raporlar. Su durumlarda 1 ile cikar:
+  - app ya da functions importu butceyi asarsa
+  - tembel yuklenmesi gereken agir bir bagimlilik (fitz, docx, bs4, ...) importta yuklenirse
+"""
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+BENCH_DIZINI = os.path.dirname(os.path.abspath(__file__))
+PROJE_DIZINI = os.path.dirname(BENCH_DIZINI)
+
+# Modul -> varsayilan birikimli import butcesi (ms)
+VARSAYILAN_BUTCELER = {'app': 800, 'functions': 60}
+
+# 'import app' sirasinda yuklenmemesi gereken moduller (ilk kullanimda yuklenirler)
+TEMBEL_MODULLER = ('fitz', 'pymupdf', 'docx', 'bs4', 'duckduckgo_search', 'requests', 'httpx')
+
+
+def _importtime_olc(db_yolu):
+    """Tek bir 'import app' calistirir; {modul: birikimli_us} ve yuklenen tembel modulleri dondurur"""
+    ortam = dict(os.environ, DATABASE_URL='sqlite:///' + db_yolu, ON_YUKLE='')
+    kod = ('import sys, app; '
+           f'print(",".join(m for m in {TEMBEL_MODULLER!r} if m in sys.modules))')
+    sonuc = subprocess.run([sys.executable, '-X', 'importtime', '-c', kod], cwd=PROJE_DIZINI, env=ortam,
+                           capture_output=True, text=True, check=True)
+    sureler = {}
+    for satir in sonuc.stderr.splitlines():
+        if not satir.startswith('import time:') or '|' not in satir:
+            continue
+        _, birikimli, ad = satir.split('|')
+        try:
+            sureler[ad.strip()] = int(birikimli)
+        except ValueError:
+            continue  # baslik satiri
+    yuklenen = [m for m in sonuc.stdout.strip().splitlines()[-1].split(',') if m] if sonuc.stdout.strip() else []
+    return sureler, yuklenen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import suresi butce kontrolu')
+    parser.add_argument('--tekrar', type=int, default=5)
+    parser.add_argument('--butce-ms', type=float, default=VARSAYILAN_BUTCELER['app'], help="'import app' butcesi")
+    parser.add_argument('--functions-butce-ms', type=float, default=VARSAYILAN_BUTCELER['functions'])
+    parser.add_argument('--en-yavas', type=int, default=10, help='Raporlanacak en yavas modul sayisi')
+    args = parser.parse_args(argv)
+
+    olcumler, yuklenenler = [], set()
+    with tempfile.TemporaryDirectory(prefix='bench_import_') as gecici:
+        db_yolu = os.path.join(gecici, 'proje.db')
+        _importtime_olc(db_yolu)  # ilk calisma: sema olusturma ve .pyc derleme olcume girmesin
+        for _ in range(args.tekrar):
+            sureler, yuklenen = _importtime_olc(db_yolu)
+            olcumler.append(sureler)
+            yuklenenler.update(yuklenen)
+
+    def medyan_ms(modul):
+        degerler = [o[modul] for o in olcumler if modul in o]
+        return round(median(degerler) / 1000, 1) if degerler else None
+
+    modul_adlari = {ad for o in olcumler for ad in o}
+    en_yavaslar = sorted(((medyan_ms(ad), ad) for ad in modul_adlari if ad != 'app'), reverse=True)
+    print(f"En yavas {args.en_yavas} modul (birikimli, medyan):")
+    for sure, ad in en_yavaslar[:args.en_yavas]:
+        print(f"  {sure:8.1f} ms  {ad}")
+
+    hatalar = []
+    for modul, butce in (('app', args.butce_ms), ('functions', args.functions_butce_ms)):
+        sure = medyan_ms(modul)
+        print(f"{modul}: {sure} ms (butce {butce} ms)")
+        if sure is not None and sure > butce:
+            hatalar.append(f"'{modul}' importu butceyi asti: {sure} ms > {butce} ms")
+    if yuklenenler:
+        hatalar.append(f"Tembel yuklenmesi gereken moduller importta yuklendi: {', '.join(sorted(yuklenenler))}")
+
+    for hata in hatalar:
+        print(f"BUTCE ASIMI: {hata}")
+    return 1 if hatalar else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
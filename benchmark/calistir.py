@@ -0,0 +1,287 @@
+"""Cevrimdisi benchmark calistirici.
+
+Kullanim:
+    python -m benchmark.calistir                       # tum senaryolar
+    python -m benchmark.calistir --senaryo kaydedilenler panel --tekrar 50
+    python -m benchmark.calistir --gemini-gecikme 0.2 --gemini-429 0.1
+    python -m benchmark.calistir --karsilastir son     # son kayitli sonucla karsilastir
+
+Her senaryo ayri bir surecte, sentetik veritabaninin bir kopyasi uzerinde calisir;
+boylece tepe RSS olcumu senaryoya ozel olur ve senaryolar birbirini etkilemez.
+Sonuclar benchmark/sonuclar/ altina commit hash'i ile birlikte JSON olarak yazilir.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+BENCH_DIZINI = os.path.dirname(os.path.abspath(__file__))
+PROJE_DIZINI = os.path.dirname(BENCH_DIZINI)
+SONUC_DIZINI = os.path.join(BENCH_DIZINI, 'sonuclar')
+VARSAYILAN_DB = os.path.join(BENCH_DIZINI, '.veri', 'bench.db')
+
+# senaryo -> varsayilan tekrar sayisi
+SENARYOLAR = {
+    'is_ara': 3,
+    'toplu_analiz': 3,
+    'kademeli_analiz': 3,
+    'kaydedilenler': 30,
+    'panel': 50,
+    'cv_yukle': 10,
+}
+
+
+def _yuzdelik(degerler, oran):
+    sirali = sorted(degerler)
+    if not sirali:
+        return None
+    indeks = min(len(sirali) - 1, max(0, round(oran * (len(sirali) - 1))))
+    return sirali[indeks]
+
+
+def _tepe_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    tepe = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt
+    return round(tepe / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _ornek_pdf(metin):
+    import fitz
+    with fitz.open() as belge:
+        sayfa = belge.new_page()
+        sayfa.insert_text((72, 72), metin, fontsize=10)
+        return belge.tobytes()
+
+
+# ========== Senaryo sureci ==========
+
+def _senaryo_calistir(ad, db_yolu, tekrar, gemini_gecikme, gemini_429):
+    """Tek bir senaryoyu bu surecte calistirir ve olcumleri dict olarak dondurur"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(db_yolu)
+    logging.disable(logging.INFO)
+
+    from benchmark import stub_sunucu
+    stub = stub_sunucu.StubSunucu(gemini_gecikme=gemini_gecikme, gemini_429_orani=gemini_429).baslat()
+    geri_al = stub_sunucu.istekleri_yonlendir(stub)
+
+    import functions
+    functions.DDGS = stub_sunucu.KayitliDDGS
+    functions.API_KEY = 'benchmark'
+    from app import app, semayi_hazirla
+    from extensions import db
+    import models
+    from benchmark.veri_uret import BENCH_EMAIL
+    semayi_hazirla()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    if ad == 'kademeli_analiz':
+        # Esik 0: taranan her ilan tam analize yukseltilmeli
+        app.config['KADEME_ESIK'] = 0
+        app.config['KADEME_UST_K'] = 10 ** 6
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='bench_upload_')
+    istemci = app.test_client()
+
+    with app.app_context():
+        kullanici = models.Kullanici.query.filter_by(email=BENCH_EMAIL).first()
+        user_id = kullanici.id
+        cv_id = models.CV.query.filter_by(aday_id=user_id).order_by(models.CV.id).first().id
+        son_ilan_id = db.session.query(db.func.max(models.IsIlani.id)).scalar() or 0
+    with istemci.session_transaction() as oturum:
+        oturum['user_id'] = user_id
+
+    def hazirla():
+        if ad == 'is_ara':
+            with app.app_context():
+                yeni = db.select(models.IsIlani.id).where(models.IsIlani.id > son_ilan_id)
+                models.IlanLshBandi.query.filter(models.IlanLshBandi.is_ilani_id.in_(yeni)).delete(synchronize_session=False)
+                models.IsIlani.query.filter(models.IsIlani.id > son_ilan_id).delete(synchronize_session=False)
+                db.session.commit()
+        elif ad in ('toplu_analiz', 'kademeli_analiz'):
+            with app.app_context():
+                models.Eslesme.query.filter_by(cv_id=cv_id).delete()
+                db.session.commit()
+
+    def yukseltilmeyenler(yanit):
+        """Kademeli analizde tam analize yukseltilmesi gerekip yanitta ya da veritabaninda
+        'tarama' olarak kalan ilan sayisi"""
+        if ad != 'kademeli_analiz':
+            return 0
+        sonuclar = (yanit.get_json(silent=True) or {}).get('sonuclar', [])
+        yanitta = {s['ilan_id'] for s in sonuclar if s.get('success') and s.get('seviye') != 'tam'}
+        with app.app_context():
+            db_de = {e.is_ilani_id for e in models.Eslesme.query.filter(
+                models.Eslesme.cv_id == cv_id, db.or_(models.Eslesme.analiz_seviyesi.is_(None),
+                                                      models.Eslesme.analiz_seviyesi != 'tam'))}
+        return len(yanitta | db_de)
+
+    def calistir(i):
+        if ad == 'is_ara':
+            return istemci.post('/is-ara', data={'secilen_cv_id': cv_id})
+        if ad == 'toplu_analiz':
+            return istemci.post('/toplu-analiz')
+        if ad == 'kademeli_analiz':
+            return istemci.post('/toplu-analiz', json={'kademeli': True})
+        if ad == 'kaydedilenler':
+            return istemci.get('/kaydedilenler')
+        if ad == 'panel':
+            return istemci.get('/panel')
+        if ad == 'cv_yukle':
+            pdf = _ornek_pdf(f"Aday {i}\nPython, Django, PostgreSQL, Docker\n3 yil deneyim")
+            from io import BytesIO
+            return istemci.post('/cv-islemleri', data={'cv': (BytesIO(pdf), f'bench_cv_{i}.pdf')},
+                                content_type='multipart/form-data')
+        raise ValueError(f"Bilinmeyen senaryo: {ad}")
+
+    sureler, hatali, yukseltilmeyen = [], 0, 0
+    toplam_baslangic = time.perf_counter()
+    for i in range(tekrar):
+        hazirla()
+        baslangic = time.perf_counter()
+        yanit = calistir(i)
+        sureler.append(time.perf_counter() - baslangic)
+        if yanit.status_code >= 400:
+            hatali += 1
+        yukseltilmeyen += yukseltilmeyenler(yanit)
+    toplam = time.perf_counter() - toplam_baslangic
+
+    geri_al()
+    stub.durdur()
+    return {
+        'senaryo': ad,
+        'tekrar': tekrar,
+        'hatali': hatali,
+        'p50_ms': round(_yuzdelik(sureler, 0.50) * 1000, 2),
+        'p95_ms': round(_yuzdelik(sureler, 0.95) * 1000, 2),
+        'ortalama_ms': round(sum(sureler) / len(sureler) * 1000, 2),
+        'verim_istek_sn': round(tekrar / sum(sureler), 2) if sum(sureler) else None,
+        'toplam_sn': round(toplam, 2),
+        'tepe_rss_mb': _tepe_rss_mb(),
+        'stub_istekleri': stub.istek_sayilari,
+        'yukseltilmeyen': yukseltilmeyen,
+    }
+
+
+# ========== Ana surec ==========
+
+def _commit_bilgisi():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJE_DIZINI,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'bilinmiyor'
+
+
+def _son_sonuc_dosyasi():
+    dosyalar = sorted(glob.glob(os.path.join(SONUC_DIZINI, '*.json')))
+    return dosyalar[-1] if dosyalar else None
+
+
+def karsilastir(onceki, simdiki, esik):
+    """Iki sonuc dosyasini karsilastirir; esigi asan p95 gerilemelerinin listesini dondurur"""
+    onceki_senaryolar = {s['senaryo']: s for s in onceki['senaryolar']}
+    gerilemeler = []
+    print(f"\nKarsilastirma: {onceki['commit']} -> {simdiki['commit']}")
+    for s in simdiki['senaryolar']:
+        o = onceki_senaryolar.get(s['senaryo'])
+        if not o:
+            continue
+        satir = [s['senaryo'].ljust(14)]
+        for alan in ('p50_ms', 'p95_ms', 'verim_istek_sn', 'tepe_rss_mb'):
+            if o.get(alan) and s.get(alan) is not None:
+                degisim = (s[alan] - o[alan]) / o[alan]
+                satir.append(f"{alan}={s[alan]} ({degisim:+.1%})")
+                if alan == 'p95_ms' and degisim > esik:
+                    gerilemeler.append((s['senaryo'], degisim))
+        print('  '.join(satir))
+    return gerilemeler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cevrimdisi benchmark')
+    parser.add_argument('--senaryo', nargs='+', choices=list(SENARYOLAR), default=list(SENARYOLAR))
+    parser.add_argument('--tekrar', type=int, help='Tum senaryolar icin tekrar sayisi')
+    parser.add_argument('--db', default=VARSAYILAN_DB, help='Sentetik veritabani (yoksa uretilir)')
+    parser.add_argument('--kullanici', type=int, default=1000)
+    parser.add_argument('--ilan', type=int, default=10000)
+    parser.add_argument('--gemini-gecikme', type=float, default=0.05, help='Sahte Gemini gecikmesi (sn)')
+    parser.add_argument('--gemini-429', type=float, default=0.0, help='Sahte Gemini 429 orani (0-1)')
+    parser.add_argument('--karsilastir', help="Karsilastirilacak sonuc dosyasi ya da 'son'")
+    parser.add_argument('--esik', type=float, default=0.20, help='p95 gerileme esigi (0.20 = %%20)')
+    parser.add_argument('--kaydetme', action='store_true', help='Sonucu dosyaya yazma')
+    parser.add_argument('--tek-senaryo', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.tek_senaryo:
+        sonuc = _senaryo_calistir(args.tek_senaryo, args.db, args.tekrar or SENARYOLAR[args.tek_senaryo],
+                                  args.gemini_gecikme, args.gemini_429)
+        print(json.dumps(sonuc))
+        return 0
+
+    if not os.path.exists(args.db):
+        os.makedirs(os.path.dirname(args.db), exist_ok=True)
+        print(f"Sentetik veritabani uretiliyor: {args.db}")
+        subprocess.check_call([sys.executable, '-m', 'benchmark.veri_uret', args.db,
+                               '--kullanici', str(args.kullanici), '--ilan', str(args.ilan)], cwd=PROJE_DIZINI)
+
+    onceki_dosya = _son_sonuc_dosyasi() if args.karsilastir == 'son' else args.karsilastir
+
+    senaryolar = []
+    for ad in args.senaryo:
+        with tempfile.TemporaryDirectory(prefix='bench_') as gecici:
+            kopya = os.path.join(gecici, 'proje.db')
+            shutil.copyfile(args.db, kopya)
+            komut = [sys.executable, '-m', 'benchmark.calistir', '--tek-senaryo', ad, '--db', kopya,
+                     '--gemini-gecikme', str(args.gemini_gecikme), '--gemini-429', str(args.gemini_429)]
+            if args.tekrar:
+                komut += ['--tekrar', str(args.tekrar)]
+            cikti = subprocess.check_output(komut, cwd=PROJE_DIZINI, text=True)
+            sonuc = json.loads(cikti.strip().splitlines()[-1])
+        senaryolar.append(sonuc)
+        print(f"{ad.ljust(14)} p50={sonuc['p50_ms']}ms p95={sonuc['p95_ms']}ms "
+              f"verim={sonuc['verim_istek_sn']}/sn rss={sonuc['tepe_rss_mb']}MB hatali={sonuc['hatali']}")
+
+    rapor = {
+        'commit': _commit_bilgisi(),
+        'tarih': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'ayarlar': {'gemini_gecikme': args.gemini_gecikme, 'gemini_429': args.gemini_429,
+                    'db': os.path.basename(args.db)},
+        'senaryolar': senaryolar,
+    }
+    if not args.kaydetme:
+        os.makedirs(SONUC_DIZINI, exist_ok=True)
+        dosya = os.path.join(SONUC_DIZINI, f"{datetime.now():%Y%m%d-%H%M%S}_{rapor['commit']}.json")
+        with open(dosya, 'w', encoding='utf-8') as f:
+            json.dump(rapor, f, ensure_ascii=False, indent=2)
+        print(f"Sonuclar kaydedildi: {dosya}")
+
+    # Kademeli analizde tam analize yukseltilmeyen ilan kalmamali
+    dogrulama_hatasi = False
+    for s in senaryolar:
+        if s.get('yukseltilmeyen'):
+            print(f"HATA: {s['senaryo']} {s['yukseltilmeyen']} ilan tam analize yukseltilmedi")
+            dogrulama_hatasi = True
+
+    if onceki_dosya:
+        with open(onceki_dosya, encoding='utf-8') as f:
+            gerilemeler = karsilastir(json.load(f), rapor, args.esik)
+        if gerilemeler:
+            for ad, degisim in gerilemeler:
+                print(f"GERILEME: {ad} p95 {degisim:+.1%}")
+            return 1
+    return 1 if dogrulama_hatasi else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""Yakin kopya ilan tespiti regresyon kontrolu.
+
+Kullanim:
+    python -m benchmark.kopya
+
+Bilinen ilan ciftlerini benzerlik.kopya_benzerligi ile puanlar. Kopya olmayan bir cift
+BENZERLIK_ESIGI'ni gecerse ya da gercek bir kopya esigin altinda kalirsa 1 ile cikar.
+Kopya sayilan ilan toplu analizde atlanir ve kanonik ilanin puanini gosterir; yanlis
+pozitifler kullaniciya baska bir isin puanini gosterir.
+"""
+import sys
+
+import benzerlik
+
+_ACIKLAMA = 'Django ve PostgreSQL ile REST servisleri gelistirecek, Docker ve AWS deneyimli takim arkadasi ariyoruz'
+
+# (ilan_a, ilan_b, kopya_mi); ilan = (baslik, sirket, aciklama)
+CIFTLER = [
+    (('Backend Developer', 'Acme', ''), ('Frontend Developer', 'Acme', ''), False),
+    (('Backend Developer', 'Acme', _ACIKLAMA), ('Frontend Developer', 'Acme', _ACIKLAMA), False),
+    (('Senior Python Backend Developer', 'Acme Yazilim', ''),
+     ('Senior Python Backend Developer', 'Globex Teknoloji', ''), False),
+    (('Senior Python Backend Developer', 'Acme Yazilim', _ACIKLAMA),
+     ('Senior Python Backend Developer', 'Globex Teknoloji', _ACIKLAMA), False),
+    (('Python Developer - LinkedIn', 'Acme', _ACIKLAMA), ('Python Developer | Kariyer.net', 'Acme', _ACIKLAMA), True),
+    (('Senior Python Developer', 'Acme', _ACIKLAMA), ('Senior Python Developer', 'Acme Yazılım A.Ş.', _ACIKLAMA), True),
+    (('Senior Python Developer', 'Bing Search', _ACIKLAMA), ('Senior Python Developer', 'Acme', _ACIKLAMA), True),
+]
+
+
+def main():
+    hatalar = 0
+    for ilan_a, ilan_b, kopya_mi in CIFTLER:
+        skor = benzerlik.kopya_benzerligi(benzerlik.minhash_imzasi(*ilan_a), benzerlik.minhash_imzasi(*ilan_b),
+                                          ilan_a[0], ilan_b[0], ilan_a[1], ilan_b[1])
+        dogru = (skor >= benzerlik.BENZERLIK_ESIGI) == kopya_mi
+        hatalar += not dogru
+        print(f"{'OK  ' if dogru else 'HATA'} {skor:.3f} {'kopya' if kopya_mi else 'farkli'}: "
+              f"{ilan_a[0]} @ {ilan_a[1]} / {ilan_b[0]} @ {ilan_b[1]}")
+    print(f"{hatalar} hatali cift")
+    return 1 if hatalar else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Cevrimdisi benchmark icin yerel HTTP sunucusu.
+
+internette_is_ara kaynaklarinin kayitli HTML/JSON yanitlarini, ilan sayfalarini ve
+ayarlanabilir gecikme / 429 oranina sahip sahte bir Gemini uc noktasini sunar.
+Disariya giden tum requests ve httpx istekleri `istekleri_yonlendir` ile bu sunucuya cevrilir.
+"""
+import os
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+KAYIT_DIZINI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kayitlar')
+
+# host -> (kayit dosyasi, content-type)
+KAYNAK_KAYITLARI = {
+    'www.linkedin.com': ('linkedin.html', 'text/html; charset=utf-8'),
+    'tr.indeed.com/jobs': ('indeed.html', 'text/html; charset=utf-8'),
+    'www.arbeitnow.com/api': ('arbeitnow.json', 'application/json'),
+    'remotive.com/api': ('remotive.json', 'application/json'),
+    'himalayas.app/jobs/api': ('himalayas.json', 'application/json'),
+    'findwork.dev/api': ('findwork.json', 'application/json'),
+    'www.bing.com': ('bing.html', 'text/html; charset=utf-8'),
+}
+ILAN_KAYDI = ('ilan.html', 'text/html; charset=utf-8')
+GEMINI_HOST = 'generativelanguage.googleapis.com'
+
+
+def _kayit_oku(dosya):
+    with open(os.path.join(KAYIT_DIZINI, dosya), 'rb') as f:
+        return f.read()
+
+
+def sahte_deger(sema, rastgele):
+    """Gemini responseSchema'sina uyan deterministik sahte deger uretir"""
+    tip = sema.get('type')
+    if tip == 'OBJECT':
+        return {ad: sahte_deger(alt, rastgele) for ad, alt in sema.get('properties', {}).items()}
+    if tip == 'ARRAY':
+        return [sahte_deger(sema.get('items', {'type': 'STRING'}), rastgele) for _ in range(3)]
+    if tip == 'INTEGER':
+        return rastgele.randint(31, 97)
+    if tip == 'NUMBER':
+        return round(rastgele.uniform(0, 100), 2)
+    if tip == 'BOOLEAN':
+        return rastgele.random() < 0.5
+    return "Örnek değer " + str(rastgele.randint(1, 999))
+
+
+class StubSunucu:
+    """Arka planda calisan stub sunucu. Ayarlar calisirken degistirilebilir."""
+
+    def __init__(self, gemini_gecikme=0.0, gemini_429_orani=0.0, kaynak_gecikme=0.0, tohum=42):
+        self.gemini_gecikme = gemini_gecikme
+        self.gemini_429_orani = gemini_429_orani
+        self.kaynak_gecikme = kaynak_gecikme
+        self._rastgele = random.Random(tohum)
+        self._kilit = threading.Lock()
+        self._onbellek = {}
+        self.istek_sayilari = {}
+        self._sunucu = ThreadingHTTPServer(('127.0.0.1', 0), self._isleyici_sinifi())
+        self._sunucu.daemon_threads = True
+        self._is_parcacigi = None
+
+    @property
+    def port(self):
+        return self._sunucu.server_address[1]
+
+    def baslat(self):
+        self._is_parcacigi = threading.Thread(target=self._sunucu.serve_forever, daemon=True)
+        self._is_parcacigi.start()
+        return self
+
+    def durdur(self):
+        self._sunucu.shutdown()
+        self._sunucu.server_close()
+
+    def _say(self, anahtar):
+        with self._kilit:
+            self.istek_sayilari[anahtar] = self.istek_sayilari.get(anahtar, 0) + 1
+
+    def _govde(self, dosya):
+        if dosya not in self._onbellek:
+            self._onbellek[dosya] = _kayit_oku(dosya)
+        return self._onbellek[dosya]
+
+    def _gemini_yaniti(self, istek_govdesi):
+        with self._kilit:
+            kisitla = self._rastgele.random() < self.gemini_429_orani
+            tohum = self._rastgele.randrange(1 << 30)
+        if self.gemini_gecikme:
+            time.sleep(self.gemini_gecikme)
+        if kisitla:
+            govde = {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                               "status": "RESOURCE_EXHAUSTED"}}
+            return 429, 'application/json', json.dumps(govde).encode('utf-8')
+        istek = json.loads(istek_govdesi or b'{}')
+        sema = istek.get('generationConfig', {}).get('responseSchema', {'type': 'OBJECT'})
+        metin = json.dumps(sahte_deger(sema, random.Random(tohum)), ensure_ascii=False)
+        govde = {"candidates": [{"content": {"parts": [{"text": metin}], "role": "model"}, "finishReason": "STOP"}]}
+        return 200, 'application/json', json.dumps(govde, ensure_ascii=False).encode('utf-8')
+
+    def yanit_uret(self, hedef, istek_govdesi=None):
+        """hedef: 'host/yol' bicimindeki orijinal adres"""
+        host = hedef.split('/', 1)[0]
+        if host == GEMINI_HOST:
+            self._say('gemini')
+            return self._gemini_yaniti(istek_govdesi)
+        if self.kaynak_gecikme:
+            time.sleep(self.kaynak_gecikme)
+        for onek, (dosya, tip) in KAYNAK_KAYITLARI.items():
+            if hedef.startswith(onek):
+                self._say(onek)
+                return 200, tip, self._govde(dosya)
+        self._say('ilan')
+        dosya, tip = ILAN_KAYDI
+        return 200, tip, self._govde(dosya)
+
+    def _isleyici_sinifi(self):
+        stub = self
+
+        class Isleyici(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _cevapla(self):
+                uzunluk = int(self.headers.get('Content-Length') or 0)
+                govde = self.rfile.read(uzunluk) if uzunluk else None
+                hedef = self.path[len('/h/'):] if self.path.startswith('/h/') else self.path.lstrip('/')
+                durum, tip, cevap = stub.yanit_uret(hedef, govde)
+                self.send_response(durum)
+                self.send_header('Content-Type', tip)
+                self.send_header('Content-Length', str(len(cevap)))
+                self.end_headers()
+                self.wfile.write(cevap)
+
+            do_GET = _cevapla
+            do_POST = _cevapla
+
+            def log_message(self, *args):
+                pass
+
+        return Isleyici
+
+
+def istekleri_yonlendir(stub):
+    """requests ve httpx (asenkron) ile yapilan tum HTTP(S) isteklerini stub sunucuya cevirir.
+    Geri alma fonksiyonu dondurur."""
+    orijinal_send = requests.adapters.HTTPAdapter.send
+    orijinal_async = httpx.AsyncHTTPTransport.handle_async_request
+    taban = f"http://127.0.0.1:{stub.port}/h/"
+
+    def yonlendir(url):
+        parca = urlsplit(url)
+        if parca.hostname == '127.0.0.1':
+            return url
+        return taban + parca.netloc + parca.path + (f"?{parca.query}" if parca.query else '')
+
+    def send(adapter, istek, **kwargs):
+        istek.url = yonlendir(istek.url)
+        return orijinal_send(adapter, istek, **kwargs)
+
+    async def handle_async_request(transport, istek):
+        istek.url = httpx.URL(yonlendir(str(istek.url)))
+        return await orijinal_async(transport, istek)
+
+    requests.adapters.HTTPAdapter.send = send
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+
+    def geri_al():
+        requests.adapters.HTTPAdapter.send = orijinal_send
+        httpx.AsyncHTTPTransport.handle_async_request = orijinal_async
+
+    return geri_al
+
+
+class KayitliDDGS:
+    """duckduckgo_search.DDGS yerine kayitli sonuclari donduren sinif"""
+
+    def __init__(self, *args, **kwargs):
+        with open(os.path.join(KAYIT_DIZINI, 'ddg.json'), encoding='utf-8') as f:
+            self._sonuclar = json.load(f)
+
+    def text(self, sorgu, region=None, max_results=10, backend=None):
+        site = sorgu.split('site:', 1)[1].split()[0] if 'site:' in sorgu else ''
+        return [s for s in self._sonuclar if site in s['href']][:max_results]
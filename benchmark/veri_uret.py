@@ -0,0 +1,156 @@
+"""Sentetik proje.db uretici.
+
+Kullanim:
+    python -m benchmark.veri_uret hedef.db --kullanici 2000 --ilan 20000
+
+Binlerce Kullanici, CV, IsIlani ve Eslesme satiri uretir. Ilk kullanici
+(bench@ornek.com) benchmark senaryolarinda kullanilan "yogun" kullanicidir.
+"""
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+BENCH_EMAIL = 'bench@ornek.com'
+BENCH_PAROLA = 'Benchmark123'
+
+YETENEKLER = ['Python', 'Django', 'Flask', 'PostgreSQL', 'Docker', 'Kubernetes', 'React', 'Java', 'Spring',
+              'AWS', 'Redis', 'Git', 'Linux', 'TypeScript', 'Go', 'C#', '.NET', 'SQL', 'Pandas', 'TensorFlow']
+POZISYONLAR = ['Python Developer', 'Backend Developer', 'Data Engineer', 'Full Stack Developer', 'DevOps Engineer',
+               'Yazılım Geliştirici', 'Machine Learning Engineer', 'Java Developer', 'Frontend Developer']
+SIRKETLER = ['Acme Teknoloji', 'Veri Yazılım', 'Bulut Sistemleri', 'Mavi Fintech', 'Kuzey Oyun', 'Delta Lojistik',
+             'Pixel Medya', 'Orion Savunma', 'Atlas Bankacılık', 'Nova Sağlık']
+KAYNAKLAR = ['LinkedIn', 'Indeed', 'Arbeitnow', 'Remotive', 'Himalayas', 'FindWork.dev', 'Kariyer.net',
+             'Glassdoor', 'LinkedIn (Bing)', 'Indeed (Bing)']
+SEHIRLER = ['İstanbul', 'Ankara', 'İzmir', 'Bursa', 'Remote']
+
+
+def cv_verisi(rastgele, no):
+    yetenekler = rastgele.sample(YETENEKLER, 8)
+    return {
+        'isimler': [f'Aday {no}'],
+        'epostalar': [f'aday{no}@ornek.com'],
+        'telefon_numaralari': ['+90 555 000 00 00'],
+        'lokasyonlar': [rastgele.choice(SEHIRLER)],
+        'yetenekler': yetenekler,
+        'egitim_bilgileri': [{'okul_adi': 'İskenderun Teknik Üniversitesi', 'bolum_adi': 'Bilgisayar Mühendisliği',
+                              'derece': 'Lisans', 'mezuniyet_yili': str(rastgele.randint(2010, 2025))}],
+        'is_deneyimleri': [{'sirket_adi': rastgele.choice(SIRKETLER), 'pozisyon': rastgele.choice(POZISYONLAR),
+                            'baslangic_tarihi': '2021', 'bitis_tarihi': 'Devam ediyor',
+                            'sorumluluklar': [f'{y} ile servis geliştirme' for y in yetenekler[:3]]}],
+        'yabanci_diller': [{'dil': 'İngilizce', 'seviye': rastgele.choice(['Orta', 'İleri'])}],
+        'sertifikalar': [{'sertifika_adi': 'AWS Cloud Practitioner', 'kurum': 'Amazon', 'tarih': '2023'}],
+        'projeler': [{'proje_adi': 'Akıllı İş Bulma Asistanı', 'aciklama': 'CV analiz ve iş eşleştirme',
+                      'teknolojiler': yetenekler[:4]}],
+        'toplam_deneyim_yili': f'{rastgele.randint(0, 12)} yıl',
+        'ozet': 'Backend ağırlıklı yazılım geliştirici.'
+    }
+
+
+def analiz_sonucu(rastgele):
+    alt = {k: rastgele.randint(20, 98) for k in ('teknik', 'deneyim', 'egitim', 'dil', 'sertifika')}
+    skor = round(alt['teknik'] * 0.40 + alt['deneyim'] * 0.25 + alt['egitim'] * 0.15
+                 + alt['dil'] * 0.10 + alt['sertifika'] * 0.10)
+    sonuc = {f'{k}_puan': v for k, v in alt.items()}
+    sonuc.update({
+        'uygunluk_nedeni': 'Teknik yetenekler büyük ölçüde örtüşüyor.',
+        'eslesen_yetenekler': rastgele.sample(YETENEKLER, 4),
+        'eksik_yetenekler': rastgele.sample(YETENEKLER, 2),
+        'deneyim_uyumu': 'İstenen deneyime yakın.',
+        'egitim_uyumu': 'Bölüm uyumlu.',
+        'dil_uyumu': 'İngilizce seviyesi yeterli.',
+        'guclu_yonler': ['Backend deneyimi', 'Takım çalışması'],
+        'gelistirilmesi_gerekenler': ['Bulut sertifikası'],
+        'tavsiyeler': ['Kubernetes öğren', 'Açık kaynak katkısı yap'],
+        'uygunluk_skoru': skor,
+        'alt_puanlar': alt,
+    })
+    return skor, sonuc
+
+
+def uret(hedef, kullanici_sayisi=1000, ilan_sayisi=10000, analiz_orani=0.5, bench_ilan=300, tohum=7):
+    """hedef SQLite dosyasini sifirdan olusturup sentetik veriyle doldurur. Bench kullanici id'sini dondurur."""
+    if os.path.exists(hedef):
+        os.remove(hedef)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(hedef)
+
+    from app import app, semayi_hazirla
+    from extensions import db
+    import models
+    import benzerlik
+    semayi_hazirla()
+
+    rastgele = random.Random(tohum)
+    parola = generate_password_hash(BENCH_PAROLA)
+    simdi = datetime.utcnow()
+
+    with app.app_context():
+        db.session.execute(db.insert(models.Kullanici), [
+            {'id': i, 'email': BENCH_EMAIL if i == 1 else f'kullanici{i}@ornek.com', 'parola': parola, 'rol': 'aday'}
+            for i in range(1, kullanici_sayisi + 1)
+        ])
+
+        cvler, cv_no = [], 0
+        for kullanici_id in range(1, kullanici_sayisi + 1):
+            for _ in range(2 if kullanici_id == 1 else rastgele.randint(1, 2)):
+                cv_no += 1
+                cvler.append({'id': cv_no, 'orjinal_dosya_adi': f'cv_{cv_no}.pdf', 'aday_id': kullanici_id,
+                              'cikarilan_veriler': cv_verisi(rastgele, cv_no)})
+        db.session.execute(db.insert(models.CV), cvler)
+        ilk_cv = {}
+        for cv in cvler:
+            ilk_cv.setdefault(cv['aday_id'], cv['id'])
+
+        ilanlar, bantlar, eslesmeler = [], [], []
+        for ilan_id in range(1, ilan_sayisi + 1):
+            kullanici_id = 1 if ilan_id <= bench_ilan else rastgele.randint(2, max(2, kullanici_sayisi))
+            baslik = f'{rastgele.choice(POZISYONLAR)} {ilan_id}'
+            sirket = rastgele.choice(SIRKETLER)
+            aciklama = f'{rastgele.choice(SEHIRLER)} - {", ".join(rastgele.sample(YETENEKLER, 3))}'
+            imza = benzerlik.minhash_imzasi(baslik, sirket, aciklama)
+            tam_metin = None
+            if rastgele.random() < 0.6:
+                tam_metin = {'full_text': f'{baslik} {sirket}. Aranan nitelikler: '
+                                          + ', '.join(rastgele.sample(YETENEKLER, 6)) + '. ' * 20}
+            ilanlar.append({
+                'id': ilan_id, 'baslik': baslik, 'sirket_adi': sirket,
+                'kaynak_url': f'https://ilanlar.ornek.com/ilan/{ilan_id}',
+                'kaynak_site': rastgele.choice(KAYNAKLAR), 'aciklama_ozeti': aciklama,
+                'bulunma_tarihi': simdi - timedelta(minutes=ilan_id), 'gereksinimler_json': tam_metin,
+                'bulan_kullanici_id': kullanici_id, 'minhash_imzasi': imza,
+            })
+            bantlar.extend({'is_ilani_id': ilan_id, 'bant_no': no, 'bant_ozeti': ozet}
+                           for no, ozet in benzerlik.lsh_bantlari(imza))
+            cv_id = ilk_cv.get(kullanici_id)
+            if cv_id and rastgele.random() < analiz_orani:
+                skor, sonuc = analiz_sonucu(rastgele)
+                eslesmeler.append({'cv_id': cv_id, 'is_ilani_id': ilan_id, 'skor': skor,
+                                   **models.analiz_kolonlari(sonuc)})
+
+        db.session.execute(db.insert(models.IsIlani), ilanlar)
+        db.session.execute(db.insert(models.IlanLshBandi), bantlar)
+        if eslesmeler:
+            db.session.execute(db.insert(models.Eslesme), eslesmeler)
+        db.session.commit()
+
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sentetik proje.db uretir')
+    parser.add_argument('hedef', help='Olusturulacak SQLite dosyasi')
+    parser.add_argument('--kullanici', type=int, default=1000)
+    parser.add_argument('--ilan', type=int, default=10000)
+    parser.add_argument('--analiz-orani', type=float, default=0.5)
+    parser.add_argument('--bench-ilan', type=int, default=300, help='Bench kullanicisina ait ilan sayisi')
+    parser.add_argument('--tohum', type=int, default=7)
+    args = parser.parse_args(argv)
+    uret(args.hedef, args.kullanici, args.ilan, args.analiz_orani, args.bench_ilan, args.tohum)
+    print(f"{args.hedef}: {args.kullanici} kullanici, {args.ilan} ilan uretildi.")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
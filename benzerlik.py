@@ -0,0 +1,91 @@
+import re
+import random
+import zlib
+
+# MinHash / LSH parametreleri
+# 64 permutasyon, 16 bant x 4 satir -> yaklasik %50 Jaccard esiginde aday uretir
+IMZA_UZUNLUGU = 64
+BANT_SAYISI = 16
+BANT_SATIR = IMZA_UZUNLUGU // BANT_SAYISI
+BENZERLIK_ESIGI = 0.6
+# Imza benzerligi tek basina yetmez: kisa ilanlarda ayni sirketin farkli pozisyonlari
+# (Backend/Frontend Developer) esigi gecer. Basliklarin kelime Jaccard'i da bu esigi gecmeli.
+BASLIK_ESIGI = 0.5
+
+_ASAL = (1 << 61) - 1
+_MASKE = (1 << 32) - 1
+
+# Sabit tohum: imzalar veritabaninda saklandigi icin surecler arasi ayni olmali
+_rastgele = random.Random(2024)
+_KATSAYILAR = [(_rastgele.randrange(1, _ASAL), _rastgele.randrange(0, _ASAL)) for _ in range(IMZA_UZUNLUGU)]
+
+# Kaynak adlari ve site son ekleri baslik benzerligini bozmasin
+_GURULTU_KELIMELERI = {
+    'linkedin', 'indeed', 'glassdoor', 'kariyer', 'net', 'bing', 'jobs', 'job', 'is', 'ilani',
+    'hiring', 'search', 'com', 'www', 'tr', 'turkey', 'turkiye', 've', 'and', 'the', 'a', 'for', 'at'
+}
+
+# Kaynaklarin sirket bulunamadiginda yazdigi degerler (normalize edilmis); bunlar sirket eslesmesi aramaz
+_YER_TUTUCU_SIRKETLER = {'', 'belirsiz', 'indeed ilani', 'arbeitnow', 'himalayas', 'findwork'}
+
+_TR_CEVIRI = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+
+
+def _normalize_et(metin):
+    """Metni kucuk harfe cevirir, Turkce karakterleri sadelestirir ve kelimelere boler"""
+    metin = (metin or '').replace('İ', 'i').replace('I', 'ı').lower().translate(_TR_CEVIRI)
+    return [k for k in re.findall(r'[a-z0-9+#]+', metin) if k not in _GURULTU_KELIMELERI]
+
+
+def _shingle_kumesi(baslik, sirket, aciklama):
+    """Baslik ve sirketten kelime + kelime ikilisi, aciklamadan kelime kumesi uretir"""
+    ana = _normalize_et(f"{baslik} {sirket}")
+    kume = set(ana)
+    kume.update(f"{a} {b}" for a, b in zip(ana, ana[1:]))
+    kume.update(_normalize_et(aciklama)[:40])
+    return kume
+
+
+def minhash_imzasi(baslik, sirket='', aciklama=''):
+    """Ilanin MinHash imzasini dondurur (IMZA_UZUNLUGU uzunlugunda int listesi)"""
+    kume = _shingle_kumesi(baslik, sirket, aciklama)
+    if not kume:
+        return None
+    taban = [zlib.crc32(s.encode('utf-8')) for s in kume]
+    return [min(((a * x + b) % _ASAL) & _MASKE for x in taban) for a, b in _KATSAYILAR]
+
+
+def lsh_bantlari(imza):
+    """Imzayi LSH bantlarina boler; (bant_no, bant_ozeti) ciftleri dondurur"""
+    bantlar = []
+    for bant in range(BANT_SAYISI):
+        parca = imza[bant * BANT_SATIR:(bant + 1) * BANT_SATIR]
+        ozet = zlib.crc32(','.join(map(str, parca)).encode('ascii'))
+        bantlar.append((bant, ozet))
+    return bantlar
+
+
+def benzerlik_tahmini(imza_a, imza_b):
+    """Iki imza arasindaki tahmini Jaccard benzerligi (0-1)"""
+    if not imza_a or not imza_b or len(imza_a) != len(imza_b):
+        return 0.0
+    return sum(1 for a, b in zip(imza_a, imza_b) if a == b) / len(imza_a)
+
+
+def _sirket_kelimeleri(sirket):
+    """Sirket adinin kelime kumesi; yer tutucu bir ad ise bos kume"""
+    kelimeler = _normalize_et(sirket)
+    return set() if ' '.join(kelimeler) in _YER_TUTUCU_SIRKETLER else set(kelimeler)
+
+
+def kopya_benzerligi(imza_a, imza_b, baslik_a, baslik_b, sirket_a='', sirket_b=''):
+    """Iki ilanin kopya olarak benzerligi (0-1). Sirketler farkliysa ya da basliklar yeterince
+    ortusmuyorsa 0; aksi halde imzalarin tahmini Jaccard benzerligi"""
+    sirket_a, sirket_b = _sirket_kelimeleri(sirket_a), _sirket_kelimeleri(sirket_b)
+    # 'Acme' ile 'Acme Yazilim A.S.' ayni sirket sayilir
+    if sirket_a and sirket_b and not (sirket_a <= sirket_b or sirket_b <= sirket_a):
+        return 0.0
+    baslik_a, baslik_b = set(_normalize_et(baslik_a)), set(_normalize_et(baslik_b))
+    if not baslik_a or not baslik_b or len(baslik_a & baslik_b) / len(baslik_a | baslik_b) < BASLIK_ESIGI:
+        return 0.0
+    return benzerlik_tahmini(imza_a, imza_b)
@@ -1,33 +1,86 @@
-import fitz
-import docx
 import os
 import json
-import requests
 import time
 import re
+import queue
 import logging
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
-from dotenv import load_dotenv
-
-# .env dosyasini yukle
-load_dotenv()
-
-# API anahtarini environment variable'dan al
-API_KEY = os.getenv('GEMINI_API_KEY')
-if not API_KEY:
-    logging.warning("GEMINI_API_KEY environment variable bulunamadi!")
+import importlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import metrikler
+import yogunlastirma
 
 # Logging yapilandirmasi
 logger = logging.getLogger(__name__)
 
-def _gemini_istegi_gonder(icerik, talimat, sema, temperature=0.3):
-    modeller = [
-        "gemini-2.0-flash",
-        "gemini-2.5-flash",
-        "gemini-2.0-flash-lite"
-    ]
+# Agir bagimliliklar (PyMuPDF, python-docx, requests, BeautifulSoup, duckduckgo_search) modul
+# yuklenirken degil, ilk kullanildiklari fonksiyonda import edilir. Alt sistem -> moduller:
+ALT_SISTEMLER = {
+    'cikarma': ('fitz', 'docx'),
+    'kazima': ('requests', 'bs4', 'duckduckgo_search'),
+    'llm': ('requests', 'httpx'),
+}
+
+# API anahtari ilk Gemini isteginde environment'tan okunur (.env'i app.py yukler)
+API_KEY = None
+# duckduckgo_search.DDGS, ilk DuckDuckGo aramasinda yuklenir
+DDGS = None
 
+def on_yukle(*alt_sistemler):
+    """
+    Verilen alt sistemlerin (bos ise hepsinin) bagimliliklarini hemen yukler.
+    Fork eden sunucularda (orn. gunicorn --preload) ana surecte cagrilirsa isciler
+    yuklenmis modulleri kopyalanmis bellekten paylasir ve ilk istekte beklemez.
+    """
+    for ad in alt_sistemler or ALT_SISTEMLER:
+        if ad not in ALT_SISTEMLER:
+            # ON_YUKLE'deki bir yazim hatasi sunucunun acilmasini engellemesin
+            logger.warning(f"Bilinmeyen on yukleme alt sistemi atlandi: {ad} (gecerli: {', '.join(ALT_SISTEMLER)})")
+            continue
+        for modul in ALT_SISTEMLER[ad]:
+            importlib.import_module(modul)
+    _api_anahtari()
+
+def _api_anahtari():
+    global API_KEY
+    if API_KEY is None:
+        API_KEY = os.getenv('GEMINI_API_KEY', '')
+        if not API_KEY:
+            logger.warning("GEMINI_API_KEY environment variable bulunamadi!")
+    return API_KEY
+
+def _ddgs_sinifi():
+    global DDGS
+    if DDGS is None:
+        from duckduckgo_search import DDGS
+    return DDGS
+
+# Sirayla denenen modeller (ilki hata verirse sonrakine gecilir)
+GEMINI_MODELLERI = [
+    "gemini-2.0-flash",
+    "gemini-2.5-flash",
+    "gemini-2.0-flash-lite"
+]
+
+# Kademeli analizde on tarama icin denenen modeller (en ucuz model once)
+TARAMA_MODELLERI = [
+    "gemini-2.0-flash-lite",
+    "gemini-2.0-flash"
+]
+
+# Model basina liste fiyati (USD / 1M token: girdi, cikti); kademe maliyet raporu icin
+MODEL_FIYATLARI = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+
+def gemini_url(model):
+    return f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={_api_anahtari()}"
+
+def gemini_govdesi(icerik, talimat, sema, temperature=0.3):
+    """Gemini generateContent istek govdesini (JSON metni) hazirlar"""
     payload = {
         "systemInstruction": {"parts": [{"text": talimat}]},
         "contents": [{"parts": [{"text": icerik}]}],
@@ -38,20 +91,58 @@ def _gemini_istegi_gonder(icerik, talimat, sema, temperature=0.3):
         }
     }
 
+    govde = json.dumps(payload)
+    metrikler.GEMINI_YUK_BOYUTU.gozlemle(len(govde))
+    return govde
+
+def gemini_yanitini_coz(yanit_json):
+    """Basarili Gemini yanitindaki JSON metnini sozluge cevirir"""
+    raw_text = yanit_json.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
+    if "```json" in raw_text:
+        raw_text = raw_text.replace("```json", "").replace("```", "")
+    elif "```" in raw_text:
+        raw_text = raw_text.replace("```", "")
+    return json.loads(raw_text.strip())
+
+def gemini_kullanimi(model, govde, yanit_json):
+    """Yanittaki usageMetadata'dan (yoksa tahminden) token sayilarini ve tahmini maliyeti cikarir"""
+    kullanim = yanit_json.get('usageMetadata') or {}
+    girdi = kullanim.get('promptTokenCount') or tahmini_token_sayisi(govde)
+    cikti = kullanim.get('candidatesTokenCount')
+    if cikti is None:
+        cikti = tahmini_token_sayisi(json.dumps(yanit_json.get('candidates', []), ensure_ascii=False))
+    fiyat_girdi, fiyat_cikti = MODEL_FIYATLARI.get(model, (0.0, 0.0))
+    return {'model': model, 'girdi_token': girdi, 'cikti_token': cikti,
+            'maliyet_usd': (girdi * fiyat_girdi + cikti * fiyat_cikti) / 1_000_000}
+
+def kademe_kaydet(kademe, kullanim, sure):
+    """Bir analiz kademesinin (tarama / tam) basarili cagrisini metriklere yazar"""
+    metrikler.ANALIZ_KADEME_SURESI.gozlemle(sure, kademe=kademe)
+    metrikler.ANALIZ_KADEME_TOKEN.artir(kullanim['girdi_token'], kademe=kademe, yon='girdi')
+    metrikler.ANALIZ_KADEME_TOKEN.artir(kullanim['cikti_token'], kademe=kademe, yon='cikti')
+    metrikler.ANALIZ_KADEME_MALIYET.artir(kullanim['maliyet_usd'], kademe=kademe)
+
+def _gemini_istegi_gonder(icerik, talimat, sema, temperature=0.3, modeller=GEMINI_MODELLERI, kademe=None):
+    import requests
     son_hata = ""
+    govde = gemini_govdesi(icerik, talimat, sema, temperature)
+    toplam_baslangic = time.perf_counter()
 
-    for model in modeller:
+    for derinlik, model in enumerate(modeller, start=1):
+        baslangic = time.perf_counter()
+        durum = 'hata'
         try:
-            api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={API_KEY}"
-            response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
+            response = requests.post(gemini_url(model), headers={'Content-Type': 'application/json'}, data=govde)
+            durum = str(response.status_code)
             
             if response.status_code == 200:
-                raw_text = response.json().get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
-                if "```json" in raw_text:
-                    raw_text = raw_text.replace("```json", "").replace("```", "")
-                elif "```" in raw_text:
-                    raw_text = raw_text.replace("```", "")
-                return json.loads(raw_text.strip()), None
+                yanit_json = response.json()
+                sonuc = gemini_yanitini_coz(yanit_json)
+                metrikler.GEMINI_YEDEK_DERINLIGI.gozlemle(derinlik)
+                if kademe:
+                    kademe_kaydet(kademe, gemini_kullanimi(model, govde, yanit_json),
+                                  time.perf_counter() - toplam_baslangic)
+                return sonuc, None
             else:
                 hata_detay = response.json().get('error', {}).get('message', response.text[:200])
                 son_hata = f"{model} Hatası: {response.status_code} - {hata_detay}"
@@ -60,22 +151,32 @@ def _gemini_istegi_gonder(icerik, talimat, sema, temperature=0.3):
         except Exception as e:
             son_hata = str(e)
             continue
+        finally:
+            metrikler.GEMINI_SURESI.gozlemle(time.perf_counter() - baslangic, model=model, durum=durum)
+            metrikler.GEMINI_ISTEK.artir(model=model, durum=durum)
     
     return None, f"Yapay zeka yanıt vermedi. Son Hata: {son_hata}"
 
 def metin_cikar(dosya_yolu):
+    baslangic = time.perf_counter()
+    uzanti = os.path.splitext(dosya_yolu)[1].lower()
+    durum = 'hata'
     try:
-        uzanti = os.path.splitext(dosya_yolu)[1].lower()
         metin = ""
         if uzanti == '.pdf':
+            import fitz
             with fitz.open(dosya_yolu) as pdf:
                 for sayfa in pdf: metin += sayfa.get_text()
         elif uzanti == '.docx':
+            import docx
             doc = docx.Document(dosya_yolu)
             for p in doc.paragraphs: metin += p.text + "\n"
+        durum = 'basarili'
         return metin, None
     except Exception as e:
         return None, str(e)
+    finally:
+        metrikler.METIN_CIKARMA_SURESI.gozlemle(time.perf_counter() - baslangic, uzanti=uzanti, durum=durum)
 
 def bilgileri_cikar(metin):
     istenen_json_semasi = {
@@ -131,23 +232,74 @@ def bilgileri_cikar(metin):
     return _gemini_istegi_gonder(metin, talimat, istenen_json_semasi)
 
 def url_den_ilan_cek(url):
+    baslangic = time.perf_counter()
+    metin, hata = _url_den_ilan_cek(url)
+    metrikler.ILAN_CEKME_SURESI.gozlemle(time.perf_counter() - baslangic, durum='basarili' if metin else 'hata')
+    return metin, hata
+
+def _url_den_ilan_cek(url):
+    import requests
     try:
         if not url.startswith('http'): url = 'https://' + url
         headers = {'User-Agent': 'Mozilla/5.0'}
         response = requests.get(url, headers=headers, timeout=10)
         
         if response.status_code != 200: return None, "Siteye erişilemedi."
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        for script in soup(["script", "style", "nav", "footer", "header", "aside"]): script.decompose()
-        
-        metin = soup.get_text(separator=' ', strip=True)[:15000]
-        if len(metin) < 100: return None, "İçerik boş."
-        return metin, None
+        return ilan_metnini_ayikla(response.content)
     except Exception as e:
         return None, str(e)
 
-def ilani_karsilastir(cv_verisi, ilan_metni):
+# Yogunlastirmaya verilen ve veritabaninda saklanan en uzun sayfa metni
+ILAN_HAM_SINIRI = yogunlastirma.KAYIT_METIN_SINIRI
+
+def ilan_metnini_ayikla(icerik):
+    """Ilan sayfasi HTML'inden gorunur metni cikarir: (metin, hata)"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(icerik, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header", "aside"]): script.decompose()
+    
+    # Satir yapisi korunur: yogunlastirma bolum basliklarini satirlardan tanir
+    metin = soup.get_text(separator='\n', strip=True)[:ILAN_HAM_SINIRI]
+    if len(metin) < 100: return None, "İçerik boş."
+    return metin, None
+
+# Puanlama profili bicimi degisirse artirilir; eski surumdeki profiller yeniden uretilir
+PUANLAMA_PROFILI_SURUMU = 1
+
+def _bos_olmayan(sozluk, alanlar):
+    return {a: sozluk[a] for a in alanlar if sozluk.get(a)}
+
+def tahmini_token_sayisi(metin):
+    """Gemini tokenizer'ina yakin kaba tahmin (~4 karakter / token)"""
+    return (len(metin) + 3) // 4
+
+def puanlama_profili_olustur(cv_verisi):
+    """
+    CV verisinden puanlamada kullanilan alanlari (yetenek, deneyim, egitim, dil, sertifika, proje)
+    kompakt JSON olarak cikarir. Isim, e-posta, telefon ve lokasyon gibi alanlar dahil edilmez.
+    (profil_metni, tahmini_token) dondurur.
+    """
+    cv_verisi = cv_verisi or {}
+    profil = {
+        'yetenekler': cv_verisi.get('yetenekler') or [],
+        'toplam_deneyim_yili': cv_verisi.get('toplam_deneyim_yili'),
+        'is_deneyimleri': [_bos_olmayan(d, ('pozisyon', 'sirket_adi', 'baslangic_tarihi', 'bitis_tarihi', 'sorumluluklar'))
+                           for d in cv_verisi.get('is_deneyimleri') or []],
+        'egitim_bilgileri': [_bos_olmayan(e, ('bolum_adi', 'derece', 'okul_adi', 'mezuniyet_yili'))
+                             for e in cv_verisi.get('egitim_bilgileri') or []],
+        'yabanci_diller': [_bos_olmayan(d, ('dil', 'seviye')) for d in cv_verisi.get('yabanci_diller') or []],
+        'sertifikalar': [_bos_olmayan(s, ('sertifika_adi', 'kurum')) for s in cv_verisi.get('sertifikalar') or []],
+        'projeler': [_bos_olmayan(p, ('proje_adi', 'teknolojiler', 'aciklama')) for p in cv_verisi.get('projeler') or []],
+    }
+    profil = {k: v for k, v in profil.items() if v}
+    metin = json.dumps(profil, ensure_ascii=False, separators=(',', ':'))
+    return metin, tahmini_token_sayisi(metin)
+
+def analiz_istemi_hazirla(cv_verisi, ilan_metni, cv_profili=None):
+    """
+    Ilan-CV karsilastirmasi icin (prompt, talimat, sema) uretir.
+    cv_profili verilirse (onceden hesaplanmis puanlama profili) cv_verisi yeniden serilestirilmez.
+    """
     if not ilan_metni or len(ilan_metni) < 50:
         ilan_metni = "İlan içeriğine tam erişilemedi. Başlık ve şirket bilgisine göre genel değerlendirme yap."
 
@@ -215,11 +367,44 @@ PUANLAMA SİSTEMİ (Her kategori 0-100 arası):
 - Her değerlendirmede AYNI mantığı uygula
 - Eksik bilgi varsa orta değer ver (45-55 arası)"""
 
-    prompt = f"ADAY BİLGİLERİ:\n{json.dumps(cv_verisi, ensure_ascii=False, indent=2)}\n\nİŞ İLANI:\n{ilan_metni}"
+    if cv_profili is None:
+        cv_profili, _ = puanlama_profili_olustur(cv_verisi)
+    prompt = f"ADAY BİLGİLERİ:\n{cv_profili}\n\nİŞ İLANI:\n{ilan_metni}"
+    metrikler.ANALIZ_ISTEM_TOKEN.gozlemle(tahmini_token_sayisi(prompt))
+    return prompt, talimat, istenen_sonuc_semasi
+
+# Karsilastirma istekleri dusuk temperature ile yapilir (tutarli sonuc)
+ANALIZ_TEMPERATURE = 0.1
 
-    # Düşük temperature ile tutarlı sonuç al
-    sonuc, hata = _gemini_istegi_gonder(prompt, talimat, istenen_sonuc_semasi, temperature=0.1)
+def ilani_karsilastir(cv_verisi, ilan_metni, cv_profili=None):
+    prompt, talimat, sema = analiz_istemi_hazirla(cv_verisi, ilan_metni, cv_profili)
+    sonuc, hata = _gemini_istegi_gonder(prompt, talimat, sema, temperature=ANALIZ_TEMPERATURE, kademe='tam')
+    if sonuc:
+        analiz_puanini_hesapla(sonuc)
+    return sonuc, hata
+
+# On tarama istemine eklenen ilan metni siniri (karakter); tam analiz yogunlastirilmis metnin tamamini gonderir
+TARAMA_METIN_SINIRI = 4000
+
+TARAMA_SEMASI = {
+    "type": "OBJECT",
+    "properties": {f"{ad}_puan": {"type": "INTEGER"} for ad in ('teknik', 'deneyim', 'egitim', 'dil', 'sertifika')},
+    "required": [f"{ad}_puan" for ad in ('teknik', 'deneyim', 'egitim', 'dil', 'sertifika')]
+}
+
+TARAMA_TALIMATI = """Sen bir İK uzmanısın. Adayı iş ilanına göre 5 kategoride 0-100 arası puanla:
+teknik (yetenek eşleşmesi), deneyim (yıl ve pozisyon), egitim (bölüm ve derece), dil, sertifika.
+Eksik bilgi varsa 45-55 arası ver. Sadece puanları döndür, açıklama yazma."""
+
+def tarama_istemi_hazirla(cv_profili, ilan_metni):
+    """Kademeli analizin ucuz on tarama istemi: sadece alt puanlar, kisaltilmis ilan metni"""
+    if not ilan_metni or len(ilan_metni) < 50:
+        ilan_metni = "İlan içeriğine tam erişilemedi. Başlık ve şirket bilgisine göre genel değerlendirme yap."
+    prompt = f"ADAY BİLGİLERİ:\n{cv_profili}\n\nİŞ İLANI:\n{ilan_metni[:TARAMA_METIN_SINIRI]}"
+    return prompt, TARAMA_TALIMATI, TARAMA_SEMASI
 
+def analiz_puanini_hesapla(sonuc):
+    """Model yanitindaki alt puanlardan uygunluk_skoru ve alt_puanlar alanlarini ekler"""
     if sonuc:
         # Alt puanlardan ağırlıklı ortalama hesapla
         teknik = sonuc.get('teknik_puan', 50)
@@ -242,40 +427,23 @@ PUANLAMA SİSTEMİ (Her kategori 0-100 arası):
             'dil': dil,
             'sertifika': sertifika
         }
-
-    return sonuc, hata
-
-def internette_is_ara(yetenekler_listesi):
-    """
-    CV'deki yeteneklere göre birden fazla kaynaktan iş ilanı arar.
-    Kaynaklar: LinkedIn, Indeed, Glassdoor, Arbeitnow, Remotive, Kariyer.net, 
-    Eleman.net, SecretCV, Yenibiris, Greenhouse ve daha fazlası.
-    """
-    if not yetenekler_listesi: 
-        yetenekler_listesi = ["Yazılım"]
-    
-    # İlk 3 yeteneği kullan (daha iyi sonuçlar için)
-    ana_yetenekler = []
-    for yetenek in yetenekler_listesi[:3]:
-        temiz = re.sub(r'\s*\(.*?\)', '', yetenek).strip()
-        if len(temiz) >= 2:
-            ana_yetenekler.append(temiz)
-    
-    if not ana_yetenekler:
-        ana_yetenekler = ["Developer"]
-    
-    ana_yetenek = ana_yetenekler[0]
-    
-    tum_sonuclar = []
-    eklenen_linkler = set()
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
-    }
-
-    # ========== 1. LinkedIn ==========
+    return sonuc
+
+def _kaynak_olc(kaynak, baslangic, bulunan):
+    """Bir arama kaynaginin suresini ve buldugu ilan sayisini metriklere yazar"""
+    metrikler.KAYNAK_SURESI.gozlemle(time.perf_counter() - baslangic, kaynak=kaynak)
+    metrikler.KAYNAK_ILAN_SAYISI.artir(bulunan, kaynak=kaynak)
+
+ARAMA_BASLIKLARI = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+def _linkedin_ara(ana_yetenek, ana_yetenekler, headers):
+    """LinkedIn misafir ilan API'sinden arama yapar"""
+    import requests
+    from bs4 import BeautifulSoup
     try:
         logger.info(f"LinkedIn araması başlatılıyor: {ana_yetenek}")
         linkedin_base = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
@@ -294,26 +462,28 @@ def internette_is_ara(yetenekler_listesi):
                             sirket = ilan.find('h4', class_='base-search-card__subtitle').get_text(strip=True)
                             lokasyon = ilan.find('span', class_='job-search-card__location')
                             lokasyon_text = lokasyon.get_text(strip=True) if lokasyon else "Türkiye"
-                            if link not in eklenen_linkler:
-                                tum_sonuclar.append({
+                            if link:
+                                yield {
                                     "baslik": baslik, 
                                     "link": link, 
                                     "sirket": sirket, 
                                     "kaynak": "LinkedIn", 
                                     "aciklama": f"{lokasyon_text}"
-                                })
-                                eklenen_linkler.add(link)
+                                }
                         except (AttributeError, TypeError):
                             continue
                     time.sleep(0.5)
             except requests.RequestException as e:
                 logger.warning(f"LinkedIn istegi basarisiz: {e}")
                 break
-        logger.info(f"LinkedIn: {len([s for s in tum_sonuclar if s['kaynak'] == 'LinkedIn'])} ilan bulundu")
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='LinkedIn')
         logger.error(f"LinkedIn arama hatasi: {e}")
 
-    # ========== 2. Indeed Türkiye ==========
+def _indeed_ara(ana_yetenek, ana_yetenekler, headers):
+    """Indeed Türkiye arama sayfasını kazır"""
+    import requests
+    from bs4 import BeautifulSoup
     try:
         logger.info("Indeed Türkiye araması başlatılıyor")
         indeed_url = f"https://tr.indeed.com/jobs?q={ana_yetenek}&l=T%C3%BCrkiye"
@@ -340,22 +510,23 @@ def internette_is_ara(yetenekler_listesi):
                             lokasyon_elem = card.find('div', {'data-testid': 'text-location'}) or card.find('div', class_='companyLocation')
                             lokasyon = lokasyon_elem.get_text(strip=True) if lokasyon_elem else ""
                             
-                            if link not in eklenen_linkler and 'indeed.com' in link:
-                                tum_sonuclar.append({
+                            if 'indeed.com' in link:
+                                yield {
                                     "baslik": baslik,
                                     "link": link,
                                     "sirket": sirket,
                                     "kaynak": "Indeed",
                                     "aciklama": lokasyon
-                                })
-                                eklenen_linkler.add(link)
+                                }
                 except Exception:
                     continue
-        logger.info(f"Indeed: {len([s for s in tum_sonuclar if s['kaynak'] == 'Indeed'])} ilan bulundu")
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='Indeed')
         logger.warning(f"Indeed arama hatasi: {e}")
 
-    # ========== 3. Arbeitnow (Remote/Global) ==========
+def _arbeitnow_ara(ana_yetenek, ana_yetenekler, headers):
+    """Arbeitnow açık API'sinden ilan çeker"""
+    import requests
     try:
         logger.info("Arbeitnow araması başlatılıyor")
         arbeit_url = "https://www.arbeitnow.com/api/job-board-api"
@@ -366,20 +537,21 @@ def internette_is_ara(yetenekler_listesi):
                 title = job.get('title', '').lower()
                 if any(y.lower() in title for y in ana_yetenekler):
                     link = job.get('url', '')
-                    if link and link not in eklenen_linkler:
-                        tum_sonuclar.append({
+                    if link:
+                        yield {
                             "baslik": job.get('title'),
                             "link": link,
                             "sirket": job.get('company_name', 'Arbeitnow'),
                             "kaynak": "Arbeitnow",
                             "aciklama": f"{job.get('location', 'Remote')} - {', '.join(job.get('tags', [])[:3])}"
-                        })
-                        eklenen_linkler.add(link)
-        logger.info(f"Arbeitnow: {len([s for s in tum_sonuclar if s['kaynak'] == 'Arbeitnow'])} ilan bulundu")
+                        }
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='Arbeitnow')
         logger.warning(f"Arbeitnow arama hatasi: {e}")
 
-    # ========== 4. Remotive (Remote Jobs) ==========
+def _remotive_ara(ana_yetenek, ana_yetenekler, headers):
+    """Remotive uzaktan çalışma API'sinden ilan çeker"""
+    import requests
     try:
         logger.info("Remotive araması başlatılıyor")
         resp = requests.get("https://remotive.com/api/remote-jobs?limit=50", timeout=8)
@@ -388,20 +560,21 @@ def internette_is_ara(yetenekler_listesi):
                 title = job.get('title', '').lower()
                 if any(y.lower() in title for y in ana_yetenekler) or 'developer' in title or 'engineer' in title:
                     link = job.get('url')
-                    if link and link not in eklenen_linkler:
-                        tum_sonuclar.append({
+                    if link:
+                        yield {
                             "baslik": job.get('title'), 
                             "link": link, 
                             "sirket": job.get('company_name'), 
                             "kaynak": "Remotive", 
                             "aciklama": f"Remote - {job.get('candidate_required_location', 'Worldwide')}"
-                        })
-                        eklenen_linkler.add(link)
-        logger.info(f"Remotive: {len([s for s in tum_sonuclar if s['kaynak'] == 'Remotive'])} ilan bulundu")
+                        }
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='Remotive')
         logger.warning(f"Remotive API hatasi: {e}")
 
-    # ========== 5. Himalayas (Remote Jobs) ==========
+def _himalayas_ara(ana_yetenek, ana_yetenekler, headers):
+    """Himalayas uzaktan çalışma API'sinden ilan çeker"""
+    import requests
     try:
         logger.info("Himalayas araması başlatılıyor")
         himalayas_url = "https://himalayas.app/jobs/api?limit=30"
@@ -412,20 +585,21 @@ def internette_is_ara(yetenekler_listesi):
                 title = job.get('title', '').lower()
                 if any(y.lower() in title for y in ana_yetenekler):
                     link = job.get('applicationLink') or f"https://himalayas.app/jobs/{job.get('slug', '')}"
-                    if link and link not in eklenen_linkler:
-                        tum_sonuclar.append({
+                    if link:
+                        yield {
                             "baslik": job.get('title'),
                             "link": link,
                             "sirket": job.get('companyName', 'Himalayas'),
                             "kaynak": "Himalayas",
                             "aciklama": f"Remote - {job.get('locationRestrictions', 'Worldwide')}"
-                        })
-                        eklenen_linkler.add(link)
-        logger.info(f"Himalayas: {len([s for s in tum_sonuclar if s['kaynak'] == 'Himalayas'])} ilan bulundu")
+                        }
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='Himalayas')
         logger.warning(f"Himalayas arama hatasi: {e}")
 
-    # ========== 6. FindWork.dev (Developer Jobs) ==========
+def _findwork_ara(ana_yetenek, ana_yetenekler, headers):
+    """FindWork.dev geliştirici ilanlarını çeker"""
+    import requests
     try:
         logger.info("FindWork.dev araması başlatılıyor")
         findwork_url = "https://findwork.dev/api/jobs/"
@@ -436,23 +610,23 @@ def internette_is_ara(yetenekler_listesi):
                 title = job.get('role', '').lower()
                 if any(y.lower() in title for y in ana_yetenekler) or any(y.lower() in str(job.get('keywords', [])).lower() for y in ana_yetenekler):
                     link = job.get('url')
-                    if link and link not in eklenen_linkler:
-                        tum_sonuclar.append({
+                    if link:
+                        yield {
                             "baslik": job.get('role'),
                             "link": link,
                             "sirket": job.get('company_name', 'FindWork'),
                             "kaynak": "FindWork.dev",
                             "aciklama": f"{job.get('location', 'Remote')} - {', '.join(job.get('keywords', [])[:3])}"
-                        })
-                        eklenen_linkler.add(link)
-        logger.info(f"FindWork.dev: {len([s for s in tum_sonuclar if s['kaynak'] == 'FindWork.dev'])} ilan bulundu")
+                        }
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='FindWork.dev')
         logger.warning(f"FindWork.dev arama hatasi: {e}")
 
-    # ========== 7. DuckDuckGo ile Türk Siteleri ==========
+def _duckduckgo_ara(ana_yetenek, ana_yetenekler, headers):
+    """DuckDuckGo ile Türk iş sitelerinde site: araması yapar"""
     try:
         logger.info("DuckDuckGo ile Türk iş siteleri araması başlatılıyor")
-        ddgs = DDGS()
+        ddgs = _ddgs_sinifi()()
         
         # Genişletilmiş arama sorguları
         ats_sorgulari = [
@@ -503,19 +677,18 @@ def internette_is_ara(yetenekler_listesi):
                                     sirket = parts[1].strip()
                                 break
 
-                        if link and link.startswith('http') and link not in eklenen_linkler:
+                        if link and link.startswith('http'):
                             title_lower = full_title.lower()
                             if any(y.lower() in title_lower for y in ana_yetenekler) or \
                                'developer' in title_lower or 'engineer' in title_lower or \
                                'yazılım' in title_lower or 'geliştirici' in title_lower:
-                                tum_sonuclar.append({
+                                yield {
                                     "baslik": baslik[:100],
                                     "link": link,
                                     "sirket": sirket[:50],
                                     "kaynak": kaynak,
                                     "aciklama": body[:150] if body else ""
-                                })
-                                eklenen_linkler.add(link)
+                                }
                                 
             except Exception as e:
                 logger.debug(f"DuckDuckGo sorgu hatasi ({sorgu[:30]}...): {e}")
@@ -523,9 +696,13 @@ def internette_is_ara(yetenekler_listesi):
                 
         logger.info("DuckDuckGo: Türk sitelerinden arama tamamlandı")
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='DuckDuckGo')
         logger.warning(f"DuckDuckGo arama hatasi: {e}")
 
-    # ========== 8. Bing Search ==========
+def _bing_ara(ana_yetenek, ana_yetenekler, headers):
+    """Bing üzerinden LinkedIn/Indeed ilanlarını arar"""
+    import requests
+    from bs4 import BeautifulSoup
     try:
         logger.info("Bing arama yapılıyor")
         bing_url = f"https://www.bing.com/search?q={ana_yetenek}+job+turkey+site:linkedin.com+OR+site:indeed.com"
@@ -537,31 +714,177 @@ def internette_is_ara(yetenekler_listesi):
                 if a_tag:
                     link = a_tag.get('href', '')
                     baslik = a_tag.get_text(strip=True)
-                    if link and link not in eklenen_linkler and ('linkedin' in link or 'indeed' in link):
+                    if link and ('linkedin' in link or 'indeed' in link):
                         sirket = "Bing Search"
                         if 'linkedin' in link: kaynak = "LinkedIn (Bing)"
                         elif 'indeed' in link: kaynak = "Indeed (Bing)"
                         else: kaynak = "Bing"
                         
-                        tum_sonuclar.append({
+                        yield {
                             "baslik": baslik[:100],
                             "link": link,
                             "sirket": sirket,
                             "kaynak": kaynak,
                             "aciklama": ""
-                        })
-                        eklenen_linkler.add(link)
+                        }
     except Exception as e:
+        metrikler.KAYNAK_HATA.artir(kaynak='Bing')
         logger.warning(f"Bing arama hatasi: {e}")
 
-    # Sonuçları filtrele
-    saglam_sonuclar = [s for s in tum_sonuclar if s['link'].startswith('http')]
+
+# (kaynak adi, arama fonksiyonu) - hepsi ayni anda calistirilir
+ARAMA_KAYNAKLARI = [
+    ('LinkedIn', _linkedin_ara),
+    ('Indeed', _indeed_ara),
+    ('Arbeitnow', _arbeitnow_ara),
+    ('Remotive', _remotive_ara),
+    ('Himalayas', _himalayas_ara),
+    ('FindWork.dev', _findwork_ara),
+    ('DuckDuckGo', _duckduckgo_ara),
+    ('Bing', _bing_ara),
+]
+
+def _arama_yetenekleri(yetenekler_listesi):
+    """Yetenek listesinden arama anahtar kelimelerini cikarir: (ana_yetenek, ana_yetenekler)"""
+    if not yetenekler_listesi: 
+        yetenekler_listesi = ["Yazılım"]
     
-    # Kaynak bazında özet log
-    kaynak_sayilari = {}
-    for s in saglam_sonuclar:
-        kaynak_sayilari[s['kaynak']] = kaynak_sayilari.get(s['kaynak'], 0) + 1
+    # İlk 3 yeteneği kullan (daha iyi sonuçlar için)
+    ana_yetenekler = []
+    for yetenek in yetenekler_listesi[:3]:
+        temiz = re.sub(r'\s*\(.*?\)', '', yetenek).strip()
+        if len(temiz) >= 2:
+            ana_yetenekler.append(temiz)
     
-    logger.info(f"Toplam {len(saglam_sonuclar)} ilan bulundu. Kaynak dağılımı: {kaynak_sayilari}")
+    if not ana_yetenekler:
+        ana_yetenekler = ["Developer"]
     
-    return saglam_sonuclar, None
\ No newline at end of file
+    return ana_yetenekler[0], ana_yetenekler
+
+class KaynakBitti(namedtuple('KaynakBitti', ['kaynak', 'bulunan', 'sure'])):
+    """Akista bir kaynagin tamamlandigini bildiren isaret (ilanlarla birlikte akar)"""
+
+# Kaynak is parcaciklari ile tuketici arasindaki kuyruk siniri (kaynak basina sabit bellek)
+AKIS_KUYRUK_BOYUTU = 50
+
+def _kaynaktan_cek(kaynak, arama_fonksiyonu, ana_yetenek, ana_yetenekler, kuyruk, dur):
+    """Fetch/parse asamasi: kaynagin ilanlarini tek tek kuyruga koyar, sonunda KaynakBitti koyar"""
+    baslangic = time.perf_counter()
+    bulunan = 0
+    akis = arama_fonksiyonu(ana_yetenek, ana_yetenekler, ARAMA_BASLIKLARI)
+    try:
+        for ilan in akis:
+            ilan['arama_kaynagi'] = kaynak
+            while not dur.is_set():
+                try:
+                    kuyruk.put(ilan, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if dur.is_set():
+                return
+            bulunan += 1
+    except Exception as e:
+        logger.error(f"{kaynak} arama hatasi: {e}")
+        metrikler.KAYNAK_HATA.artir(kaynak=kaynak)
+    finally:
+        akis.close()
+        _kaynak_olc(kaynak, baslangic, bulunan)
+        kuyruk.put(KaynakBitti(kaynak, bulunan, time.perf_counter() - baslangic))
+
+def _kaynaklardan_cek(ana_yetenek, ana_yetenekler):
+    """Tum kaynaklari paralel calistirir; ilanlari geldikleri sirayla tek tek uretir"""
+    kuyruk = queue.Queue(maxsize=AKIS_KUYRUK_BOYUTU)
+    dur = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(ARAMA_KAYNAKLARI)) as executor:
+        futures = [
+            executor.submit(_kaynaktan_cek, kaynak, fonksiyon, ana_yetenek, ana_yetenekler, kuyruk, dur)
+            for kaynak, fonksiyon in ARAMA_KAYNAKLARI
+        ]
+        kalan = len(futures)
+        try:
+            while kalan:
+                olay = kuyruk.get()
+                if isinstance(olay, KaynakBitti):
+                    kalan -= 1
+                yield olay
+        finally:
+            # Tuketici erken birakirsa kaynaklari durdur; bloklanan put'lar icin kuyrugu bosalt
+            dur.set()
+            while not all(f.done() for f in futures):
+                try:
+                    kuyruk.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+def _normalize_et(akis):
+    """Normalise asamasi: alanlari kirpar ve eksik alanlari varsayilanlarla doldurur"""
+    for ilan in akis:
+        if not isinstance(ilan, KaynakBitti):
+            ilan['link'] = (ilan.get('link') or '').strip()
+            ilan['baslik'] = (ilan.get('baslik') or '').strip()[:300] or 'Başlıksız İlan'
+            ilan['sirket'] = (ilan.get('sirket') or '').strip()[:255] or 'Belirsiz'
+            ilan['kaynak'] = ilan.get('kaynak') or 'Web'
+            ilan['aciklama'] = (ilan.get('aciklama') or '').strip()
+        yield ilan
+
+def _tekillestir(akis):
+    """Dedup asamasi: ayni linki ikinci kez gecirmez (kaynaklar arasi)"""
+    gorulen = set()
+    for ilan in akis:
+        if not isinstance(ilan, KaynakBitti):
+            if ilan['link'] in gorulen:
+                continue
+            gorulen.add(ilan['link'])
+        yield ilan
+
+def _filtrele(akis):
+    """Filter asamasi: gecerli http(s) linki olmayan ilanlari atar"""
+    for ilan in akis:
+        if isinstance(ilan, KaynakBitti) or ilan['link'].startswith('http'):
+            yield ilan
+
+class AramaOzeti:
+    """Akistan gecen ilanlari tek geciste sayan toplayici"""
+
+    def __init__(self):
+        self.kaynak_sayilari = {}
+        self.kaynaklar = {}
+        self.toplam = 0
+
+    def izle(self, akis):
+        for olay in akis:
+            if isinstance(olay, KaynakBitti):
+                self.kaynaklar.setdefault(olay.kaynak, {'gecen': 0})
+                self.kaynaklar[olay.kaynak].update(bulunan=olay.bulunan, sure=olay.sure)
+            else:
+                self.toplam += 1
+                self.kaynak_sayilari[olay['kaynak']] = self.kaynak_sayilari.get(olay['kaynak'], 0) + 1
+                grup = self.kaynaklar.setdefault(olay['arama_kaynagi'], {'gecen': 0})
+                grup['gecen'] += 1
+            yield olay
+
+    def logla(self):
+        logger.info(f"Toplam {self.toplam} ilan bulundu. Kaynak dağılımı: {self.kaynak_sayilari}")
+
+def ilan_akisi(yetenekler_listesi, ozet=None):
+    """
+    Arama hattini kurar: fetch/parse -> normalise -> dedup -> filter (-> persist cagirana aittir).
+    Ilanlar (dict) ve her kaynak bittiginde KaynakBitti isaretleri tek tek, tembel olarak uretilir.
+    Verilen AramaOzeti akistan gecenleri sayar.
+    """
+    ana_yetenek, ana_yetenekler = _arama_yetenekleri(yetenekler_listesi)
+    akis = _filtrele(_tekillestir(_normalize_et(_kaynaklardan_cek(ana_yetenek, ana_yetenekler))))
+    return ozet.izle(akis) if ozet is not None else akis
+
+def internette_is_ara(yetenekler_listesi):
+    """
+    CV'deki yeteneklere göre birden fazla kaynaktan iş ilanı arar.
+    Kaynaklar: LinkedIn, Indeed, Glassdoor, Arbeitnow, Remotive, Kariyer.net, 
+    Eleman.net, SecretCV, Yenibiris, Greenhouse ve daha fazlası.
+    Tüm sonuçları liste olarak döndürür; artımlı tüketim için ilan_akisi kullanın.
+    """
+    ozet = AramaOzeti()
+    saglam_sonuclar = [ilan for ilan in ilan_akisi(yetenekler_listesi, ozet) if not isinstance(ilan, KaynakBitti)]
+    ozet.logla()
+    return saglam_sonuclar, None
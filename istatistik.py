@@ -0,0 +1,192 @@
+import sys
+import logging
+from collections import defaultdict
+from sqlalchemy import text
+from extensions import db
+import models
+
+logger = logging.getLogger(__name__)
+
+# Tum kaynaklarin toplami bu kaynak adiyla saklanir
+TOPLAM = '*'
+# kaynak_site bos olan ilanlar
+BILINMEYEN_KAYNAK = '-'
+
+KOVA_KOLONLARI = tuple(f'skor_{alt}_{ust}' for alt, ust in models.SKOR_KOVALARI)
+SAYAC_KOLONLARI = ('cv_sayisi', 'ilan_sayisi', 'kopya_ilan_sayisi', 'eslesme_sayisi', 'skor_toplami') + KOVA_KOLONLARI
+
+# Sayaclar SQL tarafinda toplanir; es zamanli yazan istekler/surecler birbirinin farkini ezmez
+_FARK_UYGULA = text(
+    f"INSERT INTO kullanici_istatistik (kullanici_id, kaynak, {', '.join(SAYAC_KOLONLARI)}) "
+    f"VALUES (:kullanici_id, :kaynak, {', '.join(':' + k for k in SAYAC_KOLONLARI)}) "
+    f"ON CONFLICT(kullanici_id, kaynak) DO UPDATE SET "
+    + ', '.join(f'{k} = {k} + excluded.{k}' for k in SAYAC_KOLONLARI))
+
+
+def kaynak_adi(kaynak_site):
+    return kaynak_site or BILINMEYEN_KAYNAK
+
+
+def kova_kolonu(skor):
+    skor = min(max(int(skor or 0), 0), 100)
+    for (_, ust), kolon in zip(models.SKOR_KOVALARI, KOVA_KOLONLARI):
+        if skor <= ust:
+            return kolon
+
+
+class Farklar:
+    """
+    Bir transaction icinde biriken sayac farklari. uygula() commit'ten hemen once ayni oturumda
+    cagrilir; commit basarisiz olursa farklar da geri alinir.
+    """
+
+    def __init__(self):
+        self._farklar = defaultdict(lambda: dict.fromkeys(SAYAC_KOLONLARI, 0))
+
+    def ekle(self, kullanici_id, kaynak, **degerler):
+        for anahtar in ((kullanici_id, TOPLAM), (kullanici_id, kaynak_adi(kaynak))):
+            for kolon, deger in degerler.items():
+                self._farklar[anahtar][kolon] += deger
+
+    def cv(self, kullanici_id, fark=1):
+        self._farklar[(kullanici_id, TOPLAM)]['cv_sayisi'] += fark
+
+    def ilan(self, kullanici_id, kaynak, kopya=False, fark=1):
+        if kullanici_id is not None:
+            self.ekle(kullanici_id, kaynak, ilan_sayisi=fark, kopya_ilan_sayisi=fark if kopya else 0)
+
+    def eslesme(self, kullanici_id, kaynak, eski_skor, yeni_skor):
+        """eski_skor None ise yeni eslesme, degilse mevcut eslesmenin puani guncellendi"""
+        degerler = {'skor_toplami': yeni_skor - (eski_skor or 0), kova_kolonu(yeni_skor): 1}
+        if eski_skor is None:
+            degerler['eslesme_sayisi'] = 1
+        else:
+            eski_kova = kova_kolonu(eski_skor)
+            degerler[eski_kova] = degerler.get(eski_kova, 0) - 1
+        self.ekle(kullanici_id, kaynak, **degerler)
+
+    def cv_eslesmeleri_silindi(self, cv):
+        """CV silinmeden once: CV'nin eslesmelerini kaynak bazinda toplayip sayaclardan duser"""
+        for (_, kaynak), sayaclar in _eslesme_sayaclari(models.Eslesme.cv_id == cv.id).items():
+            self.ekle(cv.aday_id, kaynak, **{k: -v for k, v in sayaclar.items()})
+
+    def sozluk(self):
+        return {anahtar: dict(sayaclar) for anahtar, sayaclar in self._farklar.items()}
+
+    def uygula(self, oturum):
+        parametreler = [{'kullanici_id': k, 'kaynak': kaynak, **sayaclar}
+                        for (k, kaynak), sayaclar in self._farklar.items() if any(sayaclar.values())]
+        if parametreler:
+            oturum.execute(_FARK_UYGULA, parametreler)
+        self._farklar.clear()
+
+
+def _kaynak_ifadesi():
+    return db.func.coalesce(db.func.nullif(models.IsIlani.kaynak_site, ''), BILINMEYEN_KAYNAK)
+
+
+def _eslesme_sayaclari(*kosullar):
+    """{(kullanici_id, kaynak): {eslesme_sayisi, skor_toplami, kova kolonlari}} (kullanici = CV sahibi)"""
+    kaynak = _kaynak_ifadesi()
+    kovalar = [db.func.sum(db.case((models.Eslesme.skor.between(alt, ust), 1), else_=0))
+               for alt, ust in models.SKOR_KOVALARI]
+    # Aralik disi puanlar kova_kolonu ile ayni sekilde uc kovalara sayilir
+    kovalar[0] = db.func.sum(db.case((models.Eslesme.skor <= models.SKOR_KOVALARI[0][1], 1), else_=0))
+    kovalar[-1] = db.func.sum(db.case((models.Eslesme.skor >= models.SKOR_KOVALARI[-1][0], 1), else_=0))
+    sorgu = (db.session.query(models.CV.aday_id, kaynak, db.func.count(), db.func.sum(models.Eslesme.skor), *kovalar)
+             .join(models.CV, models.CV.id == models.Eslesme.cv_id)
+             .join(models.IsIlani, models.IsIlani.id == models.Eslesme.is_ilani_id)
+             .filter(*kosullar).group_by(models.CV.aday_id, kaynak))
+    return {(kullanici_id, kaynak): {'eslesme_sayisi': sayi, 'skor_toplami': toplam or 0,
+                                     **dict(zip(KOVA_KOLONLARI, (k or 0 for k in kova_sayilari)))}
+            for kullanici_id, kaynak, sayi, toplam, *kova_sayilari in sorgu}
+
+
+def hesapla(kullanici_id=None):
+    """Sayaclari kaynak tablolardan bastan hesaplar: {(kullanici_id, kaynak): {kolon: deger}}"""
+    farklar = Farklar()
+
+    cv_sorgu = db.session.query(models.CV.aday_id, db.func.count()).group_by(models.CV.aday_id)
+    if kullanici_id is not None:
+        cv_sorgu = cv_sorgu.filter(models.CV.aday_id == kullanici_id)
+    for k, sayi in cv_sorgu:
+        farklar.cv(k, sayi)
+
+    kaynak = _kaynak_ifadesi()
+    ilan_sorgu = (db.session.query(models.IsIlani.bulan_kullanici_id, kaynak, db.func.count(),
+                                   db.func.count(models.IsIlani.kanonik_ilan_id))
+                  .filter(models.IsIlani.bulan_kullanici_id.isnot(None))
+                  .group_by(models.IsIlani.bulan_kullanici_id, kaynak))
+    if kullanici_id is not None:
+        ilan_sorgu = ilan_sorgu.filter(models.IsIlani.bulan_kullanici_id == kullanici_id)
+    for k, kaynak_site, sayi, kopya in ilan_sorgu:
+        farklar.ekle(k, kaynak_site, ilan_sayisi=sayi, kopya_ilan_sayisi=kopya)
+
+    kosullar = [models.CV.aday_id == kullanici_id] if kullanici_id is not None else []
+    for (k, kaynak_site), sayaclar in _eslesme_sayaclari(*kosullar).items():
+        farklar.ekle(k, kaynak_site, **sayaclar)
+    return farklar.sozluk()
+
+
+def kayitli(kullanici_id=None):
+    sorgu = models.KullaniciIstatistik.query
+    if kullanici_id is not None:
+        sorgu = sorgu.filter_by(kullanici_id=kullanici_id)
+    return {(s.kullanici_id, s.kaynak): {k: getattr(s, k) for k in SAYAC_KOLONLARI} for s in sorgu}
+
+
+def tutarsizliklar(kullanici_id=None):
+    """Kayitli sayaclarla bastan hesaplanan degerlerin farklari: [(anahtar, kolon, kayitli, hesaplanan)]"""
+    beklenen, mevcut = hesapla(kullanici_id), kayitli(kullanici_id)
+    sifir = dict.fromkeys(SAYAC_KOLONLARI, 0)
+    farklar = []
+    for anahtar in sorted(set(beklenen) | set(mevcut), key=str):
+        for kolon in SAYAC_KOLONLARI:
+            a, b = mevcut.get(anahtar, sifir)[kolon], beklenen.get(anahtar, sifir)[kolon]
+            if a != b:
+                farklar.append((anahtar, kolon, a, b))
+    return farklar
+
+
+def yeniden_olustur(kullanici_id=None):
+    """Sayac tablosunu (ya da tek kullanicinin satirlarini) bastan hesaplayip yazar; satir sayisini dondurur"""
+    satirlar = hesapla(kullanici_id)
+    sorgu = models.KullaniciIstatistik.query
+    if kullanici_id is not None:
+        sorgu = sorgu.filter_by(kullanici_id=kullanici_id)
+    sorgu.delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(models.KullaniciIstatistik, [
+        {'kullanici_id': k, 'kaynak': kaynak, **sayaclar} for (k, kaynak), sayaclar in satirlar.items()])
+    db.session.commit()
+    return len(satirlar)
+
+
+def panel_ozeti(kullanici_id):
+    """Panel icin tek sorguda: toplam satiri ve kaynak satirlari (ilan sayisina gore azalan)"""
+    satirlar = models.KullaniciIstatistik.query.filter_by(kullanici_id=kullanici_id).all()
+    toplam = next((s for s in satirlar if s.kaynak == TOPLAM), None)
+    kaynaklar = sorted((s for s in satirlar if s.kaynak != TOPLAM), key=lambda s: s.ilan_sayisi, reverse=True)
+
+    def ozet(s):
+        degerler = {k: (getattr(s, k) if s is not None else 0) for k in SAYAC_KOLONLARI}
+        degerler['ortalama_skor'] = (round(degerler['skor_toplami'] / degerler['eslesme_sayisi'])
+                                     if degerler['eslesme_sayisi'] else None)
+        degerler['dagilim'] = [(f'{alt}-{ust}', degerler[k]) for (alt, ust), k in zip(models.SKOR_KOVALARI, KOVA_KOLONLARI)]
+        return degerler
+
+    return {'toplam': ozet(toplam), 'kaynaklar': [{'kaynak': s.kaynak, **ozet(s)} for s in kaynaklar]}
+
+
+if __name__ == '__main__':
+    # python istatistik.py            -> tabloyu bastan olusturur
+    # python istatistik.py --kontrol  -> sadece tutarsizliklari raporlar (varsa 1 ile cikar)
+    from app import app, semayi_hazirla
+    semayi_hazirla()
+    with app.app_context():
+        if '--kontrol' in sys.argv:
+            farklar = tutarsizliklar()
+            for anahtar, kolon, kayitli_deger, hesaplanan in farklar:
+                print(f"{anahtar} {kolon}: kayitli={kayitli_deger} hesaplanan={hesaplanan}")
+            print(f"{len(farklar)} tutarsizlik")
+            sys.exit(1 if farklar else 0)
+        print(f"Kullanici istatistikleri yeniden olusturuldu: {yeniden_olustur()} satir")
@@ -0,0 +1,159 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Varsayilan gecikme kovalari (saniye)
+VARSAYILAN_KOVALAR = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BOYUT_KOVALARI = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _etiket_metni(adlar, degerler):
+    if not adlar:
+        return ''
+    parcalar = []
+    for ad, deger in zip(adlar, degerler):
+        deger = str(deger).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parcalar.append(f'{ad}="{deger}"')
+    return '{' + ','.join(parcalar) + '}'
+
+
+class Sayac:
+    """Sadece artan sayac (Prometheus counter)"""
+    tip = 'counter'
+
+    def __init__(self, ad, aciklama, etiketler=()):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.etiketler = tuple(etiketler)
+        self._degerler = {}
+        self._kilit = threading.Lock()
+
+    def artir(self, miktar=1, **etiketler):
+        anahtar = tuple(etiketler.get(e, '') for e in self.etiketler)
+        with self._kilit:
+            self._degerler[anahtar] = self._degerler.get(anahtar, 0) + miktar
+
+    def satirlar(self):
+        with self._kilit:
+            kopya = dict(self._degerler)
+        for anahtar, deger in sorted(kopya.items()):
+            yield f'{self.ad}{_etiket_metni(self.etiketler, anahtar)} {deger}'
+
+
+class Histogram:
+    """Kovali dagilim olcumu (Prometheus histogram)"""
+    tip = 'histogram'
+
+    def __init__(self, ad, aciklama, etiketler=(), kovalar=VARSAYILAN_KOVALAR):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.etiketler = tuple(etiketler)
+        self.kovalar = tuple(sorted(kovalar))
+        self._degerler = {}
+        self._kilit = threading.Lock()
+
+    def gozlemle(self, deger, **etiketler):
+        anahtar = tuple(etiketler.get(e, '') for e in self.etiketler)
+        indeks = bisect.bisect_left(self.kovalar, deger)
+        with self._kilit:
+            kayit = self._degerler.get(anahtar)
+            if kayit is None:
+                kayit = self._degerler[anahtar] = [[0] * (len(self.kovalar) + 1), 0.0, 0]
+            kayit[0][indeks] += 1
+            kayit[1] += deger
+            kayit[2] += 1
+
+    @contextmanager
+    def sure_olc(self, **etiketler):
+        """with blogunun suresini saniye olarak gozlemler"""
+        baslangic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.gozlemle(time.perf_counter() - baslangic, **etiketler)
+
+    def satirlar(self):
+        with self._kilit:
+            kopya = {k: (list(v[0]), v[1], v[2]) for k, v in self._degerler.items()}
+        for anahtar, (kovalar, toplam, adet) in sorted(kopya.items()):
+            birikimli = 0
+            for sinir, sayi in zip(self.kovalar + ('+Inf',), kovalar):
+                birikimli += sayi
+                etiket = _etiket_metni(self.etiketler + ('le',), anahtar + (sinir,))
+                yield f'{self.ad}_bucket{etiket} {birikimli}'
+            etiket = _etiket_metni(self.etiketler, anahtar)
+            yield f'{self.ad}_sum{etiket} {toplam}'
+            yield f'{self.ad}_count{etiket} {adet}'
+
+
+class Kayit:
+    """Metrik kayit defteri"""
+
+    def __init__(self):
+        self._metrikler = {}
+        self._kilit = threading.Lock()
+
+    def _kaydet(self, metrik):
+        with self._kilit:
+            return self._metrikler.setdefault(metrik.ad, metrik)
+
+    def sayac(self, ad, aciklama, etiketler=()):
+        return self._kaydet(Sayac(ad, aciklama, etiketler))
+
+    def histogram(self, ad, aciklama, etiketler=(), kovalar=VARSAYILAN_KOVALAR):
+        return self._kaydet(Histogram(ad, aciklama, etiketler, kovalar))
+
+    def prometheus_metni(self):
+        """Tum metrikleri Prometheus text formatinda (0.0.4) dondurur"""
+        satirlar = []
+        with self._kilit:
+            metrikler = list(self._metrikler.values())
+        for metrik in metrikler:
+            satirlar.append(f'# HELP {metrik.ad} {metrik.aciklama}')
+            satirlar.append(f'# TYPE {metrik.ad} {metrik.tip}')
+            satirlar.extend(metrik.satirlar())
+        return '\n'.join(satirlar) + '\n'
+
+
+kayit = Kayit()
+
+# ========== Uygulama metrikleri ==========
+KAYNAK_SURESI = kayit.histogram(
+    'is_arama_kaynak_suresi_saniye', 'internette_is_ara icinde kaynak basina sure', ('kaynak',))
+KAYNAK_ILAN_SAYISI = kayit.sayac(
+    'is_arama_kaynak_ilan_toplam', 'Kaynak basina bulunan ilan sayisi', ('kaynak',))
+KAYNAK_HATA = kayit.sayac(
+    'is_arama_kaynak_hata_toplam', 'Kaynak basina arama hatasi', ('kaynak',))
+
+GEMINI_SURESI = kayit.histogram(
+    'gemini_istek_suresi_saniye', 'Model denemesi basina Gemini istek suresi', ('model', 'durum'))
+GEMINI_ISTEK = kayit.sayac(
+    'gemini_istek_toplam', 'Model ve HTTP durumuna gore Gemini istekleri', ('model', 'durum'))
+GEMINI_YEDEK_DERINLIGI = kayit.histogram(
+    'gemini_yedek_derinligi', 'Basarili yanita kadar denenen model sayisi', (), kovalar=(1, 2, 3))
+GEMINI_YUK_BOYUTU = kayit.histogram(
+    'gemini_istek_boyutu_bayt', 'Gemini istek govdesi boyutu', (), kovalar=BOYUT_KOVALARI)
+ANALIZ_ISTEM_TOKEN = kayit.histogram(
+    'analiz_istem_token_tahmini', 'ilani_karsilastir istem boyutu (tahmini token)', (),
+    kovalar=(250, 500, 1000, 2000, 4000, 8000))
+ANALIZ_KADEME_SURESI = kayit.histogram(
+    'analiz_kademe_suresi_saniye', 'Kademe basina (tarama / tam) basarili analiz cagrisi suresi', ('kademe',))
+ANALIZ_KADEME_TOKEN = kayit.sayac(
+    'analiz_kademe_token_toplam', 'Kademe basina Gemini token kullanimi', ('kademe', 'yon'))
+ANALIZ_KADEME_MALIYET = kayit.sayac(
+    'analiz_kademe_maliyet_usd_toplam', 'Kademe basina tahmini Gemini maliyeti (USD)', ('kademe',))
+
+ILAN_CEKME_SURESI = kayit.histogram(
+    'ilan_cekme_suresi_saniye', 'url_den_ilan_cek suresi', ('durum',))
+METIN_CIKARMA_SURESI = kayit.histogram(
+    'metin_cikarma_suresi_saniye', 'metin_cikar suresi', ('uzanti', 'durum'))
+TEK_UCUS = kayit.sayac(
+    'tek_ucus_toplam', 'Tekil ucus katmani: lider / surec ici / surecler arasi bekleme', ('tur', 'sonuc'))
+
+DB_COMMIT_SURESI = kayit.histogram(
+    'db_commit_suresi_saniye', 'SQLAlchemy oturum commit suresi')
+ROTA_SURESI = kayit.histogram(
+    'http_istek_suresi_saniye', 'Rota basina istek suresi', ('rota', 'metot', 'durum'))
+KOSULLU_YANIT = kayit.sayac(
+    'kosullu_yanit_toplam', 'ETag / Last-Modified destekli rotalarda 200 ve 304 yanitlari', ('rota', 'sonuc'))
@@ -0,0 +1,194 @@
+import sys
+import json
+import logging
+from sqlalchemy import inspect, text
+from extensions import db
+import istatistik
+import models
+
+logger = logging.getLogger(__name__)
+
+# Mevcut veritabanlarina sonradan eklenen kolonlar: (tablo, kolon, SQL tipi)
+EK_KOLONLAR = [
+    ('is_ilani', 'guncellenme_tarihi', 'DATETIME'),
+    ('is_ilani', 'kanonik_ilan_id', 'INTEGER REFERENCES is_ilani(id)'),
+    ('is_ilani', 'minhash_imzasi', 'JSON'),
+    ('eslesme', 'teknik_puan', 'INTEGER'),
+    ('eslesme', 'deneyim_puan', 'INTEGER'),
+    ('eslesme', 'egitim_puan', 'INTEGER'),
+    ('eslesme', 'dil_puan', 'INTEGER'),
+    ('eslesme', 'sertifika_puan', 'INTEGER'),
+    ('eslesme', 'analiz_detay', 'BLOB'),
+    ('eslesme', 'analiz_seviyesi', 'VARCHAR(10)'),
+    ('eslesme', 'guncellenme_tarihi', 'DATETIME'),
+    ('cv', 'puanlama_profili', 'TEXT'),
+    ('cv', 'puanlama_profili_surumu', 'INTEGER'),
+    ('cv', 'puanlama_profili_token', 'INTEGER'),
+]
+
+EK_INDEKSLER = [
+    'CREATE INDEX IF NOT EXISTS ix_is_ilani_kanonik_ilan_id ON is_ilani (kanonik_ilan_id)',
+    'CREATE INDEX IF NOT EXISTS ix_eslesme_cv_skor ON eslesme (cv_id, skor)',
+    'CREATE INDEX IF NOT EXISTS ix_eslesme_cv_guncellenme ON eslesme (cv_id, guncellenme_tarihi)',
+    'CREATE INDEX IF NOT EXISTS ix_is_ilani_bulan_kullanici ON is_ilani (bulan_kullanici_id, id)',
+] + [
+    f'CREATE INDEX IF NOT EXISTS ix_eslesme_cv_{ad} ON eslesme (cv_id, {ad}_puan)' for ad in models.ALT_PUANLAR
+]
+
+# Kolon eklenirken mevcut satirlari dolduran SQL (bos kalan zaman damgalari onbellek surumunu bozar).
+# `python migrasyon.py` bos kalmis satirlar icin tekrar calistirir.
+KOLON_DOLDURMA = {
+    ('is_ilani', 'guncellenme_tarihi'):
+        'UPDATE is_ilani SET guncellenme_tarihi = bulunma_tarihi WHERE guncellenme_tarihi IS NULL',
+    ('eslesme', 'guncellenme_tarihi'):
+        'UPDATE eslesme SET guncellenme_tarihi = CURRENT_TIMESTAMP WHERE guncellenme_tarihi IS NULL',
+}
+
+# Geri doldurma parti boyutu
+PARTI_BOYUTU = 1000
+
+
+def semayi_guncelle():
+    """Eksik tablo, kolon ve indeksleri ekler. Tekrar calistirilmasi guvenlidir.
+    Uygulama baglami (app_context) icinde cagrilmalidir."""
+    db.create_all()
+    denetci = inspect(db.engine)
+    with db.engine.begin() as baglanti:
+        for tablo, kolon, tip in EK_KOLONLAR:
+            mevcut = {k['name'] for k in denetci.get_columns(tablo)}
+            if kolon not in mevcut:
+                baglanti.execute(text(f'ALTER TABLE {tablo} ADD COLUMN {kolon} {tip}'))
+                if (tablo, kolon) in KOLON_DOLDURMA:
+                    baglanti.execute(text(KOLON_DOLDURMA[(tablo, kolon)]))
+                logger.info(f"Kolon eklendi: {tablo}.{kolon}")
+        for sql in EK_INDEKSLER:
+            baglanti.execute(text(sql))
+    eski_eslesmeleri_bildir()
+    istatistikleri_doldur()
+
+
+def kolonlari_doldur():
+    """KOLON_DOLDURMA ifadelerini tum tablolarda calistirir (bos kalmis satirlar icin)"""
+    with db.engine.begin() as baglanti:
+        for sql in KOLON_DOLDURMA.values():
+            baglanti.execute(text(sql))
+
+
+def eski_eslesmeleri_bildir():
+    """Tasinmamis eski analiz_sonucu satirlari varsa uyarir. Veri tasima uygulama acilisinda yapilmaz;
+    `python migrasyon.py --eslesme-doldur` ile acikca calistirilir."""
+    with db.engine.connect() as baglanti:
+        var = baglanti.execute(text(
+            'SELECT 1 FROM eslesme WHERE analiz_sonucu IS NOT NULL AND analiz_detay IS NULL LIMIT 1')).first()
+    if var:
+        logger.warning("Alt puan kolonlarina tasinmamis eslesmeler var (siralama bu satirlarda eksik kalir): "
+                       "python migrasyon.py --eslesme-doldur")
+
+
+def _gidis_donus_dogru(sonuc, skor, kolonlar):
+    """Kolonlardan geri kurulan analiz, eski JSON'daki alt puanlari ve anlati alanlarini aynen veriyor mu"""
+    geri = models.analiz_sozlugu(skor, {ad: kolonlar[f'{ad}_puan'] for ad in models.ALT_PUANLAR},
+                                 kolonlar['analiz_detay'], None)
+    beklenen = dict(sonuc or {})
+    alt = beklenen.pop('alt_puanlar', None) or {}
+    for ad in models.ALT_PUANLAR:
+        deger = alt.get(ad, beklenen.get(f'{ad}_puan'))
+        beklenen.pop(f'{ad}_puan', None)
+        # Sayiya cevrilemeyen alt puan kolonda None olur: veri kaybi, satir tasinmaz
+        puan = models.puan_degeri(deger)
+        if deger is not None and (puan is None or puan != geri['alt_puanlar'][ad]):
+            return False
+    beklenen.pop('uygunluk_skoru', None)
+    ek_anahtarlar = {'alt_puanlar', 'uygunluk_skoru'} | {f'{ad}_puan' for ad in models.ALT_PUANLAR}
+    return {k: v for k, v in geri.items() if k not in ek_anahtarlar} == beklenen
+
+
+def _eski_json(ham):
+    return json.loads(ham) if isinstance(ham, str) else ham
+
+
+def eslesme_puanlarini_doldur():
+    """
+    Eski analiz_sonucu JSON'undaki alt puanlari kolonlara, anlati alanlarini sikistirilmis detay
+    kolonuna yazar. Eski JSON silinmez (bkz. eski_analiz_json_temizle). Kolonlardan geri kurulan
+    analiz eski JSON'la ayni degilse satir tasinmaz ve raporlanir. (tasinan, atlanan) dondurur.
+    """
+    kolonlar = [f'{ad}_puan' for ad in models.ALT_PUANLAR] + ['analiz_detay']
+    # guncellenme_tarihi de ilerler: ilan havuzu ve analiz detayi ETag'leri tasinan satirlar icin yenilenir
+    guncelle = text(f"UPDATE eslesme SET {', '.join(f'{k} = :{k}' for k in kolonlar)}, "
+                    "guncellenme_tarihi = CURRENT_TIMESTAMP WHERE id = :id")
+    tasinan, atlanan, son_id = 0, [], 0
+    while True:
+        with db.engine.begin() as baglanti:
+            satirlar = baglanti.execute(text(
+                'SELECT id, skor, analiz_sonucu FROM eslesme WHERE analiz_sonucu IS NOT NULL '
+                'AND analiz_detay IS NULL AND id > :son_id ORDER BY id LIMIT :limit'
+            ), {'son_id': son_id, 'limit': PARTI_BOYUTU}).fetchall()
+            if not satirlar:
+                break
+            son_id = satirlar[-1].id
+            parametreler = []
+            for eslesme_id, skor, ham in satirlar:
+                sonuc = _eski_json(ham)
+                yeni = models.analiz_kolonlari(sonuc)
+                if _gidis_donus_dogru(sonuc, skor, yeni):
+                    parametreler.append({'id': eslesme_id, **yeni})
+                else:
+                    atlanan.append(eslesme_id)
+            if parametreler:
+                baglanti.execute(guncelle, parametreler)
+            tasinan += len(parametreler)
+    if atlanan:
+        logger.warning(f"Eslesme geri doldurma: {len(atlanan)} satir dogrulanamadi, eski JSON'da birakildi "
+                       f"(ilk id'ler: {atlanan[:20]})")
+    logger.info(f"Eslesme geri doldurma: {tasinan} satir tasindi")
+    return tasinan, len(atlanan)
+
+
+def eski_analiz_json_temizle():
+    """Tasinmis ve kolonlardan aynen geri kurulabilen satirlarin eski analiz_sonucu JSON'unu bosaltir.
+    Geri alinamaz; once veritabani yedeklenmelidir. Temizlenen satir sayisini dondurur."""
+    kolonlar = [f'{ad}_puan' for ad in models.ALT_PUANLAR] + ['analiz_detay']
+    temizlenen, son_id = 0, 0
+    while True:
+        with db.engine.begin() as baglanti:
+            satirlar = baglanti.execute(text(
+                f"SELECT id, skor, analiz_sonucu, {', '.join(kolonlar)} FROM eslesme "
+                f"WHERE analiz_sonucu IS NOT NULL AND analiz_detay IS NOT NULL AND id > :son_id "
+                f"ORDER BY id LIMIT :limit"), {'son_id': son_id, 'limit': PARTI_BOYUTU}).fetchall()
+            if not satirlar:
+                break
+            son_id = satirlar[-1].id
+            dogrulanan = [{'id': satir.id} for satir in satirlar
+                          if _gidis_donus_dogru(_eski_json(satir.analiz_sonucu), satir.skor, satir._mapping)]
+            if dogrulanan:
+                baglanti.execute(text('UPDATE eslesme SET analiz_sonucu = NULL WHERE id = :id'), dogrulanan)
+            temizlenen += len(dogrulanan)
+    logger.info(f"Eski analiz JSON'u temizlendi: {temizlenen} satir")
+    return temizlenen
+
+
+def istatistikleri_doldur():
+    """kullanici_istatistik tablosu bossa (yeni eklendiyse) mevcut verilerden bir kez olusturur"""
+    if db.session.query(models.KullaniciIstatistik.kullanici_id).first() is not None:
+        return
+    if db.session.query(models.CV.id).first() is None and db.session.query(models.IsIlani.id).first() is None:
+        return
+    satir = istatistik.yeniden_olustur()
+    logger.info(f"Kullanici istatistikleri olusturuldu: {satir} satir")
+
+
+if __name__ == '__main__':
+    # python migrasyon.py                    -> sema guncelleme ve bos zaman damgalarini doldurma
+    # python migrasyon.py --eslesme-doldur   -> eski analiz JSON'unu alt puan / detay kolonlarina tasir
+    # python migrasyon.py --eski-json-temizle -> dogrulanmis satirlarin eski JSON'unu siler (once yedek alin)
+    from app import app
+    with app.app_context():
+        semayi_guncelle()
+        kolonlari_doldur()
+        print("Veritabanı şeması güncellendi.")
+        if '--eslesme-doldur' in sys.argv:
+            tasinan, atlanan = eslesme_puanlarini_doldur()
+            print(f"Eşleşmeler taşındı: {tasinan} satır, doğrulanamayan: {atlanan}")
+        if '--eski-json-temizle' in sys.argv:
+            print(f"Eski analiz JSON'u temizlendi: {eski_analiz_json_temizle()} satır")
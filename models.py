@@ -1,6 +1,50 @@
+import json
+import zlib
 from extensions import db
 from datetime import datetime
 
+# Eslesme alt puanlari: analiz anahtari -> kolon adi ({ad}_puan)
+ALT_PUANLAR = ('teknik', 'deneyim', 'egitim', 'dil', 'sertifika')
+# KullaniciIstatistik skor dagilimi kovalari: (alt, ust) -> kolon adi skor_{alt}_{ust}
+SKOR_KOVALARI = ((0, 19), (20, 39), (40, 59), (60, 79), (80, 100))
+
+def puan_degeri(deger):
+    """Alt puani tamsayiya cevirir; sayisal metinler ("80", "80.5") de kabul edilir, digerleri None"""
+    if isinstance(deger, bool):
+        return None
+    if isinstance(deger, (int, float)):
+        return int(deger)
+    if isinstance(deger, str):
+        try:
+            return int(float(deger.strip()))
+        except (ValueError, OverflowError):
+            return None
+    return None
+
+def analiz_kolonlari(sonuc):
+    """ilani_karsilastir sonucunu Eslesme kolonlarina boler: alt puanlar tamsayi kolonlara,
+    anlati alanlari zlib ile sikistirilmis JSON'a"""
+    sonuc = dict(sonuc or {})
+    alt = sonuc.pop('alt_puanlar', None) or {}
+    sonuc.pop('uygunluk_skoru', None)
+    kolonlar = {}
+    for ad in ALT_PUANLAR:
+        deger = alt.get(ad, sonuc.get(f'{ad}_puan'))
+        sonuc.pop(f'{ad}_puan', None)
+        kolonlar[f'{ad}_puan'] = puan_degeri(deger)
+    kolonlar['analiz_detay'] = zlib.compress(json.dumps(sonuc, ensure_ascii=False).encode('utf-8'))
+    return kolonlar
+
+def analiz_sozlugu(skor, alt_puanlar, analiz_detay, eski_analiz_sonucu):
+    """analiz_kolonlari'nin tersi: Eslesme kolonlarindan tam analiz sozlugunu kurar"""
+    if analiz_detay is None:
+        return eski_analiz_sonucu
+    sonuc = json.loads(zlib.decompress(analiz_detay).decode('utf-8'))
+    sonuc.update({f'{ad}_puan': deger for ad, deger in alt_puanlar.items()})
+    sonuc['alt_puanlar'] = alt_puanlar
+    sonuc['uygunluk_skoru'] = skor
+    return sonuc
+
 class Kullanici(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -14,8 +58,21 @@ class CV(db.Model):
     orjinal_dosya_adi = db.Column(db.String(300), nullable=False)
     cikarilan_veriler = db.Column(db.JSON, nullable=True)
     aday_id = db.Column(db.Integer, db.ForeignKey('kullanici.id'), nullable=False)
+    # Analiz isteminde kullanilan kompakt profil (functions.puanlama_profili_olustur ciktisi)
+    puanlama_profili = db.Column(db.Text, nullable=True)
+    puanlama_profili_surumu = db.Column(db.Integer, nullable=True)
+    puanlama_profili_token = db.Column(db.Integer, nullable=True)
     eslesmeler = db.relationship('Eslesme', backref='cv', lazy=True, cascade='all, delete-orphan')
 
+@db.event.listens_for(CV, 'before_update')
+def _cv_profilini_gecersiz_kil(mapper, baglanti, cv):
+    """CV verisi degisince (atama ya da flag_modified ile yerinde degisiklik) puanlama profili
+    ayni UPDATE'te silinir. cikarilan_veriler'i ORM disinda (Core UPDATE) yazan kod profili de NULL yapmalidir."""
+    if db.inspect(cv).attrs.cikarilan_veriler.history.has_changes():
+        cv.puanlama_profili = None
+        cv.puanlama_profili_surumu = None
+        cv.puanlama_profili_token = None
+
 class IsIlani(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     baslik = db.Column(db.String(300), nullable=True)
@@ -24,14 +81,92 @@ class IsIlani(db.Model):
     kaynak_site = db.Column(db.String(100), nullable=True)
     aciklama_ozeti = db.Column(db.Text, nullable=True)
     bulunma_tarihi = db.Column(db.DateTime, default=datetime.utcnow)
+    # Ilan havuzu sayfasinin ETag / Last-Modified degeri icin (baslik vb. duzenlemeler)
+    guncellenme_tarihi = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
     gereksinimler_json = db.Column(db.JSON, nullable=True)
     # Ilani bulan kullanici (gizlilik icin)
     bulan_kullanici_id = db.Column(db.Integer, db.ForeignKey('kullanici.id'), nullable=True)
+    # Yakin kopya tespiti: kopya ilanlar kumedeki kanonik ilani gosterir
+    kanonik_ilan_id = db.Column(db.Integer, db.ForeignKey('is_ilani.id'), nullable=True, index=True)
+    minhash_imzasi = db.Column(db.JSON, nullable=True)
     eslesmeler = db.relationship('Eslesme', backref='is_ilani', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (db.Index('ix_is_ilani_bulan_kullanici', 'bulan_kullanici_id', 'id'),)
+
 class Eslesme(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     cv_id = db.Column(db.Integer, db.ForeignKey('cv.id'), nullable=False)
     is_ilani_id = db.Column(db.Integer, db.ForeignKey('is_ilani.id'), nullable=False)
     skor = db.Column(db.Integer, nullable=False)
-    analiz_sonucu = db.Column(db.JSON, nullable=True)
\ No newline at end of file
+    # Alt puanlar ayri kolonlarda: SQL tarafinda siralama ve toplama icin
+    teknik_puan = db.Column(db.Integer, nullable=True)
+    deneyim_puan = db.Column(db.Integer, nullable=True)
+    egitim_puan = db.Column(db.Integer, nullable=True)
+    dil_puan = db.Column(db.Integer, nullable=True)
+    sertifika_puan = db.Column(db.Integer, nullable=True)
+    # 'tarama': kademeli analizin sadece alt puan donduren on taramasi; None / 'tam': detayli analiz
+    analiz_seviyesi = db.Column(db.String(10), nullable=True)
+    # Ilan havuzu sayfasinin ETag / Last-Modified degeri icin
+    guncellenme_tarihi = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Anlati alanlari (neden, tavsiyeler...) sikistirilmis JSON; sadece erisilince yuklenir
+    analiz_detay = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    # Eski tam JSON kolon; `python migrasyon.py --eslesme-doldur` ile yukaridaki kolonlara tasinir
+    eski_analiz_sonucu = db.deferred(db.Column('analiz_sonucu', db.JSON(none_as_null=True), nullable=True))
+
+    __table_args__ = (
+        db.Index('ix_eslesme_cv_skor', 'cv_id', 'skor'),
+        db.Index('ix_eslesme_cv_teknik', 'cv_id', 'teknik_puan'),
+        db.Index('ix_eslesme_cv_deneyim', 'cv_id', 'deneyim_puan'),
+        db.Index('ix_eslesme_cv_egitim', 'cv_id', 'egitim_puan'),
+        db.Index('ix_eslesme_cv_dil', 'cv_id', 'dil_puan'),
+        db.Index('ix_eslesme_cv_sertifika', 'cv_id', 'sertifika_puan'),
+        db.Index('ix_eslesme_cv_guncellenme', 'cv_id', 'guncellenme_tarihi'),
+    )
+
+    @property
+    def alt_puanlar(self):
+        if self.teknik_puan is None and self.eski_analiz_sonucu:
+            return self.eski_analiz_sonucu.get('alt_puanlar', {})
+        return {ad: getattr(self, f'{ad}_puan') for ad in ALT_PUANLAR}
+
+    @property
+    def analiz_sonucu(self):
+        """Tam analiz sozlugu (ilani_karsilastir ciktisiyla ayni bicim). Detay kolonunu yukler."""
+        if self.analiz_detay is None:
+            return self.eski_analiz_sonucu
+        return analiz_sozlugu(self.skor, self.alt_puanlar, self.analiz_detay, None)
+
+    @analiz_sonucu.setter
+    def analiz_sonucu(self, sonuc):
+        for kolon, deger in analiz_kolonlari(sonuc).items():
+            setattr(self, kolon, deger)
+        self.eski_analiz_sonucu = None
+
+class IlanLshBandi(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    is_ilani_id = db.Column(db.Integer, db.ForeignKey('is_ilani.id', ondelete='CASCADE'), nullable=False, index=True)
+    bant_no = db.Column(db.Integer, nullable=False)
+    bant_ozeti = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.Index('ix_lsh_bant', 'bant_no', 'bant_ozeti'),)
+
+class KullaniciIstatistik(db.Model):
+    """Kullanici basina panel sayaclari (istatistik.py). kaynak='*' satiri tum kaynaklarin toplamidir.
+    Ilan, eslesme ve CV yazan islemlerle ayni transaction icinde artimli guncellenir."""
+    kullanici_id = db.Column(db.Integer, db.ForeignKey('kullanici.id'), primary_key=True)
+    kaynak = db.Column(db.String(100), primary_key=True)
+    cv_sayisi = db.Column(db.Integer, nullable=False, default=0)
+    ilan_sayisi = db.Column(db.Integer, nullable=False, default=0)
+    kopya_ilan_sayisi = db.Column(db.Integer, nullable=False, default=0)
+    eslesme_sayisi = db.Column(db.Integer, nullable=False, default=0)
+    skor_toplami = db.Column(db.Integer, nullable=False, default=0)
+    skor_0_19 = db.Column(db.Integer, nullable=False, default=0)
+    skor_20_39 = db.Column(db.Integer, nullable=False, default=0)
+    skor_40_59 = db.Column(db.Integer, nullable=False, default=0)
+    skor_60_79 = db.Column(db.Integer, nullable=False, default=0)
+    skor_80_100 = db.Column(db.Integer, nullable=False, default=0)
+
+class UcusKirasi(db.Model):
+    """Surecler arasi tekil ucus kirasi (tek_ucus.py). Satir varken anahtarin isi bir surecte suruyordur."""
+    anahtar = db.Column(db.String(100), primary_key=True)
+    jeton = db.Column(db.String(32), nullable=False)
+    bitis = db.Column(db.Float, nullable=False)
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from flask import request, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Aktif istek icin sorgu toplayici (profil kapaliyken hic ayarlanmaz)
+_aktif_toplayici = ContextVar('profil_toplayici', default=None)
+
+# Ayni SQL bu kadar veya daha fazla calisirsa N+1 supheli olarak isaretlenir
+N_ARTI_BIR_ESIGI = 10
+
+
+class SorguToplayici:
+    """Bir istek boyunca calisan SQL sorgularini sayar ve surelerini toplar"""
+
+    def __init__(self):
+        self.sorgular = {}
+        self.toplam_sure = 0.0
+        self.adet = 0
+
+    def ekle(self, sql, sure):
+        kayit = self.sorgular.setdefault(sql, [0, 0.0])
+        kayit[0] += 1
+        kayit[1] += sure
+        self.toplam_sure += sure
+        self.adet += 1
+
+    def ozet(self):
+        sirali = sorted(self.sorgular.items(), key=lambda k: k[1][1], reverse=True)
+        return {
+            'sorgu_sayisi': self.adet,
+            'toplam_sql_ms': round(self.toplam_sure * 1000, 2),
+            'n_arti_bir_supheliler': [sql for sql, (adet, _) in sirali if adet >= N_ARTI_BIR_ESIGI],
+            'sorgular': [{'sql': sql, 'adet': adet, 'toplam_ms': round(sure * 1000, 2)}
+                         for sql, (adet, sure) in sirali],
+        }
+
+
+class OrneklemeProfilci:
+    """Hedef is parcaciginin yiginini belirli araliklarla ornekleyip katlanmis (collapsed) yigin sayar.
+    Cikti flamegraph.pl, speedscope ve inferno ile uyumludur."""
+
+    def __init__(self, aralik=0.005):
+        self.aralik = aralik
+        self.yiginlar = Counter()
+        self._hedef = threading.get_ident()
+        self._dur = threading.Event()
+        self._is_parcacigi = threading.Thread(target=self._calis, daemon=True)
+
+    def baslat(self):
+        self._is_parcacigi.start()
+        return self
+
+    def durdur(self):
+        self._dur.set()
+        self._is_parcacigi.join()
+
+    def _calis(self):
+        while not self._dur.wait(self.aralik):
+            cerceve = sys._current_frames().get(self._hedef)
+            if cerceve is None:
+                continue
+            yigin = []
+            while cerceve is not None:
+                kod = cerceve.f_code
+                yigin.append(f"{kod.co_name} ({os.path.basename(kod.co_filename)}:{cerceve.f_lineno})")
+                cerceve = cerceve.f_back
+            self.yiginlar[';'.join(reversed(yigin))] += 1
+
+    def katlanmis_metin(self):
+        return '\n'.join(f"{yigin} {adet}" for yigin, adet in self.yiginlar.most_common()) + '\n'
+
+
+def _sorgu_oncesi(conn, cursor, statement, parameters, context, executemany):
+    if _aktif_toplayici.get() is not None:
+        conn.info.setdefault('profil_baslangic', []).append(time.perf_counter())
+
+
+def _sorgu_sonrasi(conn, cursor, statement, parameters, context, executemany):
+    toplayici = _aktif_toplayici.get()
+    if toplayici is None:
+        return
+    baslangiclar = conn.info.get('profil_baslangic')
+    if not baslangiclar:
+        return
+    sure = time.perf_counter() - baslangiclar.pop()
+    toplayici.ekle(statement, sure)
+    logger.debug(f"SQL {sure * 1000:.2f}ms: {statement[:200]}")
+
+
+def profillemeyi_etkinlestir(app):
+    """Istek bazli profil kancalarini kaydeder. Sadece PROFIL_AKTIF acikken cagrilir;
+    kapaliyken hicbir kanca kaydedilmedigi icin ek yuk yoktur.
+
+    Bir istek su durumlarda profillenir:
+      - 'X-Profil' basligi PROFIL_ANAHTARI ile eslesirse (esik yok sayilir, her zaman dokum alinir)
+      - PROFIL_ORNEKLEME_ORANI olasiligiyla rastgele secilirse (sadece PROFIL_ESIK_MS asilirsa dokum alinir)
+    """
+    oran = app.config.get('PROFIL_ORNEKLEME_ORANI', 0.0)
+    esik = app.config.get('PROFIL_ESIK_MS', 1000) / 1000
+    anahtar = app.config.get('PROFIL_ANAHTARI')
+    dizin = app.config.get('PROFIL_DIZINI')
+
+    event.listen(Engine, 'before_cursor_execute', _sorgu_oncesi)
+    event.listen(Engine, 'after_cursor_execute', _sorgu_sonrasi)
+
+    @app.before_request
+    def _profil_baslat():
+        zorla = bool(anahtar) and request.headers.get('X-Profil') == anahtar
+        if not zorla and (oran <= 0 or random.random() >= oran):
+            return
+        toplayici = SorguToplayici()
+        g.profil = {
+            'zorla': zorla,
+            'toplayici': toplayici,
+            'jeton': _aktif_toplayici.set(toplayici),
+            'profilci': OrneklemeProfilci().baslat(),
+            'baslangic': time.perf_counter(),
+        }
+
+    @app.after_request
+    def _profil_bitir(response):
+        profil = g.pop('profil', None)
+        if profil is None:
+            return response
+        sure = time.perf_counter() - profil['baslangic']
+        profil['profilci'].durdur()
+        _aktif_toplayici.reset(profil['jeton'])
+        ozet = profil['toplayici'].ozet()
+
+        response.headers['X-Profil-Sure-Ms'] = f"{sure * 1000:.1f}"
+        response.headers['X-Profil-Sorgu'] = str(ozet['sorgu_sayisi'])
+
+        if not profil['zorla'] and sure < esik:
+            return response
+
+        rota = request.endpoint or 'bilinmeyen'
+        logger.warning(f"Yavas istek: {request.method} {request.path} {sure * 1000:.0f}ms, "
+                       f"{ozet['sorgu_sayisi']} sorgu ({ozet['toplam_sql_ms']}ms SQL), "
+                       f"N+1 supheli: {len(ozet['n_arti_bir_supheliler'])}")
+        try:
+            os.makedirs(dizin, exist_ok=True)
+            on_ek = os.path.join(dizin, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{rota}_{sure * 1000:.0f}ms")
+            with open(on_ek + '.folded', 'w', encoding='utf-8') as f:
+                f.write(profil['profilci'].katlanmis_metin())
+            with open(on_ek + '.sql.json', 'w', encoding='utf-8') as f:
+                json.dump({'yol': request.path, 'metot': request.method, 'sure_ms': round(sure * 1000, 2),
+                           **ozet}, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.error(f"Profil dokumu yazilamadi: {e}")
+        return response
+
+    @app.teardown_request
+    def _profil_temizle(hata):
+        # Islenmemis hata durumunda after_request calismaz; ornekleyiciyi yine de durdur
+        profil = g.pop('profil', None)
+        if profil is not None:
+            profil['profilci'].durdur()
+            _aktif_toplayici.reset(profil['jeton'])
@@ -0,0 +1,179 @@
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from sqlalchemy import text
+from extensions import db
+import metrikler
+import models
+import yogunlastirma
+
+logger = logging.getLogger(__name__)
+
+# Kira bu sureden uzun tutulursa (surec coktu vb.) baska bir surec devralabilir
+KIRA_SURESI = 300
+# Baska surecteki isin bitmesini beklerken kira tablosunu yoklama araligi
+YOKLAMA_ARALIGI = 0.25
+
+_KIRA_AL = text(
+    "INSERT INTO ucus_kirasi (anahtar, jeton, bitis) VALUES (:anahtar, :jeton, :bitis) "
+    "ON CONFLICT(anahtar) DO UPDATE SET jeton = excluded.jeton, bitis = excluded.bitis "
+    "WHERE ucus_kirasi.bitis < :simdi")
+_KIRA_BIRAK = text("DELETE FROM ucus_kirasi WHERE anahtar = :anahtar AND jeton = :jeton")
+_KIRA_OKU = text("SELECT bitis FROM ucus_kirasi WHERE anahtar = :anahtar")
+
+
+def puan_anahtari(cv_id, ilan_id):
+    return f"puan:{cv_id}:{ilan_id}"
+
+
+def url_anahtari(url):
+    return "url:" + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def kayitli_puan(cv_id, ilan_id):
+    """Baska bir surecin kaydettigi eslesmeyi sonuc dict'i olarak dondurur (uygulama baglami gerekir)"""
+    eslesme = (models.Eslesme.query.filter_by(cv_id=cv_id, is_ilani_id=ilan_id)
+               .execution_options(populate_existing=True).first())
+    if eslesme is None:
+        return None
+    return {'ilan_id': ilan_id, 'success': True, 'skor': eslesme.skor,
+            'seviye': eslesme.analiz_seviyesi or 'tam'}
+
+
+def kayitli_ilan_metni(url):
+    """Ayni URL icin baska bir surecin kaydettigi (yogunlastirilmis) ilan metni (uygulama baglami gerekir)"""
+    ilan = (models.IsIlani.query.filter(models.IsIlani.kaynak_url == url,
+                                        models.IsIlani.gereksinimler_json.isnot(None))
+            .execution_options(populate_existing=True).first())
+    return yogunlastirma.istem_metni(ilan.gereksinimler_json) if ilan else None
+
+
+class Ucus:
+    """Devam eden tek bir is. Lider bitirdiginde ayni surecteki bekleyenler sonucu alir."""
+
+    def __init__(self, anahtar, jeton=None, yerel=True):
+        self.anahtar = anahtar
+        # Kira jetonu; kira tablosuna erisilemediyse None (sadece surec ici koordinasyon)
+        self.jeton = jeton
+        # Is bu surecte mi yapiliyor (False ise kirayi baska bir surec tutuyor)
+        self.yerel = yerel
+        self.sonuc = None
+        self._olay = threading.Event()
+
+
+class TekUcus:
+    """
+    Ayni anahtar icin ayni anda yalnizca bir isin calismasini saglar (single-flight).
+    Es zamanli cagiranlar devam eden ise baglanir ve onun sonucunu alir.
+
+    Surec icinde anahtar -> Ucus sozlugu, surecler arasinda ucus_kirasi tablosundaki
+    kira satiri kullanilir. Baska surecin isi bitince sonuc veritabanindan okunur
+    (db_sonucu); orada da sonuc yoksa cagiran isi kendisi yapar.
+    """
+
+    def __init__(self, app=None):
+        self._kilit = threading.Lock()
+        self._ucuslar = {}
+        self._motor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        with app.app_context():
+            self._motor = db.engine
+
+    def _kira_al(self, anahtar, jeton):
+        simdi = time.time()
+        with self._motor.begin() as baglanti:
+            sonuc = baglanti.execute(_KIRA_AL, {'anahtar': anahtar, 'jeton': jeton,
+                                                'bitis': simdi + KIRA_SURESI, 'simdi': simdi})
+            return sonuc.rowcount == 1
+
+    def _kira_birak(self, ucus):
+        try:
+            with self._motor.begin() as baglanti:
+                baglanti.execute(_KIRA_BIRAK, {'anahtar': ucus.anahtar, 'jeton': ucus.jeton})
+        except Exception as e:
+            # Birakilamayan kira KIRA_SURESI sonunda kendiliginden dusar
+            logger.error(f"Ucus kirasi birakilamadi ({ucus.anahtar}): {e}")
+
+    def baslat(self, anahtar):
+        """
+        (ucus, lider) dondurur. lider True ise is cagirana aittir ve sonunda bitir() cagrilmalidir;
+        False ise bekle() ile mevcut isin sonucu alinir.
+        """
+        tur = anahtar.split(':', 1)[0]
+        with self._kilit:
+            ucus = self._ucuslar.get(anahtar)
+            if ucus is not None:
+                metrikler.TEK_UCUS.artir(tur=tur, sonuc='surec_ici_bekleme')
+                return ucus, False
+            ucus = self._ucuslar[anahtar] = Ucus(anahtar, uuid.uuid4().hex)
+        try:
+            lider = self._kira_al(anahtar, ucus.jeton)
+        except Exception as e:
+            logger.error(f"Ucus kirasi alinamadi ({anahtar}): {e}")
+            lider = True  # kira tablosuna erisilemiyorsa sadece surec ici koordinasyon yapilir
+            ucus.jeton = None
+        if lider:
+            metrikler.TEK_UCUS.artir(tur=tur, sonuc='lider')
+            return ucus, True
+        # Kira baska surecte: yerel kaydi geri al, bu surecteki sonraki cagiranlar da kirayi yoklar
+        with self._kilit:
+            self._ucuslar.pop(anahtar, None)
+        metrikler.TEK_UCUS.artir(tur=tur, sonuc='surecler_arasi_bekleme')
+        return Ucus(anahtar, yerel=False), False
+
+    def bitir(self, ucus, sonuc):
+        """Liderin isi bitti: kirayi birakir ve bekleyenlere sonucu iletir"""
+        ucus.sonuc = sonuc
+        if ucus.jeton:
+            self._kira_birak(ucus)
+        with self._kilit:
+            if self._ucuslar.get(ucus.anahtar) is ucus:
+                del self._ucuslar[ucus.anahtar]
+        ucus._olay.set()
+
+    def bekle(self, ucus, db_sonucu=None, zaman_asimi=KIRA_SURESI):
+        """
+        Baska bir liderin sonucunu bekler. Surec icindeyse liderin sonucunu, baska surecteyse
+        kira kalktiktan sonra db_sonucu() degerini dondurur. None: sonuc yok, is yeniden yapilmali.
+        """
+        if ucus.yerel:
+            ucus._olay.wait(zaman_asimi)
+            return ucus.sonuc
+        son = time.monotonic() + zaman_asimi
+        while time.monotonic() < son:
+            with self._motor.connect() as baglanti:
+                bitis = baglanti.execute(_KIRA_OKU, {'anahtar': ucus.anahtar}).scalar()
+            if bitis is None or bitis < time.time():
+                break
+            time.sleep(YOKLAMA_ARALIGI)
+        if db_sonucu is None:
+            return None
+        with self._app.app_context():
+            return db_sonucu()
+
+    def yap(self, anahtar, fonksiyon, db_sonucu=None, yeterli=None):
+        """
+        fonksiyon()'u anahtar basina tek seferde calistirir; es zamanli cagiranlar ayni sonucu alir.
+        yeterli(sonuc) False donerse (ornegin liderin sonucu daha dusuk seviyede) bekleyen isi kendisi yapar.
+        """
+        ucus, lider = self.baslat(anahtar)
+        if not lider:
+            sonuc = self.bekle(ucus, db_sonucu)
+            if sonuc is not None and (yeterli is None or yeterli(sonuc)):
+                return sonuc
+            return fonksiyon()
+        sonuc = None
+        try:
+            sonuc = fonksiyon()
+            return sonuc
+        finally:
+            self.bitir(ucus, sonuc)
+
+
+ucuslar = TekUcus()
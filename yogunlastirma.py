@@ -0,0 +1,183 @@
+import re
+
+# Ilan metni yogunlastirma: sayfa metnini bolumlere ayirir, nitelik / sorumluluk bolumlerini
+# oncelikli olarak token butcesi icinde tutar. Cerez uyarilari, sirket tanitimi, yan haklar
+# ve benzer ilan listeleri istemden cikarilir.
+
+# Algoritma degisirse artirilir; eski surumdeki kayitlar ilk okumada yeniden yogunlastirilir
+YOGUN_SURUM = 2
+# Istem icin ilan metni butcesi (token, ~4 karakter / token)
+TOKEN_BUTCESI = 1200
+KARAKTER_PER_TOKEN = 4
+# Ilk baslikten onceki kisimdan (ilan basligi, sirket, lokasyon) tutulan karakter sayisi
+GIRIS_SINIRI = 300
+# Veritabaninda saklanan ham metin siniri. Sayfadan ayiklanan metnin tamami saklanir (functions.ILAN_HAM_SINIRI):
+# surum degisince uzun ilanlarin sonundaki nitelik bolumleri de yeniden yogunlastirilabilir
+KAYIT_METIN_SINIRI = 100000
+# Satir basligi sayilabilecek en uzun satir
+BASLIK_UZUNLUGU = 60
+
+# (bolum turu, oncelik, baslik kaliplari). Oncelik <= 0 olan bolumler istemden cikarilir.
+_BOLUMLER = [
+    ('nitelik', 3, [
+        r'aranan nitelikler', r'genel nitelikler', r'nitelikler', r'gereksinimler', r'aday(da|dan) beklenenler',
+        r'beklentilerimiz', r'arad[ıi][gğ][ıi]m[ıi]z (özellikler|nitelikler|aday)', r'tercih sebebi(dir)?',
+        r'requirements', r'qualifications', r'required skills', r'minimum qualifications',
+        r'preferred qualifications', r'what you( wi|\')ll need', r'what we(\'re| are) looking for',
+        r'who you are', r'must have', r'nice to have', r'skills( and|\s*&)? experience',
+    ]),
+    ('sorumluluk', 2, [
+        r'i[şs] tan[ıi]m[ıi]', r'g[öo]rev tan[ıi]m[ıi]', r'g[öo]revler', r'sorumluluklar', r'pozisyon hakk[ıi]nda',
+        r'responsibilities', r'key responsibilities', r'job description', r'role description',
+        r'what you( wi|\')ll do', r'your role', r'the role', r'about the role',
+    ]),
+    ('teknik', 2, [
+        r'teknolojiler', r'kullan[ıi]lan teknolojiler', r'teknik beceriler', r'tech stack', r'technologies',
+        r'our stack',
+    ]),
+    ('gurultu', -1, [
+        r'[şs]irket hakk[ıi]nda', r'hakk[ıi]m[ıi]zda', r'biz kimiz', r'yan haklar', r'sunduklar[ıi]m[ıi]z',
+        r'benzer ilanlar', r'di[gğ]er ilanlar', r'ba[şs]vuru (s[üu]reci|bilgileri)',
+        r'about us', r'about the company', r'who we are', r'benefits', r'perks', r'what we offer',
+        r'similar jobs', r'related jobs', r'more jobs', r'how to apply', r'equal opportunity',
+    ]),
+]
+
+_BASLIK_DESENLERI = [(tur, oncelik, re.compile(r'^(?:' + '|'.join(kaliplar) + r')\s*:?$', re.IGNORECASE))
+                     for tur, oncelik, kaliplar in _BOLUMLER]
+# Satir yapisi olmayan (eski, tek satir) metinlerde basliklar metin icinde aranir
+_SATIR_ICI_BASLIK = re.compile(r'(?<=[\s.:;!?])(' + '|'.join(k for _, _, kal in _BOLUMLER for k in kal) +
+                               r')(?=\s*:?\s)', re.IGNORECASE)
+
+_GURULTU_SATIRI = re.compile(r'çerez|cookie|kişisel verilerin korunması|gizlilik politikası|privacy policy|'
+                             r'^(kabul et|ayarlar|accept( all)?|reddet|decline|paylaş|share|başvur|apply( now)?)$',
+                             re.IGNORECASE)
+# Baslik bulunamazsa satirlar bu sinyallere gore onceliklendirilir
+_SINYAL = re.compile(r'deneyim|tecrübe|experience|\byıl|\byears?\b|mezun|lisans|degree|bachelor|üniversite|'
+                     r'bilgi sahibi|knowledge|proficien|familiar|ingilizce|english|sertifika|certif|'
+                     r'gerekli|required|must|tercih|preferred|sorumlu|responsib', re.IGNORECASE)
+
+
+def _karakter_butcesi(token_butcesi):
+    return token_butcesi * KARAKTER_PER_TOKEN
+
+
+def _satirlara_bol(metin):
+    """Metni bos olmayan, bosluklari sadelestirilmis satirlara boler"""
+    if metin.count('\n') < 3:
+        # Eski kayitlar tek satir: buyuk harfle baslayan bolum basliklarini ayri satira al
+        metin = _SATIR_ICI_BASLIK.sub(lambda m: f"\n{m.group(1)}\n" if m.group(1)[0].isupper() else m.group(1), metin)
+        metin = re.sub(r'(?<=[.!?])\s+', '\n', metin)
+    satirlar = (' '.join(s.split()) for s in metin.split('\n'))
+    return [s for s in satirlar if s]
+
+
+def _baslik_turu(satir):
+    """Satir bilinen bir bolum basligiysa (tur, oncelik), degilse None"""
+    if len(satir) > BASLIK_UZUNLUGU:
+        return None
+    for tur, oncelik, desen in _BASLIK_DESENLERI:
+        if desen.match(satir):
+            return tur, oncelik
+    return None
+
+
+def bolumlere_ayir(metin):
+    """
+    Metni [(tur, oncelik, baslik, [satirlar])] listesine ayirir. Ilk basliktan onceki kisim
+    ('giris', 0, None, ...) olarak doner. Gurultu satirlari (cerez uyarisi vb.) atilir.
+    """
+    bolumler = [('giris', 0, None, [])]
+    for satir in _satirlara_bol(metin or ''):
+        if _GURULTU_SATIRI.search(satir):
+            continue
+        tur = _baslik_turu(satir)
+        if tur:
+            bolumler.append((*tur, satir, []))
+        else:
+            bolumler[-1][3].append(satir)
+    return bolumler
+
+
+def _kirp(satirlar, butce):
+    """Satirlari butceye sigdigi kadar alir; sigmayan ilk satiri kelime sinirinda keser"""
+    secilen, kalan = [], butce
+    for satir in satirlar:
+        if len(satir) + 1 <= kalan:
+            secilen.append(satir)
+            kalan -= len(satir) + 1
+            continue
+        if kalan > 40:
+            secilen.append(satir[:kalan - 1].rsplit(' ', 1)[0])
+        break
+    return secilen
+
+
+def _sinyal_secimi(satirlar, butce):
+    """Baslik yoksa: sinyal iceren satirlar once, kalan butce diger satirlarla; asil sirayla"""
+    sirali = sorted(range(len(satirlar)), key=lambda i: (not _SINYAL.search(satirlar[i]), i))
+    secilen, kalan = set(), butce
+    for i in sirali:
+        if len(satirlar[i]) + 1 > kalan:
+            continue
+        secilen.add(i)
+        kalan -= len(satirlar[i]) + 1
+    return [satirlar[i] for i in sorted(secilen)]
+
+
+def yogunlastir(metin, token_butcesi=TOKEN_BUTCESI):
+    """
+    Ilan sayfasi metninden istem icin ilgili kisimlari secer. Ilan basligi/sirket satirlari,
+    sonra oncelik sirasiyla nitelik, sorumluluk ve teknoloji bolumleri butceye eklenir;
+    cikti asil metin sirasindadir. Ilgili bolum bulunamazsa sinyal satirlari tercih edilir.
+    Secim bos kalirsa (metinde sadece gurultu bolumleri var) metnin basi dondurulur.
+    """
+    butce = _karakter_butcesi(token_butcesi)
+    secim = _bolum_secimi(metin, butce)
+    if secim:
+        return secim
+    return '\n'.join(_kirp(_satirlara_bol(metin or ''), butce))
+
+
+def _bolum_secimi(metin, butce):
+    bolumler = bolumlere_ayir(metin)
+    giris = _kirp(bolumler[0][3], min(GIRIS_SINIRI, butce))
+    kalan = butce - sum(len(s) + 1 for s in giris)
+
+    ilgili = [i for i, b in enumerate(bolumler) if b[1] > 0]
+    if not ilgili:
+        # Bolum basligi yok: gurultu bolumleri disindaki tum satirlardan sec
+        satirlar = [s for b in bolumler if b[1] >= 0 for s in b[3]]
+        if sum(len(s) + 1 for s in satirlar) <= butce:
+            return '\n'.join(satirlar)
+        return '\n'.join(_sinyal_secimi(satirlar, butce))
+
+    secimler = {}
+    for i in sorted(ilgili, key=lambda i: (-bolumler[i][1], i)):
+        _, _, baslik, satirlar = bolumler[i]
+        if kalan <= len(baslik) + 1:
+            break
+        secilen = _kirp(satirlar, kalan - len(baslik) - 1)
+        if secilen:
+            secimler[i] = [baslik] + secilen
+            kalan -= sum(len(s) + 1 for s in secimler[i])
+    return '\n'.join(giris + [s for i in sorted(secimler) for s in secimler[i]])
+
+
+def ilan_metni_kaydi(ham_metin):
+    """IsIlani.gereksinimler_json icin ham ve yogunlastirilmis metni birlikte dondurur"""
+    return {'full_text': ham_metin[:KAYIT_METIN_SINIRI], 'yogun_metin': yogunlastir(ham_metin),
+            'yogun_surum': YOGUN_SURUM}
+
+
+def guncel_mi(kayit):
+    return bool(kayit) and kayit.get('yogun_surum') == YOGUN_SURUM and 'yogun_metin' in kayit
+
+
+def istem_metni(kayit):
+    """gereksinimler_json kaydindan istemde kullanilacak metin; eski kayitlar yerinde yogunlastirilir"""
+    if not kayit or not kayit.get('full_text'):
+        return None
+    if guncel_mi(kayit):
+        return kayit['yogun_metin']
+    return yogunlastir(kayit['full_text'])